@@ -0,0 +1,34 @@
+"""shared rate limit buckets
+
+Revision ID: 0003_rate_limit_buckets
+Revises: 0002_add_new_tables
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003_rate_limit_buckets"
+down_revision = "0002_add_new_tables"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Unlogged: bucket state is ephemeral and written on every shared check
+    op.create_table(
+        "rate_limit_buckets",
+        sa.Column("bucket_key", sa.String(length=255), primary_key=True),
+        sa.Column("tokens", sa.Float(), nullable=False),
+        sa.Column("granted", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        prefixes=["UNLOGGED"],
+    )
+    op.create_index("ix_rate_limit_buckets_updated_at", "rate_limit_buckets", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_rate_limit_buckets_updated_at", table_name="rate_limit_buckets")
+    op.drop_table("rate_limit_buckets")
@@ -0,0 +1,48 @@
+"""indexes for analytics, listing and retention queries
+
+Revision ID: 0004_query_indexes
+Revises: 0003_rate_limit_buckets
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004_query_indexes"
+down_revision = "0003_rate_limit_buckets"
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, extra create_index kwargs)
+INDEXES = [
+    # per-device history windows (behavior_ai averages, device reports); duration rides along for index-only scans
+    ("ix_browsing_history_device_id_timestamp", "browsing_history", ["device_id", "timestamp"], {"postgresql_include": ["duration_seconds"]}),
+    # daily summary and retention cutoffs
+    ("ix_browsing_history_timestamp", "browsing_history", ["timestamp"], {}),
+    # per-user alert/block windows (analytics, insights)
+    ("ix_activity_logs_user_id_action_type_timestamp", "activity_logs", ["user_id", "action_type", "timestamp"], {}),
+    # device report block counts
+    ("ix_activity_logs_device_id_action_type", "activity_logs", ["device_id", "action_type"], {}),
+    # daily summary and retention cutoffs
+    ("ix_activity_logs_timestamp", "activity_logs", ["timestamp"], {}),
+    # active rule loads; inactive rules are never queried on the hot path
+    ("ix_blocked_sites_active", "blocked_sites", ["is_active"], {"postgresql_where": sa.text("is_active")}),
+    # user -> devices subqueries and device listings
+    ("ix_devices_user_id", "devices", ["user_id"], {}),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY so existing history tables stay writable while the indexes build
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kwargs)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _columns, _kwargs in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,103 @@
+"""partition browsing_history and activity_logs by day
+
+Revision ID: 0005_partition_history_tables
+Revises: 0004_query_indexes
+Create Date: 2026-10-19 00:00:00.000000
+
+The existing tables are not copied: each is renamed to <table>_legacy, given
+a primary key on (id, "timestamp") and a CHECK matching its range, and attached
+to the new partitioned parent as the partition for everything before the
+cutover (tomorrow, UTC). Building that key and validating the CHECK scan the
+old table once, under the migration's lock. New rows go to daily partitions
+(<table>_pYYYYMMDD) created ahead by the scheduler; rows outside every range
+land in <table>_default.
+"""
+from datetime import datetime, timedelta, timezone
+
+from alembic import op
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision = "0005_partition_history_tables"
+down_revision = "0004_query_indexes"
+branch_labels = None
+depends_on = None
+
+
+FOREIGN_KEYS = {
+    "browsing_history": [("device_id", "devices", "CASCADE")],
+    "activity_logs": [("user_id", "users", "SET NULL"), ("device_id", "devices", "SET NULL")],
+}
+
+# Same definitions as 0004 and the models' __table_args__
+INDEXES = {
+    "browsing_history": [
+        ("ix_browsing_history_device_id_timestamp", '(device_id, "timestamp") INCLUDE (duration_seconds)'),
+        ("ix_browsing_history_timestamp", '("timestamp")'),
+    ],
+    "activity_logs": [
+        ("ix_activity_logs_user_id_action_type_timestamp", '(user_id, action_type, "timestamp")'),
+        ("ix_activity_logs_device_id_action_type", "(device_id, action_type)"),
+        ("ix_activity_logs_timestamp", '("timestamp")'),
+    ],
+}
+
+
+def _bound(day) -> str:
+    return f"'{day.isoformat()} 00:00:00+00'"
+
+
+def upgrade() -> None:
+    cutover = datetime.now(timezone.utc).date() + timedelta(days=1)
+
+    for table in ("browsing_history", "activity_logs"):
+        legacy = f"{table}_legacy"
+
+        op.execute(f'UPDATE {table} SET "timestamp" = now() WHERE "timestamp" IS NULL')
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN "timestamp" SET NOT NULL')
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {table}_pkey")
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {legacy}_pkey PRIMARY KEY (id, "timestamp")')
+        # lets ATTACH skip its own validation scan
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {legacy}_range CHECK ("timestamp" < {_bound(cutover)})')
+        for name, _columns in INDEXES[table]:
+            op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_legacy")
+        op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+
+        op.execute(
+            f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS, PRIMARY KEY (id, "timestamp")) '
+            f'PARTITION BY RANGE ("timestamp")'
+        )
+        for column, target, on_delete in FOREIGN_KEYS[table]:
+            op.execute(f"ALTER TABLE {table} ADD FOREIGN KEY ({column}) REFERENCES {target} (id) ON DELETE {on_delete}")
+        for name, columns in INDEXES[table]:
+            op.execute(f"CREATE INDEX {name} ON {table} {columns}")
+
+        # existing keys and indexes on the legacy table are adopted, not rebuilt
+        op.execute(f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ({_bound(cutover)})")
+        op.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {legacy}_range")
+
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+        # today's rows are covered by the legacy partition; daily ranges start at the cutover
+        for offset in range(settings.partition_premake_days):
+            day = cutover + timedelta(days=offset)
+            op.execute(
+                f"CREATE TABLE {table}_p{day:%Y%m%d} PARTITION OF {table} "
+                f"FOR VALUES FROM ({_bound(day)}) TO ({_bound(day + timedelta(days=1))})"
+            )
+
+
+def downgrade() -> None:
+    for table in ("browsing_history", "activity_logs"):
+        plain = f"{table}_unpartitioned"
+        op.execute(f"CREATE TABLE {plain} (LIKE {table} INCLUDING DEFAULTS)")
+        op.execute(f"INSERT INTO {plain} SELECT * FROM {table}")
+        op.execute(f"DROP TABLE {table} CASCADE")
+        op.execute(f"ALTER TABLE {plain} RENAME TO {table}")
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)")
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN "timestamp" DROP NOT NULL')
+        for column, target, on_delete in FOREIGN_KEYS[table]:
+            op.execute(f"ALTER TABLE {table} ADD FOREIGN KEY ({column}) REFERENCES {target} (id) ON DELETE {on_delete}")
+        for name, columns in INDEXES[table]:
+            op.execute(f"CREATE INDEX {name} ON {table} {columns}")
@@ -0,0 +1,33 @@
+"""retention job checkpoints
+
+Revision ID: 0006_retention_checkpoints
+Revises: 0005_partition_history_tables
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0006_retention_checkpoints"
+down_revision = "0005_partition_history_tables"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "retention_checkpoints",
+        sa.Column("job", sa.String(length=64), primary_key=True),
+        sa.Column("relation", sa.String(length=128), primary_key=True),
+        sa.Column("last_timestamp", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("rows_done", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("retention_checkpoints")
@@ -0,0 +1,35 @@
+"""one ai_insights row per user
+
+Revision ID: 0007_unique_ai_insight_user
+Revises: 0006_retention_checkpoints
+Create Date: 2026-10-19 00:00:00.000000
+
+The batched insight refresh upserts on user_id, which needs a unique index.
+Duplicates left by the old get-or-create path are removed first, keeping each
+user's most recently updated row.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0007_unique_ai_insight_user"
+down_revision = "0006_retention_checkpoints"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        DELETE FROM ai_insights AS older USING ai_insights AS newer
+        WHERE older.user_id = newer.user_id
+          AND (coalesce(older.updated_at, '-infinity'), older.id) < (coalesce(newer.updated_at, '-infinity'), newer.id)
+        """
+    )
+    op.drop_index("ix_ai_insights_user_id", table_name="ai_insights")
+    op.create_index("ix_ai_insights_user_id", "ai_insights", ["user_id"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ai_insights_user_id", table_name="ai_insights")
+    op.create_index("ix_ai_insights_user_id", "ai_insights", ["user_id"])
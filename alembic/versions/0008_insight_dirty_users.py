@@ -0,0 +1,29 @@
+"""users whose AI insights are stale
+
+Revision ID: 0008_insight_dirty_users
+Revises: 0007_unique_ai_insight_user
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0008_insight_dirty_users"
+down_revision = "0007_unique_ai_insight_user"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "insight_dirty_users",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("marked_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("insight_dirty_users")
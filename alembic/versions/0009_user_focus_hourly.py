@@ -0,0 +1,37 @@
+"""hourly per-user focus counters
+
+Revision ID: 0009_user_focus_hourly
+Revises: 0008_insight_dirty_users
+Create Date: 2026-10-19 00:00:00.000000
+
+Filled by ingestion from here on; existing history is loaded with
+`python -m app.tasks.backfill_stats`.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0009_user_focus_hourly"
+down_revision = "0008_insight_dirty_users"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_focus_hourly",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("hour", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("duration_sum", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("duration_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("distraction_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    # pruning of hours that left the window
+    op.create_index("ix_user_focus_hourly_hour", "user_focus_hourly", ["hour"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_focus_hourly_hour", table_name="user_focus_hourly")
+    op.drop_table("user_focus_hourly")
@@ -0,0 +1,49 @@
+"""hourly activity rollups for reports
+
+Revision ID: 0010_activity_rollup_hourly
+Revises: 0009_user_focus_hourly
+Create Date: 2026-10-19 00:00:00.000000
+
+Filled by ingestion from here on; existing history is loaded with
+`python -m app.tasks.backfill_stats`. The key index uses NULLS NOT DISTINCT
+(PostgreSQL 15+).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0010_activity_rollup_hourly"
+down_revision = "0009_user_focus_hourly"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "activity_rollup_hourly",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), primary_key=True),
+        sa.Column("hour", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("device_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("domain", sa.String(length=255), nullable=True),
+        sa.Column("category", sa.String(length=64), nullable=True),
+        sa.Column("visits", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("duration_seconds", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("alerts", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("blocked", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+    op.create_index(
+        "ix_activity_rollup_hourly_key", "activity_rollup_hourly",
+        ["hour", "device_id", "user_id", "domain", "category"], unique=True, postgresql_nulls_not_distinct=True,
+    )
+    op.create_index("ix_activity_rollup_hourly_device_id_hour", "activity_rollup_hourly", ["device_id", "hour"])
+    op.create_index("ix_activity_rollup_hourly_user_id_hour", "activity_rollup_hourly", ["user_id", "hour"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_activity_rollup_hourly_user_id_hour", table_name="activity_rollup_hourly")
+    op.drop_index("ix_activity_rollup_hourly_device_id_hour", table_name="activity_rollup_hourly")
+    op.drop_index("ix_activity_rollup_hourly_key", table_name="activity_rollup_hourly")
+    op.drop_table("activity_rollup_hourly")
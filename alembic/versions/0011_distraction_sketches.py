@@ -0,0 +1,33 @@
+"""hourly heavy-hitter sketches of distracting domains
+
+Revision ID: 0011_distraction_sketches
+Revises: 0010_activity_rollup_hourly
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0011_distraction_sketches"
+down_revision = "0010_activity_rollup_hourly"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "distraction_sketches",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("hour", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("sketch", postgresql.JSONB(), nullable=False),
+    )
+    # retention pruning
+    op.create_index("ix_distraction_sketches_hour", "distraction_sketches", ["hour"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_distraction_sketches_hour", table_name="distraction_sketches")
+    op.drop_table("distraction_sketches")
@@ -1,13 +1,99 @@
-from typing import AsyncGenerator
+import asyncio
+import logging
+import uuid
+from time import perf_counter
+from typing import AsyncGenerator, Dict
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
+from app.core.sql_instrumentation import instrument_engine
 
 
-engine = create_async_engine(settings.database_url, echo=False, future=True)
+logger = logging.getLogger(__name__)
+
+db_pool_wait_seconds = Histogram(
+    "db_pool_wait_seconds",
+    "Time to obtain a pooled connection (includes opening one when the pool has room).",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+db_pool_checkouts_total = Counter("db_pool_checkouts_total", "Connection checkouts by result.", ("result",))
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that reports how long callers wait for a connection."""
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            db_pool_checkouts_total.inc("error")
+            raise
+        finally:
+            db_pool_wait_seconds.observe(perf_counter() - start)
+        db_pool_checkouts_total.inc("ok")
+        return connection
+
+
+def pool_stats(pool) -> Dict[str, int]:
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
+
+
+def _engine_options(url: str) -> dict:
+    options = {
+        "echo": False,
+        "future": True,
+        "poolclass": TimedAsyncQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if make_url(url).get_driver_name() == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": settings.db_statement_cache_size}
+    return options
+
+
+engine = create_async_engine(settings.database_url, **_engine_options(settings.database_url))
+# Optional replica for reports, analytics and listings; without one, reads share the primary.
+read_engine = (
+    create_async_engine(settings.database_read_url, **_engine_options(settings.database_read_url))
+    if settings.database_read_url
+    else engine
+)
+if settings.sql_instrumentation_enabled:
+    instrument_engine(engine.sync_engine)
+    if read_engine is not engine:
+        instrument_engine(read_engine.sync_engine)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+AsyncReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+
+
+def _engines() -> Dict[str, AsyncEngine]:
+    return {"primary": engine} if read_engine is engine else {"primary": engine, "read": read_engine}
+
+
+db_pool_connections = Gauge(
+    "db_pool_connections",
+    "Connections held by each engine pool by state.",
+    lambda: {
+        (name, state): value
+        for name, eng in _engines().items()
+        for state, value in pool_stats(eng.sync_engine.pool).items()
+    },
+    ("engine", "state"),
+)
 
 Base = declarative_base()
 
@@ -16,3 +102,63 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
 
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Session on the read engine, for queries that tolerate replication lag.
+
+    Anything that writes, or must see a write made earlier in the same
+    request, belongs on get_db.
+    """
+    async with AsyncReadSessionLocal() as session:
+        yield session
+
+
+def _hot_statements():
+    # Shapes of the per-request lookups (user auth, device registry miss,
+    # blocklist load); executing them once per connection leaves them in
+    # SQLAlchemy's compiled cache and asyncpg's prepared-statement cache.
+    from sqlalchemy import select
+
+    from app.models.blocked_site import BlockedSite
+    from app.models.device import Device
+    from app.models.user import User
+
+    probe = uuid.uuid4()
+    return [
+        select(User).where(User.id == probe),
+        select(Device).where(Device.id == probe),
+        select(BlockedSite).where(BlockedSite.is_active == True),  # noqa: E712
+    ]
+
+
+async def warm_pool(connections: int) -> int:
+    """Open `connections` pooled connections per engine and prepare hot statements on each.
+
+    Returns how many connections were warmed. Failures and timeouts are logged,
+    never raised: a database that is down at boot should not keep the API down.
+    """
+    connections = min(connections, settings.db_pool_size)
+    if connections <= 0:
+        return 0
+
+    async def _warm_one(target: AsyncEngine) -> None:
+        async with target.connect() as conn:
+            for statement in _hot_statements():
+                await conn.execute(statement)
+
+    warmed = 0
+    for name, target in _engines().items():
+        start = perf_counter()
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(*(_warm_one(target) for _ in range(connections)), return_exceptions=True),
+                timeout=settings.db_pool_timeout_seconds,
+            )
+        except asyncio.TimeoutError as exc:
+            results = [exc] * connections
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            logger.warning("Pool warmup (%s): %d of %d connections failed: %r", name, len(errors), connections, errors[0])
+        warmed += connections - len(errors)
+        logger.info("Pool warmup (%s): %d connections ready in %.0f ms", name, connections - len(errors), (perf_counter() - start) * 1000)
+    return warmed
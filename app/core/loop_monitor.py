@@ -0,0 +1,103 @@
+"""Event-loop lag sampling and blocking-call detection.
+
+A coroutine wakes every interval and records how late it was scheduled; the
+lateness is time the loop spent running something else without yielding. A
+watchdog thread watches the coroutine's heartbeat and, when it goes stale for
+longer than the threshold, captures the stack of whatever is running on the
+loop thread at that moment - usually the blocking call itself.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from time import monotonic
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram
+
+
+logger = logging.getLogger(__name__)
+
+event_loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds", "Delay between when the loop monitor was due and when it ran.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+event_loop_blocked_total = Counter("event_loop_blocked_total", "Times the loop was blocked past the threshold.")
+
+
+class LoopMonitor:
+    def __init__(self, interval_seconds: float = 0.1, threshold_seconds: float = 0.25, keep: int = 20):
+        self.interval_seconds = interval_seconds
+        self.threshold_seconds = threshold_seconds
+        self.recent_blocks: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self._heartbeat = monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _sample(self) -> None:
+        while True:
+            due = monotonic() + self.interval_seconds
+            await asyncio.sleep(self.interval_seconds)
+            now = monotonic()
+            event_loop_lag_seconds.observe(max(0.0, now - due))
+            self._heartbeat = now
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        poll = max(0.01, self.threshold_seconds / 4)
+        while not self._stop.wait(poll):
+            heartbeat = self._heartbeat
+            stalled = monotonic() - heartbeat - self.interval_seconds
+            if stalled < self.threshold_seconds or heartbeat == reported_heartbeat:
+                continue
+            reported_heartbeat = heartbeat
+            self._report(stalled)
+
+    def _report(self, stalled: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        event_loop_blocked_total.inc()
+        self.recent_blocks.append({
+            "detected_at": datetime.now(timezone.utc).isoformat(),
+            "blocked_for_ms": round(stalled * 1000, 1),
+            "stack": stack,
+        })
+        logger.warning("event loop blocked for %.0f ms; loop thread stack:\n%s", stalled * 1000, "".join(stack))
+
+    def blocked_calls(self) -> List[Dict[str, Any]]:
+        return list(self.recent_blocks)
+
+
+loop_monitor = LoopMonitor(
+    interval_seconds=settings.loop_monitor_interval_ms / 1000,
+    threshold_seconds=settings.loop_block_threshold_ms / 1000,
+)
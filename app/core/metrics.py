@@ -0,0 +1,151 @@
+"""Lightweight in-process metrics exposed in Prometheus text format.
+
+Counters and histograms keep one small record per label combination and
+cost a dict lookup (plus a bisect for histograms) per observation, so they
+are cheap enough to leave on in production. Gauges are read from callbacks
+at scrape time.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List["_Metric"] = []
+
+
+@dataclass
+class RequestStats:
+    """Per-request accumulator shared with hooks further down the stack."""
+
+    scope: Dict[str, Any]
+    db_seconds: float = 0.0
+    db_statements: int = 0
+
+    @property
+    def route(self) -> str:
+        # The router stores the matched route on the shared scope; raw paths
+        # would explode label cardinality, so anything unmatched is pooled.
+        return getattr(self.scope.get("route"), "path", None) or "unmatched"
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterable[str]:
+        return ()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def _samples(self) -> Iterable[str]:
+        for labels, value in list(self.values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket..., +Inf count, sum]
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def _samples(self) -> Iterable[str]:
+        for labels, series in list(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Gauge(_Metric):
+    """Gauge whose samples are produced by a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, callback: Callable[[], Dict[Tuple[str, ...], float]], labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.callback = callback
+
+    def _samples(self) -> Iterable[str]:
+        for labels, value in self.callback().items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+_cache_sizes: Dict[str, Callable[[], int]] = {}
+
+
+def register_cache_size(cache: str, size: Callable[[], int]) -> None:
+    """Report len() of an in-process cache through the cache_entries gauge."""
+    _cache_sizes[cache] = size
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Shared instruments used across the app
+http_requests_total = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_request_duration_seconds = Histogram("http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+http_request_db_seconds = Histogram("http_request_db_seconds", "Database time spent per request by route.", ("route",))
+cache_requests_total = Counter("cache_requests_total", "In-process cache lookups by cache and result.", ("cache", "result"))
+filter_evaluate_seconds = Histogram("filter_evaluate_seconds", "Time spent in evaluate_access by resulting category.", ("category",))
+agent_report_logs = Histogram("agent_report_logs", "Log entries per agent report.", buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000))
+email_send_seconds = Histogram("email_send_seconds", "Time spent in send_email by outcome (sent, rate_limited, failed).", ("outcome",))
+cache_entries = Gauge("cache_entries", "Entries held by in-process caches.", lambda: {(name,): size() for name, size in _cache_sizes.items()}, ("cache",))
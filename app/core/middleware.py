@@ -1,44 +1,222 @@
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+import math
+import os
+from time import monotonic, perf_counter
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.datastructures import MutableHeaders
 from starlette.responses import JSONResponse
-from time import time
-from collections import defaultdict
-from typing import Dict
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.core.config import Settings, settings
+from app.core.metrics import Gauge, RequestStats, current_request, http_request_db_seconds, http_request_duration_seconds, http_requests_total
+from app.core.rate_limit import REFILL_SECONDS, RateLimiter, create_rate_limiter
+from app.core.security import decode_token
+from app.services.agent_comm import is_agent_token, resolve_agent_token
 from app.utils.responses import error
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Simple rate limiting middleware."""
-    
-    def __init__(self, app, requests_per_minute: int = 60):
-        super().__init__(app)
-        self.requests_per_minute = requests_per_minute
-        self.requests: Dict[str, list] = defaultdict(list)
-    
-    async def dispatch(self, request: Request, call_next):
-        # Get client IP
-        client_ip = request.client.host if request.client else "unknown"
-        
-        # Clean old entries (older than 1 minute)
-        now = time()
-        self.requests[client_ip] = [
-            ts for ts in self.requests[client_ip]
-            if now - ts < 60
-        ]
-        
-        # Check rate limit
-        if len(self.requests[client_ip]) >= self.requests_per_minute:
-            return JSONResponse(
+# Path prefixes (below the API prefix) mapped to the rate-limit budget they draw from
+ROUTE_GROUPS: Tuple[Tuple[str, str], ...] = (
+    ("/agent", "agent"),
+    ("/browsing", "agent"),
+    ("/filter", "filter"),
+    ("/auth", "auth"),
+    ("/admin", "admin"),
+    ("/activity", "admin"),
+    ("/reports", "admin"),
+    ("/users", "admin"),
+    ("/blocked-sites", "admin"),
+    ("/analytics", "admin"),
+)
+
+
+class RateLimitPolicy:
+    """Requests-per-minute budgets per route group.
+
+    Built from Settings; reload() re-reads the environment/.env so budgets can
+    be changed without a restart. The middleware also reloads on its own when
+    the env file is modified.
+    """
+
+    def __init__(self, limits: Dict[str, int], env_file: Optional[str] = None):
+        self.limits = dict(limits)
+        self.env_file = env_file
+        self._env_mtime = self._mtime()
+
+    @classmethod
+    def from_settings(cls, source: Settings) -> "RateLimitPolicy":
+        return cls(_limits_from_settings(source), env_file=source.model_config.get("env_file"))
+
+    def limit_for(self, group: str) -> int:
+        return self.limits.get(group, self.limits["default"])
+
+    def reload(self) -> Dict[str, int]:
+        self.limits = _limits_from_settings(Settings())
+        self._env_mtime = self._mtime()
+        return dict(self.limits)
+
+    def reload_if_changed(self) -> bool:
+        mtime = self._mtime()
+        if mtime == self._env_mtime:
+            return False
+        self.reload()
+        return True
+
+    def _mtime(self) -> Optional[float]:
+        if not self.env_file:
+            return None
+        try:
+            return os.stat(self.env_file).st_mtime
+        except OSError:
+            return None
+
+
+def _limits_from_settings(source: Settings) -> Dict[str, int]:
+    return {
+        "default": source.rate_limit_default_per_minute,
+        "agent": source.rate_limit_agent_per_minute,
+        "filter": source.rate_limit_filter_per_minute,
+        "auth": source.rate_limit_auth_per_minute,
+        "admin": source.rate_limit_admin_per_minute,
+    }
+
+
+rate_limit_policy = RateLimitPolicy.from_settings(settings)
+rate_limiter = create_rate_limiter(settings.rate_limit_backend, lease_share=settings.rate_limit_lease_share)
+
+Gauge("rate_limit_checks", "Rate-limit checks answered locally vs by the shared backend.",
+      lambda: {(k,): v for k, v in rate_limiter.stats.items()}, ("kind",))
+
+
+def route_group(path: str, prefix: str = settings.api_prefix) -> str:
+    if path.startswith(prefix):
+        path = path[len(prefix):]
+        for route_prefix, group in ROUTE_GROUPS:
+            if path.startswith(route_prefix):
+                return group
+    return "default"
+
+
+def principal_key(scope: Scope) -> str:
+    """Rate-limit identity: agent device, then JWT subject, then client IP."""
+    token = _bearer_token(scope.get("headers") or ())
+    if token:
+        if is_agent_token(token):
+            device_id = resolve_agent_token(token)
+            if device_id:
+                return f"device:{device_id}"
+        else:
+            try:
+                claims = decode_token(token)
+            except HTTPException:
+                claims = {}
+            subject = claims.get("device_id") or claims.get("sub")
+            if subject:
+                return f"{'device' if claims.get('agent') else 'user'}:{subject}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def _bearer_token(headers: Iterable[Tuple[bytes, bytes]]) -> Optional[str]:
+    for name, value in headers:
+        if name == b"authorization":
+            if value[:7].lower() == b"bearer ":
+                return value[7:].decode("latin-1").strip() or None
+            return None
+    return None
+
+
+class RateLimitMiddleware:
+    """Token-bucket rate limiting per principal and route group, as plain ASGI middleware.
+
+    Each (route group, principal) pair draws from one bucket holding a minute's
+    budget; see app.core.rate_limit for the local and shared bucket stores.
+    Idle buckets are swept out periodically. Responses carry
+    RateLimit-Limit/Remaining/Reset headers so clients can pace themselves.
+    """
+
+    def __init__(self, app: ASGIApp, policy: Optional[RateLimitPolicy] = None, requests_per_minute: Optional[int] = None, limiter: Optional[RateLimiter] = None, sweep_interval_seconds: float = 10.0):
+        self.app = app
+        if policy is None:
+            policy = RateLimitPolicy({"default": requests_per_minute or 60})
+        self.policy = policy
+        self.limiter = limiter or RateLimiter()
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._next_sweep = monotonic() + sweep_interval_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        now = monotonic()
+        if now >= self._next_sweep:
+            self.limiter.evict_idle(now)
+            self.policy.reload_if_changed()
+            self._next_sweep = now + self.sweep_interval_seconds
+
+        group = route_group(scope["path"])
+        limit = self.policy.limit_for(group)
+        allowed, tokens = await self.limiter.hit(f"{group}:{principal_key(scope)}", limit, now)
+        rate = limit / REFILL_SECONDS
+        headers = {
+            "RateLimit-Limit": str(limit),
+            "RateLimit-Remaining": str(max(0, int(tokens))),
+            "RateLimit-Reset": str(max(0, math.ceil((limit - tokens) / rate))),
+        }
+
+        if not allowed:
+            headers["Retry-After"] = str(max(1, math.ceil((1 - tokens) / rate)))
+            response = JSONResponse(
                 status_code=429,
-                content=error("Rate limit exceeded. Please try again later.", None)
+                content=error("Rate limit exceeded. Please try again later.", None),
+                headers=headers,
             )
-        
-        # Record request
-        self.requests[client_ip].append(now)
-        
-        response = await call_next(request)
-        return response
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(scope=message)
+                for name, value in headers.items():
+                    response_headers.append(name, value)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class MetricsMiddleware:
+    """Records request count and latency per route template and status."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_request.reset(token)
+            route = stats.route
+            http_request_duration_seconds.observe(perf_counter() - started, scope["method"], route)
+            http_requests_total.inc(scope["method"], route, str(status_code))
+            if stats.db_statements:
+                http_request_db_seconds.observe(stats.db_seconds, route)
 
 
 def sanitize_input(text: str) -> str:
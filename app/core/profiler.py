@@ -0,0 +1,84 @@
+"""On-demand sampling profiler for a live worker.
+
+A background thread snapshots every thread's stack with sys._current_frames()
+at a fixed interval and folds the samples into collapsed-stack lines
+("root;caller;callee count"), the input format of flamegraph.pl and
+speedscope. Optionally a tracemalloc snapshot taken over the same window
+reports the top allocation sites.
+"""
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+
+class SamplingProfiler:
+    def __init__(self, interval_seconds: float = 0.005):
+        self.interval_seconds = interval_seconds
+        self.samples = 0
+        self.stacks: Counter = Counter()
+
+    def run(self, seconds: float) -> None:
+        """Sample for `seconds`; call from a thread other than the one being profiled."""
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self.stacks[self._collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+            self.samples += 1
+            time.sleep(self.interval_seconds)
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        frames: List[str] = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+            frame = frame.f_back
+        frames.append(thread_name)
+        return ";".join(reversed(frames))
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, limit: int = 25) -> List[Dict[str, Any]]:
+    stats = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    )).statistics("lineno")
+    return [
+        {"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", "size_bytes": stat.size, "count": stat.count}
+        for stat in stats[:limit]
+    ]
+
+
+def profile(seconds: float, interval_seconds: float = 0.005, memory: bool = True) -> Dict[str, Any]:
+    """Blocking: run a sampling profile (and allocation snapshot) for `seconds`."""
+    started_tracing = False
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracing = True
+
+    profiler = SamplingProfiler(interval_seconds)
+    try:
+        profiler.run(seconds)
+        allocations: Optional[List[Dict[str, Any]]] = None
+        if memory:
+            allocations = top_allocations(tracemalloc.take_snapshot())
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    return {
+        "seconds": seconds,
+        "interval_ms": interval_seconds * 1000,
+        "samples": profiler.samples,
+        "collapsed": profiler.collapsed(),
+        "allocations": allocations,
+    }
@@ -0,0 +1,189 @@
+import logging
+from dataclasses import dataclass
+from time import monotonic
+from typing import Dict, Optional, Protocol, Tuple
+
+from sqlalchemy import text
+
+
+logger = logging.getLogger(__name__)
+
+REFILL_SECONDS = 60.0  # a bucket holds one minute's budget and refills over a minute
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class TokenBuckets:
+    """Constant-space token buckets held in this process."""
+
+    def __init__(self):
+        self.buckets: Dict[str, _Bucket] = {}
+
+    def take(self, key: str, limit: int, want: int, now: float) -> Tuple[int, float]:
+        """Take up to `want` whole tokens; returns (granted, tokens left)."""
+        capacity = float(limit)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = _Bucket(capacity, now)
+        tokens = min(capacity, bucket.tokens + (now - bucket.updated) * capacity / REFILL_SECONDS)
+        granted = min(want, int(tokens))
+        bucket.tokens = tokens - granted
+        bucket.updated = now
+        return granted, bucket.tokens
+
+    def evict_idle(self, now: float) -> None:
+        # A bucket idle for a full refill period is indistinguishable from a new one
+        stale = [key for key, bucket in self.buckets.items() if now - bucket.updated >= REFILL_SECONDS]
+        for key in stale:
+            del self.buckets[key]
+
+
+class RateLimitBackend(Protocol):
+    async def acquire(self, key: str, limit: int, want: int) -> Tuple[int, float]:
+        """Take up to `want` tokens from the shared bucket; returns (granted, tokens left)."""
+        ...
+
+
+class MemoryRateLimitBackend:
+    """Shared-store stand-in backed by this process; used for tests and single-worker runs."""
+
+    def __init__(self):
+        self.store = TokenBuckets()
+        self.round_trips = 0
+
+    async def acquire(self, key: str, limit: int, want: int) -> Tuple[int, float]:
+        self.round_trips += 1
+        return self.store.take(key, limit, want, monotonic())
+
+
+# One statement per round trip: refill the bucket for the time elapsed since its
+# last update, grant up to :want whole tokens, and report what was granted.
+_REFILLED = (
+    "LEAST(CAST(:capacity AS double precision), "
+    "b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * CAST(:rate AS double precision))"
+)
+_GRANT = f"LEAST(CAST(:want AS integer), FLOOR({_REFILLED}))"
+_ACQUIRE_SQL = text(f"""
+INSERT INTO rate_limit_buckets AS b (bucket_key, tokens, granted, updated_at)
+VALUES (
+    :key,
+    CAST(:capacity AS double precision) - LEAST(CAST(:want AS integer), CAST(:capacity AS double precision)),
+    LEAST(CAST(:want AS integer), CAST(:capacity AS double precision)),
+    now()
+)
+ON CONFLICT (bucket_key) DO UPDATE SET
+    granted = {_GRANT},
+    tokens = {_REFILLED} - {_GRANT},
+    updated_at = now()
+RETURNING granted, tokens
+""")
+
+_PURGE_SQL = text("DELETE FROM rate_limit_buckets WHERE updated_at < now() - make_interval(secs => CAST(:idle_seconds AS double precision))")
+
+
+class PostgresRateLimitBackend:
+    """Buckets in the (unlogged) rate_limit_buckets table, shared by every worker and replica."""
+
+    async def acquire(self, key: str, limit: int, want: int) -> Tuple[int, float]:
+        from app.core.database import engine  # local import: the engine is created on first use
+
+        async with engine.begin() as conn:
+            row = (await conn.execute(_ACQUIRE_SQL, {
+                "key": key,
+                "capacity": float(limit),
+                "want": want,
+                "rate": limit / REFILL_SECONDS,
+            })).one()
+        return int(row.granted), float(row.tokens)
+
+    @staticmethod
+    async def purge_idle(idle_seconds: float = 2 * REFILL_SECONDS) -> int:
+        from app.core.database import engine
+
+        async with engine.begin() as conn:
+            result = await conn.execute(_PURGE_SQL, {"idle_seconds": idle_seconds})
+        return result.rowcount or 0
+
+
+@dataclass
+class _Lease:
+    tokens: int
+    shared_left: float
+    expires: float
+    retry_at: float
+
+
+class RateLimiter:
+    """Token-bucket limiter with an optional shared backend.
+
+    Without a backend every check is local. With one, each worker leases a
+    small slice of a key's budget (lease_share of the limit) in a single round
+    trip and spends it locally; a key found empty is denied locally until it
+    could have refilled. Most checks therefore never leave the process while
+    the backend still enforces one global budget.
+    """
+
+    def __init__(self, shared: Optional[RateLimitBackend] = None, lease_share: float = 0.05, lease_ttl_seconds: float = 5.0):
+        self.local = TokenBuckets()
+        self.shared = shared
+        self.lease_share = lease_share
+        self.lease_ttl_seconds = lease_ttl_seconds
+        self._leases: Dict[str, _Lease] = {}
+        self.stats = {"local_checks": 0, "shared_checks": 0, "shared_errors": 0}
+
+    async def hit(self, key: str, limit: int, now: float) -> Tuple[bool, float]:
+        """Spend one request for key; returns (allowed, tokens left)."""
+        if self.shared is None:
+            self.stats["local_checks"] += 1
+            granted, tokens = self.local.take(key, limit, 1, now)
+            return granted == 1, tokens
+
+        lease = self._leases.get(key)
+        if lease is not None and now < lease.expires:
+            if lease.tokens > 0:
+                lease.tokens -= 1
+                self.stats["local_checks"] += 1
+                return True, lease.tokens + lease.shared_left
+            if now < lease.retry_at:
+                self.stats["local_checks"] += 1
+                return False, lease.shared_left
+
+        self.stats["shared_checks"] += 1
+        try:
+            granted, shared_left = await self.shared.acquire(key, limit, max(1, int(limit * self.lease_share)))
+        except Exception:
+            # Fail open: an unreachable store must not take the API down with it
+            self.stats["shared_errors"] += 1
+            logger.exception("rate limit backend unavailable")
+            return True, float(limit)
+
+        retry_at = now if granted else now + (1 - shared_left) * REFILL_SECONDS / limit
+        self._leases[key] = _Lease(
+            tokens=max(0, granted - 1),
+            shared_left=shared_left,
+            expires=max(now + self.lease_ttl_seconds, retry_at),
+            retry_at=retry_at,
+        )
+        if not granted:
+            return False, shared_left
+        return True, max(0, granted - 1) + shared_left
+
+    def evict_idle(self, now: float) -> None:
+        self.local.evict_idle(now)
+        expired = [key for key, lease in self._leases.items() if now >= lease.expires]
+        for key in expired:
+            del self._leases[key]
+
+
+def create_rate_limiter(backend: str, lease_share: float = 0.05) -> RateLimiter:
+    if backend == "postgres":
+        return RateLimiter(PostgresRateLimitBackend(), lease_share=lease_share)
+    if backend == "memory":
+        return RateLimiter()
+    raise ValueError(f"Unknown rate limit backend: {backend}")
@@ -1,3 +1,5 @@
+from datetime import datetime, timezone
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
@@ -5,26 +7,34 @@ from apscheduler.triggers.interval import IntervalTrigger
 from app.core.config import settings
 from app.tasks import anonymize
 from app.tasks import archive_logs
-from app.services.behavior_ai import update_ai_insights
+from app.tasks import partitions
+from app.tasks.retention import retention_tick
+from app.services.behavior_ai import refresh_all_insights, refresh_dirty_insights
+from app.services.focus_stats import prune_focus_stats
 from app.core.database import AsyncSessionLocal
-from app.models.user import User
-from sqlalchemy import select
+from app.core.rate_limit import PostgresRateLimitBackend
 
 
 scheduler = AsyncIOScheduler()
 
 
 async def refresh_ai_insights_job():
-    """Daily job to refresh AI insights for all users."""
+    """Daily job to refresh AI insights for all users (one batched pass).
+
+    Still needed alongside the incremental refresh: insights cover a rolling
+    window, so users without new activity drift as old events age out.
+    """
+    pruned = await prune_focus_stats()
     async with AsyncSessionLocal() as db:
-        result = await db.execute(select(User))
-        users = result.scalars().all()
-        
-        for user in users:
-            try:
-                await update_ai_insights(str(user.id), db)
-            except Exception as e:
-                print(f"Error updating insights for user {user.id}: {e}")
+        count = await refresh_all_insights(db)
+    print(f"Refreshed AI insights for {count} users (pruned {pruned} expired focus bins)")
+
+
+async def refresh_dirty_insights_job():
+    """Refresh AI insights for users with activity since their last refresh."""
+    count = await refresh_dirty_insights(settings.insight_refresh_batch_size)
+    if count:
+        print(f"Refreshed AI insights for {count} active users")
 
 
 async def archive_logs_job():
@@ -41,6 +51,24 @@ async def anonymize_logs_job():
     print(f"Anonymized {count} logs")
 
 
+async def retention_tick_job():
+    """Continuous retention: one bounded slice of archive/delete/anonymize work."""
+    result = await retention_tick()
+    print(f"Retention slice: {result['deleted']} deleted, {result['anonymized']} anonymized (batch {result['batch_size']})")
+
+
+async def create_partitions_job():
+    """Create the history tables' daily partitions ahead of time."""
+    created = await partitions.ensure_future_partitions()
+    print(f"Created {len(created)} partitions")
+
+
+async def purge_rate_limit_buckets_job():
+    """Drop shared rate-limit buckets that have been idle long enough to be full."""
+    count = await PostgresRateLimitBackend.purge_idle()
+    print(f"Purged {count} idle rate limit buckets")
+
+
 def setup_scheduler():
     """Configure and start the scheduler."""
     # Daily AI insights refresh (runs at 2 AM)
@@ -50,23 +78,61 @@ def setup_scheduler():
         id="refresh_ai_insights",
         replace_existing=True
     )
-    
-    # Weekly log archiving (runs Sunday at 3 AM)
+
+    # Users with new activity, every few minutes
     scheduler.add_job(
-        archive_logs_job,
-        trigger=CronTrigger(day_of_week=6, hour=3, minute=0),  # Sunday
-        id="archive_logs",
+        refresh_dirty_insights_job,
+        trigger=IntervalTrigger(minutes=settings.insight_refresh_interval_minutes),
+        id="refresh_dirty_insights",
+        coalesce=True,
+        max_instances=1,
         replace_existing=True
     )
     
-    # Weekly anonymization (runs Sunday at 4 AM)
+    if settings.retention_mode == "continuous":
+        # Small retention slices all day instead of a weekly spike
+        scheduler.add_job(
+            retention_tick_job,
+            trigger=IntervalTrigger(minutes=settings.retention_interval_minutes),
+            id="retention_tick",
+            coalesce=True,
+            max_instances=1,
+            replace_existing=True
+        )
+    else:
+        # Weekly log archiving (runs Sunday at 3 AM)
+        scheduler.add_job(
+            archive_logs_job,
+            trigger=CronTrigger(day_of_week=6, hour=3, minute=0),  # Sunday
+            id="archive_logs",
+            replace_existing=True
+        )
+
+        # Weekly anonymization (runs Sunday at 4 AM)
+        scheduler.add_job(
+            anonymize_logs_job,
+            trigger=CronTrigger(day_of_week=6, hour=4, minute=0),  # Sunday
+            id="anonymize_logs",
+            replace_existing=True
+        )
+    
+    # Future partitions (every 6 hours, and once at startup)
     scheduler.add_job(
-        anonymize_logs_job,
-        trigger=CronTrigger(day_of_week=6, hour=4, minute=0),  # Sunday
-        id="anonymize_logs",
+        create_partitions_job,
+        trigger=IntervalTrigger(hours=6),
+        id="create_partitions",
+        next_run_time=datetime.now(timezone.utc),
         replace_existing=True
     )
-    
+
+    if settings.rate_limit_backend == "postgres":
+        scheduler.add_job(
+            purge_rate_limit_buckets_job,
+            trigger=IntervalTrigger(minutes=10),
+            id="purge_rate_limit_buckets",
+            replace_existing=True
+        )
+
     scheduler.start()
     print("Scheduler started")
 
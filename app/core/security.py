@@ -1,6 +1,13 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
 
 from bcrypt import gensalt, hashpw, checkpw
 from jose import jwt
@@ -11,6 +18,7 @@ from sqlalchemy import select
 
 from app.core.config import settings
 from app.core.database import get_db
+from app.core.metrics import Gauge, cache_requests_total, register_cache_size
 
 
 class Role(str, Enum):
@@ -23,13 +31,82 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_prefix}/auth/login
 
 
 def hash_password(plain_password: str) -> str:
-    return hashpw(plain_password.encode("utf-8"), gensalt()).decode("utf-8")
+    return hashpw(plain_password.encode("utf-8"), gensalt(rounds=settings.bcrypt_rounds)).decode("utf-8")
 
 
 def verify_password(plain_password: str, password_hash: str) -> bool:
     return checkpw(plain_password.encode("utf-8"), password_hash.encode("utf-8"))
 
 
+def password_needs_rehash(password_hash: str) -> bool:
+    """True when a stored bcrypt hash was made with a different work factor."""
+    try:
+        return int(password_hash.split("$")[2]) != settings.bcrypt_rounds
+    except (IndexError, ValueError):
+        return True
+
+
+# bcrypt costs hundreds of milliseconds per call, so the async handlers hand it
+# to a small dedicated pool. Callers beyond password_hash_max_pending get a 503
+# instead of queueing behind a login storm.
+_password_pool = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt")
+_password_stats: Dict[str, float] = {
+    "pending": 0,
+    "completed": 0,
+    "rejected": 0,
+    "wait_seconds_total": 0.0,
+    "run_seconds_total": 0.0,
+}
+
+T = TypeVar("T")
+
+
+def password_hash_stats() -> Dict[str, float]:
+    stats = dict(_password_stats)
+    stats["running"] = min(stats["pending"], settings.password_hash_workers)
+    stats["queued"] = max(0, stats["pending"] - settings.password_hash_workers)
+    return stats
+
+
+Gauge("password_hash_pool", "bcrypt pool jobs by state, plus completed/rejected totals.",
+      lambda: {(k,): v for k, v in password_hash_stats().items() if not k.endswith("_total")}, ("stat",))
+
+
+async def _run_password_job(fn: Callable[..., T], *args: Any) -> T:
+    if _password_stats["pending"] >= settings.password_hash_max_pending:
+        _password_stats["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+    submitted = time.perf_counter()
+
+    def job() -> Tuple[T, float, float]:
+        started = time.perf_counter()
+        result = fn(*args)
+        return result, started - submitted, time.perf_counter() - started
+
+    _password_stats["pending"] += 1
+    try:
+        result, waited, ran = await asyncio.get_running_loop().run_in_executor(_password_pool, job)
+    finally:
+        _password_stats["pending"] -= 1
+    _password_stats["completed"] += 1
+    _password_stats["wait_seconds_total"] += waited
+    _password_stats["run_seconds_total"] += ran
+    return result
+
+
+async def hash_password_async(plain_password: str) -> str:
+    return await _run_password_job(hash_password, plain_password)
+
+
+async def verify_password_async(plain_password: str, password_hash: str) -> bool:
+    return await _run_password_job(verify_password, plain_password, password_hash)
+
+
 def create_token(subject: str, expires_delta: timedelta, token_type: str, extra_claims: Optional[Dict[str, Any]] = None) -> str:
     now = datetime.now(timezone.utc)
     payload: Dict[str, Any] = {
@@ -57,39 +134,144 @@ def create_refresh_token(subject: str, role: Optional[str] = None, extra_claims:
     return create_token(subject, timedelta(days=settings.jwt_refresh_expires_days), "refresh", claims)
 
 
+# Verified claims keyed by a digest of the token, so repeat requests from the
+# same session or agent skip signature verification. Entries never outlive
+# the token's own ``exp``.
+_token_cache: "OrderedDict[bytes, Tuple[Dict[str, Any], int]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+
+def _cached_claims(key: bytes) -> Optional[Dict[str, Any]]:
+    with _token_cache_lock:
+        entry = _token_cache.get(key)
+        if entry is None:
+            cache_requests_total.inc("jwt", "miss")
+            return None
+        claims, exp = entry
+        if exp <= time.time():
+            del _token_cache[key]
+            cache_requests_total.inc("jwt", "miss")
+            return None
+        _token_cache.move_to_end(key)
+        cache_requests_total.inc("jwt", "hit")
+        return dict(claims)
+
+
+def _store_claims(key: bytes, claims: Dict[str, Any]) -> None:
+    exp = claims.get("exp")
+    if not isinstance(exp, int) or settings.jwt_cache_size <= 0:
+        return
+    with _token_cache_lock:
+        _token_cache[key] = (dict(claims), exp)
+        _token_cache.move_to_end(key)
+        while len(_token_cache) > settings.jwt_cache_size:
+            _token_cache.popitem(last=False)
+
+
+def clear_token_cache() -> None:
+    with _token_cache_lock:
+        _token_cache.clear()
+
+
 def decode_token(token: str) -> Dict[str, Any]:
+    key = _token_digest(token)
+    claims = _cached_claims(key)
+    if claims is not None:
+        return claims
     try:
-        return jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+        claims = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    _store_claims(key, claims)
+    return claims
 
 
-def get_current_user_claims(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+async def get_current_user_claims(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
     return decode_token(token)
 
 
-def require_roles(*roles: Role):
-    def dependency(claims: Dict[str, Any] = Depends(get_current_user_claims)) -> Dict[str, Any]:
-        role: Optional[str] = claims.get("role")
-        if roles and role not in [r.value for r in roles]:
-            raise HTTPException(status_code=403, detail="Insufficient permissions")
-        return claims
+@dataclass(frozen=True)
+class CurrentUser:
+    id: str
+    role: str
+    is_active: bool
+
+
+# Short-lived snapshot of each user's role and activation state so that
+# get_current_user does not cost a DB round trip per request. update_user
+# invalidates an entry explicitly when is_active changes.
+_MAX_CACHED_USERS = 10000
+_user_cache: "OrderedDict[str, Tuple[CurrentUser, float]]" = OrderedDict()
+
+
+def invalidate_user_cache(user_id: Optional[str] = None) -> None:
+    if user_id is None:
+        _user_cache.clear()
+    else:
+        _user_cache.pop(str(user_id), None)
 
-    return dependency
+
+def _cached_user(user_id: str) -> Optional[CurrentUser]:
+    entry = _user_cache.get(user_id)
+    if entry is None:
+        cache_requests_total.inc("user", "miss")
+        return None
+    user, loaded_at = entry
+    if time.monotonic() - loaded_at >= settings.user_cache_ttl_seconds:
+        _user_cache.pop(user_id, None)
+        cache_requests_total.inc("user", "miss")
+        return None
+    _user_cache.move_to_end(user_id)
+    cache_requests_total.inc("user", "hit")
+    return user
+
+
+register_cache_size("jwt", lambda: len(_token_cache))
+register_cache_size("user", lambda: len(_user_cache))
 
 
 async def get_current_user(
     claims: Dict[str, Any] = Depends(get_current_user_claims),
     db: AsyncSession = Depends(get_db),
-):
+) -> CurrentUser:
     from app.models.user import User  # local import to avoid circular
 
     user_id = claims.get("sub")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token subject")
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    if not user or not user.is_active:
+
+    current = _cached_user(user_id)
+    if current is None:
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found or inactive")
+        current = CurrentUser(id=str(user.id), role=user.role.value, is_active=user.is_active)
+        if settings.user_cache_ttl_seconds > 0:
+            _user_cache[user_id] = (current, time.monotonic())
+            while len(_user_cache) > _MAX_CACHED_USERS:
+                _user_cache.popitem(last=False)
+    if not current.is_active:
         raise HTTPException(status_code=401, detail="User not found or inactive")
-    return user
+    return current
+
 
+def require_roles(*roles: Role):
+    """Dependency admitting active users with one of `roles`; returns the token claims.
+
+    Role and activation come from the cached user snapshot, so a deactivated
+    admin is refused without a DB round trip per request.
+    """
+    async def dependency(
+        claims: Dict[str, Any] = Depends(get_current_user_claims),
+        user: CurrentUser = Depends(get_current_user),
+    ) -> Dict[str, Any]:
+        if roles and user.role not in [r.value for r in roles]:
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
+        return claims
+
+    return dependency
@@ -0,0 +1,121 @@
+"""Opt-in SQL statement timing via SQLAlchemy engine events.
+
+Every statement is timed and attributed to the route of the request that ran
+it (or "background" for scheduler jobs). Statements slower than
+SQL_SLOW_QUERY_MS are logged with the shape of their parameters - never the
+values - and, with SQL_EXPLAIN_SLOW_QUERIES, the plan of slow SELECTs.
+"""
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from time import perf_counter
+from typing import Any, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram, current_request
+
+
+logger = logging.getLogger(__name__)
+
+sql_statement_seconds = Histogram("sql_statement_seconds", "SQL statement latency by route and statement fingerprint.", ("route", "statement"))
+sql_slow_statements_total = Counter("sql_slow_statements_total", "Statements slower than the slow-query threshold.", ("route", "statement"))
+
+_MAX_STATEMENTS = 2000
+_statements: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+_IN_LIST = re.compile(r"\((?:\s*(?:\$\d+|%\(\w+\)s|\?|:\w+)\s*,)+\s*(?:\$\d+|%\(\w+\)s|\?|:\w+)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(statement: str) -> str:
+    # Expanded IN lists produce one statement text per list length; fold them
+    return _IN_LIST.sub("(...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def _fingerprint(statement: str) -> str:
+    return hashlib.sha1(_normalize(statement).encode("utf-8")).hexdigest()[:12]
+
+
+def _param_shape(parameters: Any, executemany: bool) -> Any:
+    if executemany and isinstance(parameters, (list, tuple)) and parameters:
+        return {"rows": len(parameters), "row": _param_shape(parameters[0], False)}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _record(fingerprint: str, statement: str, elapsed: float) -> None:
+    entry = _statements.get(fingerprint)
+    if entry is None:
+        entry = _statements[fingerprint] = {"statement": _normalize(statement)[:1000], "calls": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        while len(_statements) > _MAX_STATEMENTS:
+            _statements.popitem(last=False)
+    entry["calls"] += 1
+    entry["total_seconds"] += elapsed
+    entry["max_seconds"] = max(entry["max_seconds"], elapsed)
+
+
+def top_statements(limit: int = 20) -> List[Dict[str, Any]]:
+    """Statements seen by this worker, heaviest (by total time) first."""
+    ranked = sorted(_statements.items(), key=lambda item: item[1]["total_seconds"], reverse=True)
+    return [{"fingerprint": fp, **stats} for fp, stats in ranked[:limit]]
+
+
+def _explain(conn, statement: str, parameters: Any) -> str:
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("EXPLAIN " + statement, parameters)
+        return "\n".join(str(row[0]) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach timing hooks to a (sync or async-backing) engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_started", []).append(perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["statement_started"].pop()
+        elapsed = perf_counter() - started
+
+        request = current_request.get()
+        route = request.route if request else "background"
+        if request:
+            request.db_seconds += elapsed
+            request.db_statements += 1
+
+        fingerprint = _fingerprint(statement)
+        sql_statement_seconds.observe(elapsed, route, fingerprint)
+        _record(fingerprint, statement, elapsed)
+
+        if elapsed * 1000 < settings.sql_slow_query_ms:
+            return
+        sql_slow_statements_total.inc(route, fingerprint)
+        plan = None
+        if settings.sql_explain_slow_queries and not executemany and statement.lstrip()[:6].upper() == "SELECT":
+            try:
+                plan = _explain(conn, statement, parameters)
+            except Exception:
+                logger.exception("EXPLAIN failed for slow statement %s", fingerprint)
+        logger.warning(
+            "slow query %.1f ms route=%s fingerprint=%s params=%s\n%s%s",
+            elapsed * 1000, route, fingerprint, _param_shape(parameters, executemany),
+            _normalize(statement), f"\n{plan}" if plan else "",
+        )
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(exception_context):
+        # Keep the start-time stack balanced when a statement fails
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("statement_started"):
+            conn.info["statement_started"].pop()
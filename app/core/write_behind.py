@@ -0,0 +1,64 @@
+"""Write-behind of in-process ingest state.
+
+Ingest paths update cheap in-memory structures (dirty sets, counters) instead
+of writing extra rows per request. Each structure registers a flush callback
+here; the API lifespan runs every callback on an interval and once more at
+shutdown. A callback returns how many rows it wrote and keeps its pending
+state if it raises, so a failed flush is retried on the next round.
+Flushes run in ascending `order`: data first, then the markers (such as
+dirty users) that tell readers to look at it. Buffered rows of users deleted
+meanwhile are dropped (see lock_live_users), so one deleted user cannot make
+a flush fail forever.
+"""
+import asyncio
+import logging
+import uuid
+from typing import Awaitable, Callable, Dict, Iterable, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import Counter
+from app.models.user import User
+
+
+logger = logging.getLogger(__name__)
+
+write_behind_rows_total = Counter("write_behind_rows_total", "Rows written by write-behind flushes.", ("flush",))
+write_behind_failures_total = Counter("write_behind_failures_total", "Write-behind flushes that raised.", ("flush",))
+
+_flushes: Dict[str, Tuple[int, Callable[[], Awaitable[int]]]] = {}
+
+
+async def lock_live_users(db: AsyncSession, user_ids: Iterable[uuid.UUID]) -> Set[uuid.UUID]:
+    """The given users that still exist, locked FOR KEY SHARE so they cannot be deleted before db commits."""
+    result = await db.execute(select(User.id).where(User.id.in_(set(user_ids))).with_for_update(key_share=True))
+    return set(result.scalars())
+
+
+def register_flush(name: str, flush: Callable[[], Awaitable[int]], order: int = 0) -> None:
+    _flushes[name] = (order, flush)
+
+
+async def flush_all() -> Dict[str, int]:
+    """Run every registered flush once; failures are logged and counted, not raised."""
+    written: Dict[str, int] = {}
+    for name, (_order, flush) in sorted(_flushes.items(), key=lambda item: item[1][0]):
+        try:
+            written[name] = await flush()
+        except Exception as exc:
+            write_behind_failures_total.inc(name)
+            logger.warning("Write-behind flush %s failed: %s", name, exc)
+            continue
+        write_behind_rows_total.inc(name, amount=written[name])
+    return written
+
+
+async def run_write_behind(interval_seconds: float) -> None:
+    """Flush on an interval until cancelled, then flush once more."""
+    try:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await flush_all()
+    finally:
+        await flush_all()
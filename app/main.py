@@ -1,16 +1,51 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.core.config import settings
-from app.core.middleware import RateLimitMiddleware, sanitize_input
-from app.routes import auth, users, devices, browsing, blocked_sites, activity, reports, agent, filter, privacy, analytics
+from app.core.database import engine, read_engine, warm_pool
+from app.core.loop_monitor import loop_monitor
+from app.core.metrics import render_prometheus
+from app.core.middleware import MetricsMiddleware, RateLimitMiddleware, rate_limit_policy, rate_limiter, sanitize_input
+from app.core.write_behind import run_write_behind
+from app.tasks.retention import run_backlog_monitor
+from app.routes import auth, users, devices, browsing, blocked_sites, activity, reports, agent, filter, privacy, analytics, admin
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.loop_monitor_enabled:
+        loop_monitor.start()
+    if settings.db_pool_warmup_connections > 0:
+        await warm_pool(settings.db_pool_warmup_connections)
+    # retention runs in the worker; the backlog gauges are refreshed here, where /metrics is served
+    backlog_monitor = asyncio.create_task(run_backlog_monitor()) if settings.metrics_enabled else None
+    # persists in-process ingest state (dirty users, counters); flushes once more on cancel
+    write_behind = asyncio.create_task(run_write_behind(settings.write_behind_flush_seconds))
+    try:
+        yield
+    finally:
+        write_behind.cancel()
+        with suppress(asyncio.CancelledError):
+            await write_behind
+        if backlog_monitor is not None:
+            backlog_monitor.cancel()
+            with suppress(asyncio.CancelledError):
+                await backlog_monitor
+        await loop_monitor.stop()
+        await engine.dispose()
+        if read_engine is not engine:
+            await read_engine.dispose()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title=settings.app_name)
+    app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
-    # Rate limiting (60 requests per minute per IP)
-    app.add_middleware(RateLimitMiddleware, requests_per_minute=60)
+    # Rate limiting per device/user/IP with separate budgets per route group
+    app.add_middleware(RateLimitMiddleware, policy=rate_limit_policy, limiter=rate_limiter)
 
     # CORS
     allow_origins = [o.strip() for o in settings.cors_allow_origins.split(",") if o.strip()]
@@ -22,6 +57,10 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Request metrics (outermost, so rate-limited and CORS responses count too)
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
+
     # Mount routers under API prefix
     prefix = settings.api_prefix
     app.include_router(auth.router, prefix=prefix)
@@ -35,11 +74,17 @@ def create_app() -> FastAPI:
     app.include_router(filter.router, prefix=prefix)
     app.include_router(privacy.router, prefix=prefix)
     app.include_router(analytics.router, prefix=prefix)
+    app.include_router(admin.router, prefix=prefix)
 
     @app.get("/health")
     async def health():
         return {"success": True, "message": "ok", "data": {"service": settings.app_name}}
 
+    if settings.metrics_enabled:
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics():
+            return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
     return app
 
 
@@ -9,4 +9,9 @@ from .activity_log import ActivityLog  # noqa: F401
 from .admin_action import AdminAction  # noqa: F401
 from .ai_insight import AIInsight  # noqa: F401
 from .consent import Consent  # noqa: F401  # noqa: F401
-
+from .rate_limit_bucket import RateLimitBucket  # noqa: F401
+from .retention_checkpoint import RetentionCheckpoint  # noqa: F401
+from .insight_dirty_user import InsightDirtyUser  # noqa: F401
+from .user_focus_hourly import UserFocusHourly  # noqa: F401
+from .activity_rollup import ActivityRollupHourly  # noqa: F401
+from .distraction_sketch import DistractionSketch  # noqa: F401
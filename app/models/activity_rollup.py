@@ -0,0 +1,35 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Identity, Index, String
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class ActivityRollupHourly(Base):
+    """Visit and enforcement counts per UTC hour, device, user, domain and category (see app.services.rollups).
+
+    No foreign keys: like the raw history it summarizes, a row is removed by
+    retention, not by deleting its device or user.
+    """
+
+    __tablename__ = "activity_rollup_hourly"
+    __table_args__ = (
+        # upsert target; NULL dimensions (e.g. enforcement without a domain) still match
+        Index("ix_activity_rollup_hourly_key", "hour", "device_id", "user_id", "domain", "category", unique=True, postgresql_nulls_not_distinct=True),
+        Index("ix_activity_rollup_hourly_device_id_hour", "device_id", "hour"),
+        Index("ix_activity_rollup_hourly_user_id_hour", "user_id", "hour"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    hour: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    device_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
+    user_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
+    domain: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    category: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    visits: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    duration_seconds: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    alerts: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    blocked: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import DateTime, ForeignKey, Float, Integer, String
+from sqlalchemy import DateTime, ForeignKey, Float, Index, Integer, String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -9,6 +9,10 @@ from app.core.database import Base
 
 class AIInsight(Base):
     __tablename__ = "ai_insights"
+    __table_args__ = (
+        # one row per user; the batched refresh upserts on it
+        Index("ix_ai_insights_user_id", "user_id", unique=True),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import Boolean, DateTime, Enum as SAEnum, ForeignKey, String
+from sqlalchemy import Boolean, DateTime, Enum as SAEnum, ForeignKey, Index, String, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -23,6 +23,9 @@ class SiteCategory(str, Enum):
 
 class BlockedSite(Base):
     __tablename__ = "blocked_sites"
+    __table_args__ = (
+        Index("ix_blocked_sites_active", "is_active", postgresql_where=text("is_active")),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     url_pattern: Mapped[str] = mapped_column(String(1024), nullable=False)
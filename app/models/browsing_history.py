@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -10,6 +10,12 @@ from app.core.database import Base
 
 class BrowsingHistory(Base):
     __tablename__ = "browsing_history"
+    __table_args__ = (
+        Index("ix_browsing_history_device_id_timestamp", "device_id", "timestamp", postgresql_include=["duration_seconds"]),
+        Index("ix_browsing_history_timestamp", "timestamp"),
+        # daily partitions are managed by app.tasks.partitions
+        {"postgresql_partition_by": 'RANGE ("timestamp")'},
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     device_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("devices.id", ondelete="CASCADE"), nullable=False)
@@ -17,7 +23,7 @@ class BrowsingHistory(Base):
     domain: Mapped[str] = mapped_column(String(255), nullable=False)
     category: Mapped[str] = mapped_column(String(64), nullable=False)
     duration_seconds: Mapped[int | None] = mapped_column(Integer, nullable=True)
-    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, default=datetime.utcnow)
 
     device: Mapped["Device"] = relationship(back_populates="browsing_history")
 
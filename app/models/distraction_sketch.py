@@ -0,0 +1,21 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class DistractionSketch(Base):
+    """Space-Saving sketch of one user's alert/block domains within one UTC hour (see app.services.heavy_hitters)."""
+
+    __tablename__ = "distraction_sketches"
+    __table_args__ = (
+        Index("ix_distraction_sketches_hour", "hour"),
+    )
+
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    hour: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    sketch: Mapped[dict] = mapped_column(JSONB, nullable=False)
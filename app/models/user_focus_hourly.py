@@ -0,0 +1,23 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class UserFocusHourly(Base):
+    """One user's browsing durations and distractions within one UTC hour (see app.services.focus_stats)."""
+
+    __tablename__ = "user_focus_hourly"
+    __table_args__ = (
+        Index("ix_user_focus_hourly_hour", "hour"),
+    )
+
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    hour: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    duration_sum: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)  # seconds
+    duration_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # visits with a duration
+    distraction_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # alerts and blocks
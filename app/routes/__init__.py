@@ -1,2 +1,2 @@
-from . import auth, users, devices, browsing, blocked_sites, activity, reports, agent, filter, privacy, analytics  # noqa: F401
+from . import auth, users, devices, browsing, blocked_sites, activity, reports, agent, filter, privacy, analytics, admin  # noqa: F401
 
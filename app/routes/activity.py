@@ -4,7 +4,7 @@ from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.utils.responses import success
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.core.security import require_roles, Role
 from app.models.activity_log import ActivityLog
 from app.models.admin_action import AdminAction
@@ -14,7 +14,7 @@ router = APIRouter(prefix="/activity", tags=["activity"])
 
 
 @router.get("/logs", dependencies=[Depends(require_roles(Role.admin))])
-async def get_logs(page: int = Query(1, ge=1), size: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(get_db)):
+async def get_logs(page: int = Query(1, ge=1), size: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(get_read_db)):
     offset = (page - 1) * size
     total = (await db.execute(select(func.count()).select_from(ActivityLog))).scalar() or 0
     result = await db.execute(select(ActivityLog).order_by(ActivityLog.timestamp.desc()).offset(offset).limit(size))
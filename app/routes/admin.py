@@ -0,0 +1,56 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.core.loop_monitor import loop_monitor
+from app.core.middleware import rate_limit_policy
+from app.core.profiler import profile
+from app.core.sql_instrumentation import top_statements
+from app.core.security import require_roles, Role
+from app.utils.responses import success
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_roles(Role.admin))])
+
+_profile_lock = asyncio.Lock()
+
+
+@router.get("/rate-limits")
+async def get_rate_limits():
+    return success("ok", dict(rate_limit_policy.limits))
+
+
+@router.post("/rate-limits/reload")
+async def reload_rate_limits():
+    """Re-read rate-limit budgets from the environment/.env in this worker."""
+    return success("reloaded", rate_limit_policy.reload())
+
+
+@router.get("/sql/statements")
+async def sql_statements(limit: int = Query(20, ge=1, le=200)):
+    """Heaviest statements seen by this worker (requires SQL instrumentation)."""
+    return success("ok", top_statements(limit))
+
+
+@router.get("/loop/blocked")
+async def loop_blocked_calls():
+    """Recent event-loop stalls in this worker, with the stack that was running."""
+    return success("ok", loop_monitor.blocked_calls())
+
+
+@router.get("/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=60),
+    interval_ms: float = Query(5, ge=1, le=100),
+    memory: bool = Query(True),
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+):
+    """Sample this worker's stacks for N seconds; returns collapsed stacks and top allocations."""
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running in this worker")
+    async with _profile_lock:
+        result = await asyncio.to_thread(profile, seconds, interval_ms / 1000, memory)
+    if format == "collapsed":
+        return PlainTextResponse(result["collapsed"])
+    return success("ok", result)
@@ -1,64 +1,72 @@
 import uuid
-from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
-from app.core.security import get_current_user_claims, decode_token
+from app.core.metrics import agent_report_logs
+from app.core.security import decode_token
 from app.schemas.agent import HandshakeRequest, HandshakeResponse, AgentReportRequest, AgentConfigResponse
-from app.services.agent_comm import authenticate_agent, get_agent_config
+from app.services.agent_comm import authenticate_agent, get_agent_config, is_agent_token, resolve_agent_token
+from app.services.device_registry import get_device_entry
+from app.services.dirty_users import mark_dirty
+from app.services.focus_stats import record_browsing
+from app.services.rollups import record_visit
 from app.models.browsing_history import BrowsingHistory
-from app.models.device import Device
 from app.utils.responses import success
 
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
 
+async def agent_device_id(authorization: str = Header(None)) -> str:
+    """Resolve the calling device from its agent session token."""
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
+
+    token = authorization.split(" ")[1]
+    if is_agent_token(token):
+        device_id = resolve_agent_token(token)
+    else:
+        # JWTs handed out before compact agent tokens; accepted until they expire
+        claims = decode_token(token)
+        device_id = claims.get("device_id") or claims.get("sub")
+    if not device_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return device_id
+
+
 @router.post("/handshake", response_model=HandshakeResponse)
 async def agent_handshake(
     payload: HandshakeRequest,
     db: AsyncSession = Depends(get_db)
 ):
     """Agent registers with device_id and system_info, returns auth token."""
-    token = await authenticate_agent(payload.device_id, payload.system_info, db)
-    if not token:
+    session = await authenticate_agent(payload.device_id, payload.system_info, db, agent_version=payload.agent_version)
+    if not session:
         raise HTTPException(status_code=404, detail="Device not found or inactive")
     
-    expires_at = datetime.now(timezone.utc) + timedelta(minutes=1440)  # 24 hours
-    
     return HandshakeResponse(
-        auth_token=token,
+        auth_token=session.token,
         device_id=payload.device_id,
-        expires_at=expires_at
+        expires_at=session.expires_at
     )
 
 
 @router.post("/report")
 async def agent_report(
     payload: AgentReportRequest,
-    authorization: str = Header(None),
+    device_id: str = Depends(agent_device_id),
     db: AsyncSession = Depends(get_db)
 ):
     """Accept JSON payload of logs from agent."""
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
-    
-    token = authorization.split(" ")[1]
-    try:
-        claims = decode_token(token)
-        device_id = claims.get("device_id") or claims.get("sub")
-        if not device_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    device = await db.get(Device, uuid.UUID(device_id))
-    if not device:
-        raise HTTPException(status_code=404, detail="Device not found")
+    agent_report_logs.observe(len(payload.logs))
+    device = await get_device_entry(db, device_id)
+    if not device or not device.is_active:
+        raise HTTPException(status_code=404, detail="Device not found or inactive")
     
     # Process and store logs
     stored = []
+    visits = []
     for log in payload.logs:
         # Extract domain from URL
         domain = str(log.url).split("//", 1)[-1].split("/", 1)[0].lower()
@@ -73,6 +81,7 @@ async def agent_report(
             timestamp=log.timestamp
         )
         db.add(history)
+        visits.append(history)
         stored.append({
             "url": log.url,
             "timestamp": log.timestamp.isoformat(),
@@ -80,25 +89,20 @@ async def agent_report(
         })
     
     await db.commit()
+    for history in visits:
+        record_browsing(device.user_id, history.duration_seconds, history.timestamp)
+        record_visit(device.id, device.user_id, history.domain, history.category, history.duration_seconds, history.timestamp)
+    if stored:
+        mark_dirty(device.user_id)
     return success("logs stored", {"count": len(stored), "logs": stored})
 
 
 @router.get("/config", response_model=AgentConfigResponse)
 async def agent_config(
-    authorization: str = Header(None),
+    device_id: str = Depends(agent_device_id),
     db: AsyncSession = Depends(get_db)
 ):
     """Returns current blocklist, policy, and focus mode schedule."""
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing authorization")
-    
-    token = authorization.split(" ")[1]
-    try:
-        claims = decode_token(token)
-        device_id = claims.get("device_id") or claims.get("sub")
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
     config = await get_agent_config(device_id, db)
     return AgentConfigResponse(**config)
 
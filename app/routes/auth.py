@@ -4,7 +4,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
-from app.core.security import create_access_token, create_refresh_token, hash_password, verify_password, Role
+from app.core.security import create_access_token, create_refresh_token, hash_password_async, verify_password_async, password_needs_rehash, Role
 from app.models.user import User, UserRole
 from app.schemas.auth import RegisterRequest, LoginRequest, TokenPair, RefreshRequest
 from app.utils.responses import success
@@ -19,7 +19,7 @@ async def register(payload: RegisterRequest, db: AsyncSession = Depends(get_db))
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     role = UserRole(payload.role) if payload.role in {r.value for r in UserRole} else UserRole.student
-    user = User(id=uuid.uuid4(), name=payload.name, email=payload.email, password_hash=hash_password(payload.password), role=role)
+    user = User(id=uuid.uuid4(), name=payload.name, email=payload.email, password_hash=await hash_password_async(payload.password), role=role)
     db.add(user)
     await db.commit()
     claims = {"role": user.role.value}
@@ -33,8 +33,12 @@ async def register(payload: RegisterRequest, db: AsyncSession = Depends(get_db))
 @router.post("/login")
 async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)):
     user = (await db.execute(select(User).where(User.email == payload.email))).scalar_one_or_none()
-    if not user or not verify_password(payload.password, user.password_hash):
+    if not user or not await verify_password_async(payload.password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if password_needs_rehash(user.password_hash):
+        # Work factor changed since this hash was made; upgrade it transparently
+        user.password_hash = await hash_password_async(payload.password)
+        await db.commit()
     claims = {"role": user.role.value}
     tokens = TokenPair(
         access_token=create_access_token(str(user.id), role=user.role.value, extra_claims=claims),
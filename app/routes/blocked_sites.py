@@ -4,7 +4,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.utils.responses import success
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.core.security import require_roles, Role
 from app.models.blocked_site import BlockedSite, MatchType, SiteCategory
 from app.schemas.blocked_site import BlockedSiteCreate, BlockedSiteUpdate
@@ -14,7 +14,7 @@ router = APIRouter(prefix="/blocked-sites", tags=["blocked-sites"])
 
 
 @router.get("")
-async def list_rules(db: AsyncSession = Depends(get_db)):
+async def list_rules(db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(BlockedSite))
     items = [
         {
@@ -6,13 +6,17 @@ from sqlalchemy import select
 from app.utils.responses import success
 from app.core.database import get_db
 from app.core.security import get_current_user_claims
-from app.models.device import Device
+from app.models.activity_log import ActivityLog
 from app.models.browsing_history import BrowsingHistory
 from app.models.user import User, UserRole
 from app.schemas.browsing import BrowsingEvent
 from urllib.parse import urlsplit
-from app.services.filter_engine import evaluate_access
+from app.services.filter_engine import evaluate_access, record_enforcement
 from app.services.email_service import send_email
+from app.services.device_registry import get_device_entry
+from app.services.dirty_users import mark_dirty
+from app.services.focus_stats import record_browsing
+from app.services.rollups import record_visit
 
 
 router = APIRouter(prefix="/browsing", tags=["browsing"])
@@ -21,7 +25,7 @@ router = APIRouter(prefix="/browsing", tags=["browsing"])
 @router.post("/event")
 async def browsing_event(payload: BrowsingEvent, claims=Depends(get_current_user_claims), db: AsyncSession = Depends(get_db)):
     # Resolve device and user
-    device = await db.get(Device, payload.device_id)
+    device = await get_device_entry(db, payload.device_id)
     if not device or str(device.user_id) != claims.get("sub"):
         raise HTTPException(status_code=404, detail="Device not found")
 
@@ -46,12 +50,23 @@ async def browsing_event(payload: BrowsingEvent, claims=Depends(get_current_user
 
     # Alerts for B/C
     if evaluation.category in ("B", "C"):
+        db.add(ActivityLog(
+            action_type="alert_sent" if evaluation.category == "B" else "blocked",
+            user_id=device.user_id,
+            device_id=device.id,
+            details={"reason": evaluation.reason, "url": str(payload.url), "domain": history.domain},
+            timestamp=payload.timestamp,
+        ))
         admins = (await db.execute(select(User.email).where(User.role == UserRole.admin))).scalars().all()
         subject = f"Project Alpha Alert: Category {evaluation.category}"
         body = f"Device: {device.device_name}\nURL: {payload.url}\nReason: {evaluation.reason}\nMatched: {evaluation.matched_rule}"
         send_email(subject, admins, body, rate_key=f"alert:{device.id}:{str(payload.url)}")
 
     await db.commit()
+    record_browsing(device.user_id, payload.duration_seconds, payload.timestamp)
+    record_visit(device.id, device.user_id, history.domain, history.category, payload.duration_seconds, payload.timestamp)
+    record_enforcement(evaluation, device, device.user_id, str(payload.url), payload.timestamp)
+    mark_dirty(device.user_id)
 
     return success("evaluated", {
         "category": evaluation.category,
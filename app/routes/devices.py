@@ -3,12 +3,13 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.core.security import get_current_user_claims
 from app.models.device import Device
 from app.models.user import User, UserRole
 from app.schemas.device import DeviceCreate, DeviceOut
 from app.services.email_service import send_email
+from app.services.device_registry import forget_device, remember_device
 from app.utils.responses import success
 
 
@@ -22,6 +23,7 @@ async def register_device(payload: DeviceCreate, claims=Depends(get_current_user
     db.add(device)
     await db.commit()
     await db.refresh(device)
+    remember_device(device)
     # notify admins
     admins = (await db.execute(select(User.email).where(User.role == UserRole.admin))).scalars().all()
     send_email("Device registered", admins, f"Device {device.device_name} registered for user {user_id}", rate_key=f"device-register:{device.id}")
@@ -29,7 +31,7 @@ async def register_device(payload: DeviceCreate, claims=Depends(get_current_user
 
 
 @router.get("")
-async def list_devices(claims=Depends(get_current_user_claims), db: AsyncSession = Depends(get_db)):
+async def list_devices(claims=Depends(get_current_user_claims), db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(Device).where(Device.user_id == claims.get("sub")))
     items = [DeviceOut.model_validate(d).model_dump() for d in result.scalars().all()]
     return success("ok", items)
@@ -50,5 +52,6 @@ async def delete_device(device_id: str, claims=Depends(get_current_user_claims),
         raise HTTPException(status_code=404, detail="Device not found")
     await db.delete(device)
     await db.commit()
+    forget_device(device.id)
     return success("deleted", {"id": device_id})
 
@@ -1,5 +1,8 @@
+import base64
 import hmac
 import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, Optional
 from uuid import UUID
@@ -8,9 +11,101 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.core.config import settings
-from app.core.security import create_access_token
-from app.models.device import Device
+from app.core.metrics import register_cache_size
 from app.models.blocked_site import BlockedSite
+from app.services.device_registry import get_device_entry
+
+
+# Agent tokens look like "at1.<device uuid, b64>.<exp>.<truncated hmac>" (~60
+# bytes) instead of a JWT carrying the whole handshake. The handshake details
+# stay server side in a bounded per-worker session record keyed by device;
+# a token matching its device's record resolves without recomputing the HMAC,
+# and any other valid token (issued by another worker, or evicted) is still
+# accepted on its signature alone.
+_AGENT_TOKEN_PREFIX = "at1"
+_MAX_AGENT_SESSIONS = 50000
+
+
+@dataclass
+class AgentSession:
+    device_id: str
+    token: str
+    expires_at: datetime
+    system_info: Dict[str, Any]
+    agent_version: Optional[str] = None
+
+
+_agent_sessions: "OrderedDict[str, AgentSession]" = OrderedDict()
+register_cache_size("agent_session", lambda: len(_agent_sessions))
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign_agent_token(body: str) -> str:
+    digest = hmac.new(settings.jwt_secret.encode("utf-8"), body.encode("utf-8"), hashlib.sha256).digest()
+    return _b64(digest[:16])
+
+
+def issue_agent_token(device_id: str, expires_at: datetime) -> str:
+    body = f"{_AGENT_TOKEN_PREFIX}.{_b64(UUID(device_id).bytes)}.{int(expires_at.timestamp())}"
+    return f"{body}.{_sign_agent_token(body)}"
+
+
+def is_agent_token(token: str) -> bool:
+    return token.startswith(_AGENT_TOKEN_PREFIX + ".")
+
+
+def verify_agent_token(token: str) -> Optional[str]:
+    """Return the device id of a valid, unexpired agent token, else None."""
+    try:
+        prefix, device_part, exp_part, signature = token.split(".")
+        if prefix != _AGENT_TOKEN_PREFIX:
+            return None
+        body = f"{prefix}.{device_part}.{exp_part}"
+        if not hmac.compare_digest(_sign_agent_token(body), signature):
+            return None
+        if int(exp_part) <= datetime.now(timezone.utc).timestamp():
+            return None
+        return str(UUID(bytes=_unb64(device_part)))
+    except (ValueError, TypeError):
+        return None
+
+
+def get_agent_session(device_id: str) -> Optional[AgentSession]:
+    """Handshake record for a device, if this worker has one that is still valid."""
+    session = _agent_sessions.get(device_id)
+    if session is None:
+        return None
+    if session.expires_at <= datetime.now(timezone.utc):
+        _agent_sessions.pop(device_id, None)
+        return None
+    _agent_sessions.move_to_end(device_id)
+    return session
+
+
+def _store_agent_session(session: AgentSession) -> None:
+    _agent_sessions[session.device_id] = session
+    _agent_sessions.move_to_end(session.device_id)
+    while len(_agent_sessions) > _MAX_AGENT_SESSIONS:
+        _agent_sessions.popitem(last=False)
+
+
+def resolve_agent_token(token: str) -> Optional[str]:
+    """Device id of a valid agent token, through its session record when this worker has it."""
+    try:
+        device_id = str(UUID(bytes=_unb64(token.split(".")[1])))
+    except (ValueError, TypeError, IndexError):
+        return None
+    session = get_agent_session(device_id)
+    if session is not None and hmac.compare_digest(session.token, token):
+        return session.device_id
+    return verify_agent_token(token)
 
 
 async def validate_device_agent(device_id: str, shared_secret: str, signature: str, payload: str) -> bool:
@@ -23,23 +118,22 @@ async def validate_device_agent(device_id: str, shared_secret: str, signature: s
     return hmac.compare_digest(expected, signature)
 
 
-async def authenticate_agent(device_id: str, system_info: Dict[str, Any], db: AsyncSession) -> Optional[str]:
-    """Authenticate agent handshake and return token."""
-    device = await db.get(Device, UUID(device_id))
+async def authenticate_agent(device_id: str, system_info: Dict[str, Any], db: AsyncSession, agent_version: Optional[str] = None) -> Optional[AgentSession]:
+    """Authenticate agent handshake and open a session with a compact token."""
+    device = await get_device_entry(db, device_id)
     if not device or not device.is_active:
         return None
-    
-    # Create agent token (longer expiry for agents)
-    token = create_access_token(
-        subject=str(device.id),
-        role="agent",
-        extra_claims={
-            "device_id": str(device.id),
-            "agent": True,
-            "system_info": system_info
-        }
+
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.agent_token_expires_minutes)
+    session = AgentSession(
+        device_id=str(device.id),
+        token=issue_agent_token(str(device.id), expires_at),
+        expires_at=expires_at,
+        system_info=system_info,
+        agent_version=agent_version,
     )
-    return token
+    _store_agent_session(session)
+    return session
 
 
 async def get_agent_config(device_id: str, db: AsyncSession) -> Dict[str, Any]:
@@ -1,94 +1,72 @@
 from datetime import datetime, timedelta
-from typing import Dict, Any
-from sqlalchemy import select, func
+from typing import Any, Dict, Iterable, Optional
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.browsing_history import BrowsingHistory
-from app.models.activity_log import ActivityLog
+from app.core.database import AsyncSessionLocal
 from app.models.ai_insight import AIInsight
-from app.models.device import Device
+from app.models.user import User
+from app.services.dirty_users import claim_dirty_users
+from app.services.focus_stats import HOURS_TRACKED, user_patterns, window_totals
+
+
+RISK_LEVELS = np.array(["low", "medium", "high"])
+RISK_THRESHOLDS = (0.5, 2.0)  # risk score boundaries between the levels
+
+
+def focus_scores(avg_session_minutes, distractions_per_hour):
+    """Focus score (0-100) from the patterns; works on scalars and numpy arrays alike."""
+    # Score based on session length (longer = better, max at 60 minutes): max 50 points
+    session_score = np.minimum(np.asarray(avg_session_minutes) / 60.0 * 50, 50)
+    # Score based on distractions (fewer = better): 0/hour = 50 points, 5+/hour = 0 points
+    distraction_score = np.maximum(0, 50 - np.asarray(distractions_per_hour) * 10)
+    return np.clip(session_score + distraction_score, 0.0, 100.0)
+
+
+def risk_scores(distractions_per_hour, hour: int):
+    """Distraction risk: the distraction rate, weighted up in the afternoon peak (14:00-18:59)."""
+    time_factor = 1.2 if 14 <= hour <= 18 else 1.0
+    return np.asarray(distractions_per_hour) * time_factor
+
+
+def risk_levels(scores):
+    return RISK_LEVELS[np.digitize(scores, RISK_THRESHOLDS)]
 
 
 async def analyze_focus_patterns(user_id: str, db: AsyncSession) -> Dict[str, Any]:
-    """Compute average session length and distraction frequency for a user."""
-    # Get browsing history for last 7 days
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    
-    # Calculate average session length (duration_seconds)
-    from uuid import UUID
-    user_uuid = UUID(user_id) if isinstance(user_id, str) else user_id
-    result = await db.execute(
-        select(func.avg(BrowsingHistory.duration_seconds))
-        .where(BrowsingHistory.device_id.in_(
-            select(Device.id).where(Device.user_id == user_uuid)
-        ))
-        .where(BrowsingHistory.timestamp >= week_ago)
-        .where(BrowsingHistory.duration_seconds.isnot(None))
-    )
-    avg_duration = result.scalar() or 0
-    avg_session_length_minutes = avg_duration / 60.0
-    
-    # Count distractions (Category B/C events)
-    distraction_result = await db.execute(
-        select(func.count())
-        .select_from(ActivityLog)
-        .where(ActivityLog.user_id == user_uuid)
-        .where(ActivityLog.action_type.in_(["alert_sent", "blocked"]))
-        .where(ActivityLog.timestamp >= week_ago)
-    )
-    distraction_count = distraction_result.scalar() or 0
-    hours_tracked = 7 * 24  # 7 days
-    distractions_per_hour = distraction_count / hours_tracked if hours_tracked > 0 else 0
-    
-    return {
-        "avg_session_length_minutes": float(avg_session_length_minutes),
-        "distractions_per_hour": float(distractions_per_hour),
-        "distraction_count": int(distraction_count)
-    }
+    """
+    Compute average session length and distraction frequency for a user
+    over the last 7 days, from the hourly focus counters (at most 168 rows).
+    """
+    return await user_patterns(db, user_id)
 
 
-async def generate_focus_score(user_id: str, db: AsyncSession) -> float:
+async def generate_focus_score(user_id: str, db: AsyncSession, patterns: Optional[Dict[str, Any]] = None) -> float:
     """
     Generate a focus score (0-100) based on user behavior.
     Higher score = better focus.
     """
-    patterns = await analyze_focus_patterns(user_id, db)
-    
-    avg_session = patterns["avg_session_length_minutes"]
-    distractions_per_hour = patterns["distractions_per_hour"]
-    
-    # Score based on session length (longer = better, max at 60 minutes)
-    session_score = min(avg_session / 60.0 * 50, 50)  # Max 50 points
-    
-    # Score based on distractions (fewer = better)
-    # 0 distractions/hour = 50 points, 5+/hour = 0 points
-    distraction_score = max(0, 50 - (distractions_per_hour * 10))
-    
-    total_score = session_score + distraction_score
-    return min(100.0, max(0.0, total_score))
+    patterns = patterns or await analyze_focus_patterns(user_id, db)
+    return float(focus_scores(patterns["avg_session_length_minutes"], patterns["distractions_per_hour"]))
 
 
-async def predict_distraction(user_id: str, current_time: datetime, db: AsyncSession) -> Dict[str, Any]:
+async def predict_distraction(
+    user_id: str, current_time: datetime, db: AsyncSession, patterns: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """
     Predict likely distraction risk for a user at a given time.
     Returns risk level and prediction timestamp.
     """
-    patterns = await analyze_focus_patterns(user_id, db)
-    distractions_per_hour = patterns["distractions_per_hour"]
-    
-    # Simple prediction: higher distraction rate = higher risk
-    # Time-based: higher risk during typical distraction hours (afternoon)
-    hour = current_time.hour
-    time_factor = 1.2 if 14 <= hour <= 18 else 1.0  # Afternoon peak
-    
-    risk_score = distractions_per_hour * time_factor
+    patterns = patterns or await analyze_focus_patterns(user_id, db)
     
-    if risk_score < 0.5:
-        risk_level = "low"
-    elif risk_score < 2.0:
-        risk_level = "medium"
-    else:
-        risk_level = "high"
+    # Simple prediction: higher distraction rate = higher risk,
+    # more so during typical distraction hours (afternoon)
+    risk_score = float(risk_scores(patterns["distractions_per_hour"], current_time.hour))
+    risk_level = str(risk_levels(risk_score))
     
     # Predict next likely distraction time (simple: +1 hour from now if high risk)
     next_prediction = current_time + timedelta(hours=1) if risk_level == "high" else None
@@ -100,37 +78,102 @@ async def predict_distraction(user_id: str, current_time: datetime, db: AsyncSes
     }
 
 
+def _upsert_insights():
+    """INSERT into ai_insights that overwrites the scores of an existing row for the user."""
+    statement = insert(AIInsight)
+    return statement.on_conflict_do_update(
+        index_elements=[AIInsight.user_id],
+        set_={
+            name: statement.excluded[name]
+            for name in ("focus_score", "distractions_per_hour", "next_prediction", "avg_session_length_minutes", "updated_at")
+        },
+    )
+
+
 async def update_ai_insights(user_id: str, db: AsyncSession) -> AIInsight:
     """Update or create AI insights for a user."""
-    from uuid import UUID
     user_uuid = UUID(user_id) if isinstance(user_id, str) else user_id
     patterns = await analyze_focus_patterns(user_id, db)
-    focus_score = await generate_focus_score(user_id, db)
-    prediction = await predict_distraction(user_id, datetime.utcnow(), db)
-    
-    # Get or create insight
-    result = await db.execute(
-        select(AIInsight).where(AIInsight.user_id == user_uuid)
+    focus_score = await generate_focus_score(user_id, db, patterns)
+    prediction = await predict_distraction(user_id, datetime.utcnow(), db, patterns)
+
+    # Upsert, so two first-time requests for the same user cannot both insert
+    statement = _upsert_insights().values(
+        user_id=user_uuid,
+        focus_score=focus_score,
+        distractions_per_hour=patterns["distractions_per_hour"],
+        next_prediction=prediction["next_prediction"],
+        avg_session_length_minutes=patterns["avg_session_length_minutes"],
+        updated_at=datetime.utcnow(),
     )
-    insight = result.scalar_one_or_none()
-    
-    if insight:
-        insight.focus_score = focus_score
-        insight.distractions_per_hour = patterns["distractions_per_hour"]
-        insight.next_prediction = prediction["next_prediction"]
-        insight.avg_session_length_minutes = patterns["avg_session_length_minutes"]
-        insight.updated_at = datetime.utcnow()
-    else:
-        insight = AIInsight(
-            user_id=user_uuid,
-            focus_score=focus_score,
-            distractions_per_hour=patterns["distractions_per_hour"],
-            next_prediction=prediction["next_prediction"],
-            avg_session_length_minutes=patterns["avg_session_length_minutes"]
-        )
-        db.add(insight)
-    
+    result = await db.execute(statement.returning(AIInsight), execution_options={"populate_existing": True})
+    insight = result.scalar_one()
     await db.commit()
-    await db.refresh(insight)
     return insight
 
+
+async def refresh_all_insights(db: AsyncSession, user_ids: Optional[Iterable[UUID]] = None, now: Optional[datetime] = None) -> int:
+    """
+    Recompute AI insights for every user (or just user_ids) in one pass.
+
+    Two set-based queries (users, window totals per user from the hourly
+    focus counters), scores computed over numpy arrays, and one bulk upsert
+    on ai_insights.user_id. Gives the same results as update_ai_insights per
+    user. Returns the number of insights written.
+    """
+    now = now or datetime.utcnow()
+    wanted = list(user_ids) if user_ids is not None else None
+
+    users_query = select(User.id)
+    if wanted is not None:
+        users_query = users_query.where(User.id.in_(wanted))
+    users = (await db.execute(users_query)).scalars().all()
+    if not users:
+        return 0
+
+    totals = await window_totals(db, now, wanted)
+    # columns: duration sum, duration count, distraction count
+    window = np.array([totals.get(u, (0, 0, 0)) for u in users], dtype=float).reshape(len(users), 3)
+    avg_minutes = np.divide(window[:, 0], window[:, 1], out=np.zeros(len(users)), where=window[:, 1] > 0) / 60.0
+    per_hour = window[:, 2] / HOURS_TRACKED
+    scores = focus_scores(avg_minutes, per_hour)
+    high_risk = risk_levels(risk_scores(per_hour, now.hour)) == "high"
+    next_prediction = now + timedelta(hours=1)
+
+    rows = [
+        {
+            "user_id": user,
+            "focus_score": float(scores[i]),
+            "distractions_per_hour": float(per_hour[i]),
+            "next_prediction": next_prediction if high_risk[i] else None,
+            "avg_session_length_minutes": float(avg_minutes[i]),
+            "updated_at": now,
+        }
+        for i, user in enumerate(users)
+    ]
+    statement = _upsert_insights()
+    # executemany: SQLAlchemy sends these as multi-row INSERTs, a page at a time
+    await db.execute(statement, rows)
+    await db.commit()
+    return len(rows)
+
+
+async def refresh_dirty_insights(batch_size: int = 5000) -> int:
+    """
+    Refresh insights only for users marked dirty since their last refresh.
+
+    Claims and refreshes batch_size users per transaction until none are left.
+    Returns the number of insights written.
+    """
+    refreshed = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            users = await claim_dirty_users(db, batch_size)
+            if not users:
+                await db.rollback()
+                break
+            # commits the claim together with the new insights
+            refreshed += await refresh_all_insights(db, users)
+        if len(users) < batch_size:
+            break
+    return refreshed
@@ -0,0 +1,85 @@
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import cache_requests_total, register_cache_size
+from app.models.device import Device
+
+
+# Lazily loaded device_id -> owner/active lookups for the ingestion paths.
+# Entries are refreshed after a TTL so changes made by other workers show up.
+_MAX_DEVICES = 100000
+_entry_ttl_seconds = 300
+
+
+@dataclass(frozen=True)
+class DeviceEntry:
+    id: uuid.UUID
+    user_id: uuid.UUID
+    device_name: str
+    is_active: bool
+
+
+_registry: "OrderedDict[uuid.UUID, tuple[DeviceEntry, float]]" = OrderedDict()
+register_cache_size("device", lambda: len(_registry))
+
+
+def _as_uuid(device_id: Union[str, uuid.UUID]) -> Optional[uuid.UUID]:
+    if isinstance(device_id, uuid.UUID):
+        return device_id
+    try:
+        return uuid.UUID(str(device_id))
+    except ValueError:
+        return None
+
+
+def remember_device(device: Device) -> DeviceEntry:
+    """Store (or replace) the registry entry for a freshly loaded/changed device."""
+    entry = DeviceEntry(
+        id=_as_uuid(device.id),
+        user_id=device.user_id,
+        device_name=device.device_name,
+        is_active=bool(device.is_active),
+    )
+    _registry[entry.id] = (entry, time.monotonic())
+    _registry.move_to_end(entry.id)
+    while len(_registry) > _MAX_DEVICES:
+        _registry.popitem(last=False)
+    return entry
+
+
+def forget_device(device_id: Union[str, uuid.UUID]) -> None:
+    """Invalidate a device after it is deleted or (de)activated."""
+    key = _as_uuid(device_id)
+    if key is not None:
+        _registry.pop(key, None)
+
+
+def clear_registry() -> None:
+    _registry.clear()
+
+
+async def get_device_entry(db: AsyncSession, device_id: Union[str, uuid.UUID]) -> Optional[DeviceEntry]:
+    """Return the cached entry for device_id, loading it from the DB on a miss."""
+    key = _as_uuid(device_id)
+    if key is None:
+        return None
+
+    cached = _registry.get(key)
+    if cached is not None:
+        entry, loaded_at = cached
+        if time.monotonic() - loaded_at < _entry_ttl_seconds:
+            _registry.move_to_end(key)
+            cache_requests_total.inc("device", "hit")
+            return entry
+        del _registry[key]
+
+    cache_requests_total.inc("device", "miss")
+    device = await db.get(Device, key)
+    if not device:
+        return None
+    return remember_device(device)
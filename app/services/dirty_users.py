@@ -0,0 +1,76 @@
+"""Users whose AI insights are out of date.
+
+Ingest paths call mark_dirty(), which only adds to an in-process set. The
+write-behind flush moves the set into insight_dirty_users, where the
+scheduler's incremental refresh claims users in batches. Claiming deletes
+the rows inside the refresh transaction, so a failed refresh leaves them
+marked, and a user marked again meanwhile is simply flushed back in.
+"""
+import uuid
+from datetime import datetime, timezone
+from typing import List, Set, Union
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import register_cache_size
+from app.core.write_behind import lock_live_users, register_flush
+from app.models.insight_dirty_user import InsightDirtyUser
+
+
+_dirty: Set[uuid.UUID] = set()
+register_cache_size("insight_dirty_users", lambda: len(_dirty))
+
+
+def mark_dirty(user_id: Union[str, uuid.UUID, None]) -> None:
+    if user_id is None:
+        return
+    _dirty.add(user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id)))
+
+
+async def flush_dirty_users() -> int:
+    """Persist the users marked since the last flush; returns how many."""
+    global _dirty
+    if not _dirty:
+        return 0
+    pending, _dirty = _dirty, set()
+    now = datetime.now(timezone.utc)
+    statement = insert(InsightDirtyUser)
+    statement = statement.on_conflict_do_update(index_elements=[InsightDirtyUser.user_id], set_={"marked_at": statement.excluded.marked_at})
+    try:
+        async with AsyncSessionLocal() as db:
+            live = await lock_live_users(db, pending)
+            if live:
+                await db.execute(statement, [{"user_id": user_id, "marked_at": now} for user_id in live])
+            await db.commit()
+    except Exception:
+        _dirty |= pending
+        raise
+    return len(live)
+
+
+async def claim_dirty_users(db: AsyncSession, limit: int) -> List[uuid.UUID]:
+    """Remove up to `limit` users from the table (oldest marks first) and return them.
+
+    The delete is part of db's transaction: it takes effect when the caller
+    commits. Rows claimed by a concurrent refresh are skipped.
+    """
+    oldest = (
+        select(InsightDirtyUser.user_id)
+        .order_by(InsightDirtyUser.marked_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(InsightDirtyUser)
+        .where(InsightDirtyUser.user_id.in_(oldest))
+        .returning(InsightDirtyUser.user_id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(result.scalars())
+
+
+# after the focus counters, so a claimed user's new activity is already persisted
+register_flush("insight_dirty_users", flush_dirty_users, order=10)
@@ -5,6 +5,7 @@ from email.mime.multipart import MIMEMultipart
 from typing import Iterable, Optional
 
 from app.core.config import settings
+from app.core.metrics import email_send_seconds
 
 
 _last_sent: dict[tuple[str, str], float] = {}
@@ -26,6 +27,17 @@ def send_email(subject: str, recipients: Iterable[str], body: str, html: Optiona
     if not recipients:
         return False
 
+    started = time.perf_counter()
+    outcome = "failed"
+    try:
+        outcome = _deliver(subject, recipients, body, html, rate_key)
+        return outcome != "failed"
+    finally:
+        email_send_seconds.observe(time.perf_counter() - started, outcome)
+
+
+def _deliver(subject: str, recipients: list[str], body: str, html: Optional[str], rate_key: Optional[str]) -> str:
+    """Send to each recipient not rate limited; returns "sent", "rate_limited" (nobody left) or "failed"."""
     msg = MIMEMultipart("alternative")
     msg["Subject"] = subject
     msg["From"] = settings.email_from
@@ -41,11 +53,13 @@ def send_email(subject: str, recipients: Iterable[str], body: str, html: Optiona
             if settings.email_user and settings.email_pass:
                 server.login(settings.email_user, settings.email_pass)
             # simple rate limiting per recipient and key
+            delivered = 0
             for r in recipients:
                 if rate_key and _should_rate_limit(r, rate_key):
                     continue
                 server.sendmail(settings.email_from, r, msg.as_string())
-        return True
+                delivered += 1
+        return "sent" if delivered else "rate_limited"
     except Exception:
-        return False
+        return "failed"
 
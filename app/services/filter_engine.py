@@ -2,22 +2,28 @@ import re
 import socket
 from dataclasses import dataclass
 from datetime import datetime, time
+from time import perf_counter
 from typing import Any, Dict, Optional
 from urllib.parse import urlparse
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.metrics import cache_requests_total, filter_evaluate_seconds, register_cache_size
 from app.models.blocked_site import BlockedSite, MatchType, SiteCategory
 from app.models.device import Device
 from app.models.activity_log import ActivityLog
 from app.models.admin_action import AdminAction
 from app.models.browsing_history import BrowsingHistory
 from app.services.email_service import send_email
+from app.services.focus_stats import record_distraction
+from app.services.heavy_hitters import record_distraction_domain
+from app.services.rollups import record_action
 
 # Simple in-memory cache (can be replaced with Redis)
 _classification_cache: Dict[str, tuple] = {}
 _cache_ttl_seconds = 300  # 5 minutes
+register_cache_size("classification", lambda: len(_classification_cache))
 
 
 @dataclass
@@ -100,6 +106,13 @@ def _within_block_hours(now: datetime) -> bool:
 
 
 async def evaluate_access(db: AsyncSession, device: Device, url: str, metadata: Dict[str, Any]) -> EvaluationResult:
+    started = perf_counter()
+    result = await _evaluate_access(db, device, url, metadata)
+    filter_evaluate_seconds.observe(perf_counter() - started, result.category)
+    return result
+
+
+async def _evaluate_access(db: AsyncSession, device: Device, url: str, metadata: Dict[str, Any]) -> EvaluationResult:
     domain = _extract_domain(url)
 
     # Confidence/category mapping via blocked_sites
@@ -123,18 +136,20 @@ async def evaluate_access(db: AsyncSession, device: Device, url: str, metadata:
 
 
 async def enforce_action(db: AsyncSession, evaluation: EvaluationResult, device: Device, user_id: Optional[str], url: Optional[str] = None, timestamp: Optional[datetime] = None) -> Dict[str, Any]:
-    # Persist browsing history entry
-    domain = _extract_domain(evaluation.matched_rule.get("pattern") if evaluation.matched_rule else "")
+    # The visited site, recorded with alerts and blocks
+    domain = _extract_domain(url) if url else None
 
     # No URL provided here; caller should have already created browsing history with real URL.
     # We only handle activity logs and admin actions plus return directive.
+    # The caller commits, then calls record_enforcement() and marks the user dirty.
+
     if evaluation.category == "A":
         await db.merge(ActivityLog(action_type="visit", user_id=user_id, device_id=device.id, details={"category": "A"}))
         await db.flush()
         return {"allowed": True}
 
     if evaluation.category == "B":
-        await db.merge(ActivityLog(action_type="alert_sent", user_id=user_id, device_id=device.id, details={"reason": evaluation.reason}))
+        await db.merge(ActivityLog(action_type="alert_sent", user_id=user_id, device_id=device.id, details={"reason": evaluation.reason, "url": url, "domain": domain}))
         # Notify admins for MVP
         from app.models.user import User, UserRole
         admins = (await db.execute(select(User.email).where(User.role == UserRole.admin))).scalars().all()
@@ -145,7 +160,7 @@ async def enforce_action(db: AsyncSession, evaluation: EvaluationResult, device:
         return {"allowed": True, "alert": True}
 
     if evaluation.category == "C":
-        await db.merge(ActivityLog(action_type="blocked", user_id=user_id, device_id=device.id, details={"reason": evaluation.reason}))
+        await db.merge(ActivityLog(action_type="blocked", user_id=user_id, device_id=device.id, details={"reason": evaluation.reason, "url": url, "domain": domain}))
         from app.models.user import User, UserRole
         admin_obj = (await db.execute(select(User).where(User.role == UserRole.admin))).scalars().first()
         admin_id = admin_obj.id if admin_obj else None
@@ -161,6 +176,17 @@ async def enforce_action(db: AsyncSession, evaluation: EvaluationResult, device:
     return {"allowed": True}
 
 
+def record_enforcement(evaluation: EvaluationResult, device: Device, user_id: Optional[str], url: Optional[str] = None, timestamp: Optional[datetime] = None) -> None:
+    """Feed an alert or block to the in-process stats; call once its activity log row is committed."""
+    if evaluation.category not in ("B", "C"):
+        return
+    domain = _extract_domain(url) if url else None
+    record_action("alert_sent" if evaluation.category == "B" else "blocked", device.id, user_id, domain, timestamp)
+    # alerts and blocks count as distractions in the user's insights; top distractions read the sketches
+    record_distraction(user_id, timestamp)
+    record_distraction_domain(user_id, domain, timestamp)
+
+
 async def classify_request(db: AsyncSession, url: str, user_id: str) -> Dict[str, Any]:
     """
     Classify a URL request into category A, B, or C.
@@ -171,7 +197,9 @@ async def classify_request(db: AsyncSession, url: str, user_id: str) -> Dict[str
     if cache_key in _classification_cache:
         cached_result, cached_time = _classification_cache[cache_key]
         if (datetime.utcnow() - cached_time).total_seconds() < _cache_ttl_seconds:
+            cache_requests_total.inc("classification", "hit")
             return cached_result
+    cache_requests_total.inc("classification", "miss")
     
     domain = _extract_domain(url)
     timestamp = datetime.utcnow()
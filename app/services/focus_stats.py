@@ -0,0 +1,166 @@
+"""Rolling per-user focus statistics in hourly bins.
+
+The last WINDOW_DAYS of each user's activity is kept as one user_focus_hourly
+row per active UTC hour: the sum and count of browsing durations and the
+number of distractions (alerts and blocks). Ingest paths add to an in-process
+buffer; the write-behind loop flushes it as additive upserts, so any number
+of API processes can feed the same bins. Reading a user's patterns sums at
+most WINDOW_DAYS * 24 rows by primary key, however large the raw history
+tables grow. Bins are whole hours, so the window starts at the top of the
+hour WINDOW_DAYS ago.
+"""
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import register_cache_size
+from app.core.write_behind import lock_live_users, register_flush
+from app.models.user_focus_hourly import UserFocusHourly
+
+
+WINDOW_DAYS = 7
+HOURS_TRACKED = WINDOW_DAYS * 24
+
+UserId = Union[str, uuid.UUID]
+
+
+@dataclass
+class HourBin:
+    duration_sum: int = 0
+    duration_count: int = 0
+    distraction_count: int = 0
+
+    def merge(self, other: "HourBin") -> None:
+        self.duration_sum += other.duration_sum
+        self.duration_count += other.duration_count
+        self.distraction_count += other.distraction_count
+
+
+# increments not yet flushed, per (user, hour)
+_pending: Dict[Tuple[uuid.UUID, datetime], HourBin] = {}
+register_cache_size("focus_stats_pending", lambda: len(_pending))
+
+
+def hour_of(timestamp: Optional[datetime]) -> datetime:
+    """Start of the UTC hour holding timestamp (naive timestamps are UTC, None is now)."""
+    if timestamp is None:
+        timestamp = datetime.now(timezone.utc)
+    elif timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def window_start(now: Optional[datetime] = None) -> datetime:
+    return hour_of((now or datetime.now(timezone.utc)) - timedelta(days=WINDOW_DAYS))
+
+
+def _bin(user_id: UserId, timestamp: Optional[datetime]) -> HourBin:
+    key = (user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id)), hour_of(timestamp))
+    hour_bin = _pending.get(key)
+    if hour_bin is None:
+        hour_bin = _pending[key] = HourBin()
+    return hour_bin
+
+
+def record_browsing(user_id: Optional[UserId], duration_seconds: Optional[int], timestamp: Optional[datetime] = None) -> None:
+    """Count a visit's duration; visits without one do not affect the averages."""
+    if user_id is None or duration_seconds is None:
+        return
+    hour_bin = _bin(user_id, timestamp)
+    hour_bin.duration_sum += duration_seconds
+    hour_bin.duration_count += 1
+
+
+def record_distraction(user_id: Optional[UserId], timestamp: Optional[datetime] = None) -> None:
+    if user_id is None:
+        return
+    _bin(user_id, timestamp).distraction_count += 1
+
+
+async def flush_focus_stats() -> int:
+    """Add the buffered increments to user_focus_hourly; returns the number of bins written."""
+    global _pending
+    if not _pending:
+        return 0
+    pending, _pending = _pending, {}
+    statement = insert(UserFocusHourly)
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserFocusHourly.user_id, UserFocusHourly.hour],
+        set_={
+            name: getattr(UserFocusHourly, name) + statement.excluded[name]
+            for name in ("duration_sum", "duration_count", "distraction_count")
+        },
+    )
+    try:
+        async with AsyncSessionLocal() as db:
+            live = await lock_live_users(db, (user_id for user_id, _hour in pending))
+            rows = [
+                {"user_id": user_id, "hour": hour, "duration_sum": hour_bin.duration_sum,
+                 "duration_count": hour_bin.duration_count, "distraction_count": hour_bin.distraction_count}
+                for (user_id, hour), hour_bin in pending.items()
+                if user_id in live
+            ]
+            if rows:
+                await db.execute(statement, rows)
+            await db.commit()
+    except Exception:
+        for key, hour_bin in pending.items():
+            _pending.setdefault(key, HourBin()).merge(hour_bin)
+        raise
+    return len(rows)
+
+
+def patterns_from_totals(duration_sum: float, duration_count: float, distraction_count: float) -> Dict[str, Any]:
+    """The analyze_focus_patterns result for one user's window totals."""
+    avg_duration = duration_sum / duration_count if duration_count else 0
+    return {
+        "avg_session_length_minutes": float(avg_duration / 60.0),
+        "distractions_per_hour": float(distraction_count / HOURS_TRACKED),
+        "distraction_count": int(distraction_count),
+    }
+
+
+def _totals_query(now: Optional[datetime]):
+    return (
+        select(
+            UserFocusHourly.user_id,
+            func.coalesce(func.sum(UserFocusHourly.duration_sum), 0),
+            func.coalesce(func.sum(UserFocusHourly.duration_count), 0),
+            func.coalesce(func.sum(UserFocusHourly.distraction_count), 0),
+        )
+        .where(UserFocusHourly.hour >= window_start(now))
+        .group_by(UserFocusHourly.user_id)
+    )
+
+
+async def user_patterns(db: AsyncSession, user_id: UserId, now: Optional[datetime] = None) -> Dict[str, Any]:
+    user_uuid = user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id))
+    row = (await db.execute(_totals_query(now).where(UserFocusHourly.user_id == user_uuid))).first()
+    return patterns_from_totals(*row[1:]) if row else patterns_from_totals(0, 0, 0)
+
+
+async def window_totals(
+    db: AsyncSession, now: Optional[datetime] = None, user_ids: Optional[Iterable[uuid.UUID]] = None
+) -> Dict[uuid.UUID, Tuple[int, int, int]]:
+    """(duration_sum, duration_count, distraction_count) per user with activity in the window."""
+    query = _totals_query(now)
+    if user_ids is not None:
+        query = query.where(UserFocusHourly.user_id.in_(list(user_ids)))
+    return {user_id: (int(total), int(count), int(distractions)) for user_id, total, count, distractions in await db.execute(query)}
+
+
+async def prune_focus_stats(now: Optional[datetime] = None) -> int:
+    """Delete bins that have left the window."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(delete(UserFocusHourly).where(UserFocusHourly.hour < window_start(now)))
+        await db.commit()
+    return result.rowcount
+
+
+register_flush("focus_stats", flush_focus_stats)
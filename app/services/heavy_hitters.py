@@ -0,0 +1,221 @@
+"""Top distracting domains per user, from streaming heavy-hitter sketches.
+
+Each alert or block adds its domain to a Space-Saving sketch for the user and
+UTC hour. Sketches are buffered in process and merged into
+distraction_sketches by the write-behind loop; a window's top-K merges the
+user's hourly sketches (at most one per hour) without touching raw logs.
+Hours with no sketch yet (history from before sketches existed) fall back
+to the exact per-domain counts in the hourly rollups.
+"""
+import heapq
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import register_cache_size
+from app.core.write_behind import lock_live_users, register_flush
+from app.models.activity_rollup import ActivityRollupHourly
+from app.models.distraction_sketch import DistractionSketch
+from app.services.focus_stats import hour_of
+
+
+UserId = Union[str, uuid.UUID]
+
+
+class SpaceSaving:
+    """Space-Saving (Metwally et al.): approximate top items of a stream in O(capacity) memory.
+
+    At most `capacity` items are monitored. A new item evicts the one with the
+    smallest count and inherits that count as its possible overestimate
+    (error), so every count is an upper bound within `error` of the truth and
+    any item seen more than total / capacity times is monitored.
+    """
+
+    def __init__(self, capacity: int = 32):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.total = 0
+        self._heap: List[Tuple[int, str]] = []  # (count, item), with stale entries skipped lazily
+
+    def add(self, item: str, count: int = 1) -> None:
+        self.total += count
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            floor, victim = self._pop_min()
+            del self.counts[victim], self.errors[victim]
+            self.counts[item] = floor + count
+            self.errors[item] = floor
+        heapq.heappush(self._heap, (self.counts[item], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild()
+
+    def merge(self, other: "SpaceSaving") -> None:
+        """Combine with another sketch (Agarwal et al., mergeable summaries), keeping the `capacity` largest.
+
+        An item missing from a full sketch may still have occurred there up to
+        that sketch's smallest count times, so it gets that much added to both
+        its count and its error; counts stay upper bounds within error of the truth.
+        """
+        own_floor, other_floor = self._floor(), other._floor()
+        self.total += other.total
+        for item in self.counts:
+            if item not in other.counts:
+                self.counts[item] += other_floor
+                self.errors[item] += other_floor
+        for item, count in other.counts.items():
+            if item in self.counts:
+                self.counts[item] += count
+                self.errors[item] += other.errors[item]
+            else:
+                self.counts[item] = own_floor + count
+                self.errors[item] = own_floor + other.errors[item]
+        if len(self.counts) > self.capacity:
+            keep = heapq.nlargest(self.capacity, self.counts, key=self.counts.__getitem__)
+            self.counts = {item: self.counts[item] for item in keep}
+            self.errors = {item: self.errors[item] for item in keep}
+        self._rebuild()
+
+    def top(self, n: int) -> List[Tuple[str, int, int]]:
+        """The n items with the largest counts, as (item, count, error)."""
+        return [(item, self.counts[item], self.errors[item]) for item in heapq.nlargest(n, self.counts, key=self.counts.__getitem__)]
+
+    def _floor(self) -> int:
+        """Most times an unmonitored item can have occurred: the smallest count once full, else 0."""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def _pop_min(self) -> Tuple[int, str]:
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return count, item
+
+    def _rebuild(self) -> None:
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"capacity": self.capacity, "total": self.total, "items": {item: [self.counts[item], self.errors[item]] for item in self.counts}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SpaceSaving":
+        sketch = cls(data["capacity"])
+        sketch.total = data["total"]
+        for item, (count, error) in data["items"].items():
+            sketch.counts[item] = count
+            sketch.errors[item] = error
+        sketch._rebuild()
+        return sketch
+
+
+# sketches not yet flushed, per (user, hour)
+_pending: Dict[Tuple[uuid.UUID, datetime], SpaceSaving] = {}
+register_cache_size("distraction_sketches_pending", lambda: len(_pending))
+
+
+def record_distraction_domain(user_id: Optional[UserId], domain: Optional[str], timestamp: Optional[datetime] = None) -> None:
+    if user_id is None or not domain:
+        return
+    key = (user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id)), hour_of(timestamp))
+    sketch = _pending.get(key)
+    if sketch is None:
+        sketch = _pending[key] = SpaceSaving(settings.heavy_hitters_capacity)
+    sketch.add(domain)
+
+
+async def flush_sketches() -> int:
+    """Merge the buffered sketches into distraction_sketches; returns the number of sketches written.
+
+    Rows are created empty if missing, then locked in key order and merged,
+    so concurrent flushes from several processes serialize per row instead
+    of losing updates.
+    """
+    global _pending
+    if not _pending:
+        return 0
+    pending, _pending = _pending, {}
+    try:
+        async with AsyncSessionLocal() as db:
+            live = await lock_live_users(db, (user_id for user_id, _hour in pending))
+            keys = sorted(key for key in pending if key[0] in live)
+            if not keys:
+                await db.commit()
+                return 0
+            empty = SpaceSaving(settings.heavy_hitters_capacity).to_dict()
+            await db.execute(
+                insert(DistractionSketch).on_conflict_do_nothing(),
+                [{"user_id": user_id, "hour": hour, "sketch": empty} for user_id, hour in keys],
+            )
+            rows = await db.execute(
+                select(DistractionSketch)
+                .where(tuple_(DistractionSketch.user_id, DistractionSketch.hour).in_(keys))
+                .order_by(DistractionSketch.user_id, DistractionSketch.hour)
+                .with_for_update()
+            )
+            for row in rows.scalars():
+                sketch = SpaceSaving.from_dict(row.sketch)
+                sketch.merge(pending[(row.user_id, row.hour)])
+                row.sketch = sketch.to_dict()
+            await db.commit()
+    except Exception:
+        for key, sketch in pending.items():
+            _pending.setdefault(key, SpaceSaving(sketch.capacity)).merge(sketch)
+        raise
+    return len(keys)
+
+
+async def top_distractions(
+    db: AsyncSession, user_id: UserId, window_hours: int, k: int = 3, now: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """The user's k most frequent alert/block domains over the last window_hours hours (current hour included)."""
+    user_uuid = user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id))
+    since = hour_of(now) - timedelta(hours=window_hours - 1)
+    rows = await db.execute(
+        select(DistractionSketch.hour, DistractionSketch.sketch)
+        .where(DistractionSketch.user_id == user_uuid, DistractionSketch.hour >= since)
+    )
+    merged = SpaceSaving(settings.heavy_hitters_capacity)
+    covered = set()
+    for hour, data in rows:
+        merged.merge(SpaceSaving.from_dict(data))
+        covered.add(hour)
+
+    # hours without a sketch: exact counts from the rollups (the largest fit the sketch without eviction)
+    distractions = func.sum(ActivityRollupHourly.alerts + ActivityRollupHourly.blocked)
+    fallback = (
+        select(ActivityRollupHourly.domain, distractions)
+        .where(ActivityRollupHourly.user_id == user_uuid, ActivityRollupHourly.hour >= since)
+        .where(ActivityRollupHourly.domain.isnot(None), ActivityRollupHourly.alerts + ActivityRollupHourly.blocked > 0)
+        .group_by(ActivityRollupHourly.domain)
+        .order_by(distractions.desc())
+        .limit(settings.heavy_hitters_capacity)
+    )
+    if covered:
+        fallback = fallback.where(ActivityRollupHourly.hour.notin_(covered))
+    exact = SpaceSaving(settings.heavy_hitters_capacity)
+    for domain, count in await db.execute(fallback):
+        exact.add(domain, int(count))
+    merged.merge(exact)
+
+    return [{"domain": domain, "count": count} for domain, count, _error in merged.top(k)]
+
+
+async def prune_sketches(cutoff: datetime) -> int:
+    """Delete sketches for hours entirely before cutoff."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(delete(DistractionSketch).where(DistractionSketch.hour < hour_of(cutoff)))
+        await db.commit()
+    return result.rowcount
+
+
+register_flush("distraction_sketches", flush_sketches)
@@ -0,0 +1,297 @@
+"""Columnar archive of expired history rows.
+
+Rows past retention are streamed out of Postgres into zstd-compressed Parquet
+files before they are deleted. Layout under settings.log_archive_dir:
+
+    <table>/manifest.json
+    <table>/day=YYYY-MM-DD/device=<uuid or none>/part-<run>.parquet
+
+The manifest is the source of truth: it lists every complete file and the
+cutoff the archive is complete up to ("archived_through"), so a rerun after a
+failed delete does not archive the same rows twice. Files not in the manifest
+are leftovers of an interrupted run and are removed by the next one.
+
+pyarrow is an optional dependency, imported only when archiving or reading.
+"""
+import json
+import logging
+import os
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import engine
+from app.tasks.pacing import BatchPacer
+
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = {
+    "browsing_history": ("id", "device_id", "url", "domain", "category", "duration_seconds", "timestamp"),
+    "activity_logs": ("id", "user_id", "device_id", "action_type", "details", "timestamp"),
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:  # pragma: no cover - depends on the environment
+        raise RuntimeError("Log archiving needs pyarrow (pip install pyarrow)") from exc
+    return pyarrow, pyarrow.parquet
+
+
+def _schema(table: str):
+    pa, _ = _pyarrow()
+    types = {
+        "id": pa.string(),
+        "user_id": pa.string(),
+        "device_id": pa.string(),
+        "url": pa.string(),
+        "domain": pa.string(),
+        "category": pa.string(),
+        "duration_seconds": pa.int32(),
+        "action_type": pa.string(),
+        "details": pa.string(),  # JSON text
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }
+    return pa.schema([(name, types[name]) for name in COLUMNS[table]])
+
+
+def _archive_value(value: Any) -> Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, dict):
+        return json.dumps(value, separators=(",", ":"), default=str)
+    return value
+
+
+def _manifest_path(root: Path) -> Path:
+    return root / "manifest.json"
+
+
+def load_manifest(table: str, archive_dir: Optional[str] = None) -> Dict[str, Any]:
+    path = _manifest_path(Path(archive_dir or settings.log_archive_dir) / table)
+    if not path.exists():
+        return {"table": table, "archived_through": None, "files": []}
+    return json.loads(path.read_text())
+
+
+def _save_manifest(root: Path, manifest: Dict[str, Any]) -> None:
+    path = _manifest_path(root)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def _remove_orphans(root: Path, manifest: Dict[str, Any]) -> None:
+    known = {entry["path"] for entry in manifest["files"]}
+    for path in root.glob("day=*/device=*/*.parquet*"):
+        if str(path.relative_to(root)) not in known:
+            path.unlink()
+
+
+class ArchiveWriter:
+    """Writes rows, grouped by (UTC day, device) in arrival order, to Parquet files.
+
+    Rows are expected sorted by day and device; each change of group closes the
+    current file. At most batch_rows rows are buffered at a time.
+    """
+
+    def __init__(self, table: str, root: Path, run: str, batch_rows: int = 50_000):
+        self.table = table
+        self.root = root
+        self.run = run
+        self.batch_rows = batch_rows
+        self.schema = _schema(table)
+        self.entries: List[Dict[str, Any]] = []
+        self._key = None
+        self._writer = None
+        self._path: Optional[Path] = None
+        self._buffer: List[Dict[str, Any]] = []
+        self._rows = 0
+        self._min: Optional[datetime] = None
+        self._max: Optional[datetime] = None
+
+    def add(self, row: Mapping[str, Any]) -> None:
+        timestamp = row["timestamp"].astimezone(timezone.utc)
+        device_id = row["device_id"]
+        key = (timestamp.date(), str(device_id) if device_id is not None else "none")
+        if key != self._key:
+            self._close_file()
+            self._key = key
+        self._buffer.append({name: _archive_value(row[name]) for name in COLUMNS[self.table]})
+        self._rows += 1
+        self._min = timestamp if self._min is None else min(self._min, timestamp)
+        self._max = timestamp if self._max is None else max(self._max, timestamp)
+        if len(self._buffer) >= self.batch_rows:
+            self._flush()
+
+    def close(self) -> List[Dict[str, Any]]:
+        self._close_file()
+        return self.entries
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        pa, pq = _pyarrow()
+        if self._writer is None:
+            day, device = self._key
+            directory = self.root / f"day={day.isoformat()}" / f"device={device}"
+            directory.mkdir(parents=True, exist_ok=True)
+            self._path = directory / f"part-{self.run}.parquet"
+            self._writer = pq.ParquetWriter(str(self._path) + ".tmp", self.schema, compression="zstd")
+        self._writer.write_table(pa.Table.from_pylist(self._buffer, schema=self.schema))
+        self._buffer = []
+
+    def _close_file(self) -> None:
+        self._flush()
+        if self._writer is None:
+            return
+        self._writer.close()
+        os.replace(str(self._path) + ".tmp", self._path)
+        day, device = self._key
+        self.entries.append({
+            "path": str(self._path.relative_to(self.root)),
+            "day": day.isoformat(),
+            "device_id": None if device == "none" else device,
+            "rows": self._rows,
+            "bytes": self._path.stat().st_size,
+            "min_timestamp": self._min.isoformat(),
+            "max_timestamp": self._max.isoformat(),
+            "run": self.run,
+        })
+        self._writer = None
+        self._path = None
+        self._rows = 0
+        self._min = self._max = None
+
+
+async def _oldest_unarchived(table: str, since: Optional[datetime], cutoff: datetime) -> Optional[datetime]:
+    where = '"timestamp" < :cutoff' + (' AND "timestamp" >= :since' if since else "")
+    async with engine.connect() as conn:
+        result = await conn.execute(text(f'SELECT min("timestamp") FROM {table} WHERE {where}'), {"cutoff": cutoff, "since": since})
+    return result.scalar()
+
+
+async def _archive_range(table: str, root: Path, start: datetime, end: datetime, batch_rows: int) -> List[Dict[str, Any]]:
+    """Write the rows in [start, end) to new files; returns their manifest entries."""
+    columns = ", ".join(f'"{name}"' for name in COLUMNS[table])
+    statement = text(
+        f'SELECT {columns} FROM {table} WHERE "timestamp" >= :start AND "timestamp" < :end '
+        f"ORDER BY (\"timestamp\" AT TIME ZONE 'UTC')::date, device_id, \"timestamp\""
+    ).execution_options(yield_per=batch_rows)
+
+    writer = ArchiveWriter(table, root, end.strftime("%Y%m%dT%H%M%S"), batch_rows)
+    async with engine.connect() as conn:
+        result = await conn.stream(statement, {"start": start, "end": end})
+        async for rows in result.mappings().partitions(batch_rows):
+            for row in rows:
+                writer.add(row)
+    return writer.close()
+
+
+async def archive_expired(
+    table: str,
+    cutoff: datetime,
+    archive_dir: Optional[str] = None,
+    batch_rows: Optional[int] = None,
+    pacer: Optional[BatchPacer] = None,
+) -> int:
+    """Stream rows older than cutoff (and not yet archived) into the archive; returns the row count.
+
+    Works one UTC day at a time, oldest first, saving the manifest after each
+    day, so archived_through advances in steps. With a pacer, a run stops
+    between days once its slice is used up and the next run carries on.
+    Uses a server-side cursor, so memory is bounded by batch_rows whatever
+    the size of the backlog.
+    """
+    root = Path(archive_dir or settings.log_archive_dir) / table
+    root.mkdir(parents=True, exist_ok=True)
+    batch_rows = batch_rows or settings.archive_batch_rows
+    manifest = load_manifest(table, str(root.parent))
+    _remove_orphans(root, manifest)
+
+    since = datetime.fromisoformat(manifest["archived_through"]) if manifest["archived_through"] else None
+    archived = 0
+    files = 0
+    while since is None or since < cutoff:
+        if pacer is not None and pacer.out_of_time():
+            break
+        # skip straight to the next day holding rows
+        oldest = await _oldest_unarchived(table, since, cutoff)
+        if oldest is None:
+            manifest["archived_through"] = cutoff.isoformat()
+            _save_manifest(root, manifest)
+            break
+        day = datetime.combine(oldest.astimezone(timezone.utc).date(), datetime.min.time(), tzinfo=timezone.utc)
+        start = max(day, since) if since else day
+        end = min(day + timedelta(days=1), cutoff)
+
+        started = perf_counter()
+        entries = await _archive_range(table, root, start, end, batch_rows)
+        manifest["files"].extend(entries)
+        manifest["archived_through"] = end.isoformat()
+        _save_manifest(root, manifest)
+        rows = sum(entry["rows"] for entry in entries)
+        if pacer is not None:
+            pacer.record(rows, perf_counter() - started)
+        archived += rows
+        files += len(entries)
+        since = end
+
+    logger.info("Archived %d %s rows into %d files", archived, table, files)
+    return archived
+
+
+def archived_through(table: str, archive_dir: Optional[str] = None) -> Optional[datetime]:
+    """The cutoff the archive of `table` is complete up to, if any."""
+    value = load_manifest(table, archive_dir)["archived_through"]
+    return datetime.fromisoformat(value) if value else None
+
+
+def archived_files(
+    table: str,
+    start: date,
+    end: date,
+    device_ids: Optional[Iterable[str]] = None,
+    archive_dir: Optional[str] = None,
+) -> List[Path]:
+    """Archive files for days in [start, end), optionally only for some devices."""
+    root = Path(archive_dir or settings.log_archive_dir) / table
+    devices = {str(d) for d in device_ids} if device_ids is not None else None
+    return [
+        root / entry["path"]
+        for entry in load_manifest(table, str(root.parent))["files"]
+        if start.isoformat() <= entry["day"] < end.isoformat()
+        and (devices is None or entry["device_id"] in devices)
+    ]
+
+
+def read_archive(
+    table: str,
+    start: date,
+    end: date,
+    device_ids: Optional[Iterable[str]] = None,
+    columns: Optional[Sequence[str]] = None,
+    filter=None,
+    archive_dir: Optional[str] = None,
+):
+    """Query archived days in place; returns a pyarrow.Table.
+
+    Only the files for the requested days and devices are opened; `filter` is
+    an optional pyarrow.dataset expression pushed down into the Parquet scan.
+    """
+    _pyarrow()
+    import pyarrow.dataset as ds
+
+    paths = archived_files(table, start, end, device_ids, archive_dir)
+    if not paths:
+        return _schema(table).empty_table().select(list(columns or COLUMNS[table]))
+    dataset = ds.dataset([str(p) for p in paths], schema=_schema(table), format="parquet")
+    return dataset.to_table(columns=list(columns) if columns else None, filter=filter)
@@ -0,0 +1,138 @@
+"""Hourly activity rollups for reports.
+
+activity_rollup_hourly holds, per UTC hour, device, user, domain and
+category, the number of visits, their total duration and the number of
+alerts and blocks. Ingest paths add to an in-process buffer that the
+write-behind loop flushes as additive upserts (the same scheme as
+app.services.focus_stats), and reports sum rollup rows instead of counting
+raw history. Rollups expire with the raw rows they summarize.
+
+Time ranges are whole hours: a report "since" some instant includes the
+whole hour it falls in.
+"""
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple, Union
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import register_cache_size
+from app.core.write_behind import register_flush
+from app.models.activity_rollup import ActivityRollupHourly
+from app.services.focus_stats import hour_of
+
+
+UserId = Union[str, uuid.UUID]
+RollupKey = Tuple[datetime, Optional[uuid.UUID], Optional[uuid.UUID], Optional[str], Optional[str]]
+
+MEASURES = ("visits", "duration_seconds", "alerts", "blocked")
+ACTION_MEASURES = {"alert_sent": "alerts", "blocked": "blocked"}
+
+
+@dataclass
+class RollupCounts:
+    visits: int = 0
+    duration_seconds: int = 0
+    alerts: int = 0
+    blocked: int = 0
+
+    def merge(self, other: "RollupCounts") -> None:
+        for name in MEASURES:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+
+# increments not yet flushed, per rollup key
+_pending: Dict[RollupKey, RollupCounts] = {}
+register_cache_size("rollups_pending", lambda: len(_pending))
+
+
+def _uuid(value: Optional[UserId]) -> Optional[uuid.UUID]:
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    return uuid.UUID(str(value))
+
+
+def _counts(timestamp: Optional[datetime], device_id, user_id, domain: Optional[str], category: Optional[str]) -> RollupCounts:
+    key = (hour_of(timestamp), _uuid(device_id), _uuid(user_id), domain[:255] if domain else None, category)
+    counts = _pending.get(key)
+    if counts is None:
+        counts = _pending[key] = RollupCounts()
+    return counts
+
+
+def record_visit(
+    device_id: UserId, user_id: Optional[UserId], domain: str, category: str,
+    duration_seconds: Optional[int] = None, timestamp: Optional[datetime] = None,
+) -> None:
+    counts = _counts(timestamp, device_id, user_id, domain, category)
+    counts.visits += 1
+    counts.duration_seconds += duration_seconds or 0
+
+
+def record_action(
+    action_type: str, device_id: Optional[UserId], user_id: Optional[UserId],
+    domain: Optional[str] = None, timestamp: Optional[datetime] = None,
+) -> None:
+    """Count an enforcement action; only alerts and blocks are rolled up."""
+    measure = ACTION_MEASURES.get(action_type)
+    if measure is None:
+        return
+    counts = _counts(timestamp, device_id, user_id, domain, None)
+    setattr(counts, measure, getattr(counts, measure) + 1)
+
+
+async def flush_rollups() -> int:
+    """Add the buffered increments to activity_rollup_hourly; returns the number of rows written."""
+    global _pending
+    if not _pending:
+        return 0
+    pending, _pending = _pending, {}
+    rows = [
+        {"hour": hour, "device_id": device_id, "user_id": user_id, "domain": domain, "category": category,
+         **{name: getattr(counts, name) for name in MEASURES}}
+        for (hour, device_id, user_id, domain, category), counts in pending.items()
+    ]
+    statement = insert(ActivityRollupHourly)
+    statement = statement.on_conflict_do_update(
+        index_elements=["hour", "device_id", "user_id", "domain", "category"],
+        set_={name: getattr(ActivityRollupHourly, name) + statement.excluded[name] for name in MEASURES},
+    )
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(statement, rows)
+            await db.commit()
+    except Exception:
+        for key, counts in pending.items():
+            _pending.setdefault(key, RollupCounts()).merge(counts)
+        raise
+    return len(rows)
+
+
+async def summarize(
+    db: AsyncSession, since: Optional[datetime] = None, device_id: Optional[UserId] = None, user_id: Optional[UserId] = None
+) -> Dict[str, int]:
+    """Totals of every measure over the rollups matching the filters."""
+    query = select(*[func.coalesce(func.sum(getattr(ActivityRollupHourly, name)), 0) for name in MEASURES])
+    if since is not None:
+        query = query.where(ActivityRollupHourly.hour >= hour_of(since))
+    if device_id is not None:
+        query = query.where(ActivityRollupHourly.device_id == _uuid(device_id))
+    if user_id is not None:
+        query = query.where(ActivityRollupHourly.user_id == _uuid(user_id))
+    row = (await db.execute(query)).one()
+    return {name: int(value) for name, value in zip(MEASURES, row)}
+
+
+async def prune_rollups(cutoff: datetime) -> int:
+    """Delete rollups for hours entirely before cutoff."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(delete(ActivityRollupHourly).where(ActivityRollupHourly.hour < hour_of(cutoff)))
+        await db.commit()
+    return result.rowcount
+
+
+register_flush("rollups", flush_rollups)
@@ -1,43 +1,140 @@
-from datetime import datetime, timedelta, timezone
-from sqlalchemy import select, update
-from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Dict, Optional, Tuple
 
-from app.core.database import AsyncSessionLocal
-from app.models.browsing_history import BrowsingHistory
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
 
+from app.core.database import engine
+from app.models.retention_checkpoint import RetentionCheckpoint
+from app.tasks.pacing import BatchPacer, retention_pacer
+from app.tasks.partitions import ANONYMIZED_COMMENT, partitions_or_table, retention_cutoff
 
-async def anonymize_old_logs(retention_days: int = 90):
+
+logger = logging.getLogger(__name__)
+
+JOB = "anonymize"
+PROGRESS_EVERY_BATCHES = 20
+
+# Remove the URL and keep only the top-level domain pattern ("example.com" -> "*.com")
+_ANONYMIZE = """
+    url = 'ANONYMIZED',
+    domain = CASE WHEN strpos(domain, '.') > 0 THEN '*.' || substring(domain from '[^.]*$') ELSE domain END
+"""
+
+Position = Tuple[datetime, object, int]  # last (timestamp, id) handled, rows anonymized so far
+
+
+def _batch_statement(relation: str, bounded: bool, resume: bool):
+    """One keyset batch: anonymize the next :limit rows after the position, return the new position."""
+    conditions = []
+    if bounded:
+        conditions.append('"timestamp" < :cutoff')
+    if resume:
+        conditions.append('("timestamp", id) > (:after_timestamp, :after_id)')
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return text(
+        f"""
+        WITH batch AS (
+            SELECT id, "timestamp" FROM "{relation}" {where}
+            ORDER BY "timestamp", id
+            LIMIT :limit
+        ), updated AS (
+            UPDATE "{relation}" AS t SET {_ANONYMIZE}
+            FROM batch
+            WHERE t.id = batch.id AND t."timestamp" = batch."timestamp" AND t.url <> 'ANONYMIZED'
+            RETURNING 1
+        )
+        SELECT last."timestamp", last.id, (SELECT count(*) FROM batch), (SELECT count(*) FROM updated)
+        FROM (SELECT "timestamp", id FROM batch ORDER BY "timestamp" DESC, id DESC LIMIT 1) AS last
+        """
+    )
+
+
+async def _load_checkpoints(conn: AsyncConnection) -> Dict[str, Position]:
+    rows = await conn.execute(select(RetentionCheckpoint).where(RetentionCheckpoint.job == JOB))
+    return {cp.relation: (cp.last_timestamp, cp.last_id, cp.rows_done) for cp in rows.scalars()}
+
+
+async def _save_checkpoint(conn: AsyncConnection, relation: str, position: Position) -> None:
+    last_timestamp, last_id, rows_done = position
+    values = {"last_timestamp": last_timestamp, "last_id": last_id, "rows_done": rows_done, "updated_at": datetime.now(timezone.utc)}
+    statement = insert(RetentionCheckpoint).values(job=JOB, relation=relation, **values)
+    await conn.execute(statement.on_conflict_do_update(index_elements=["job", "relation"], set_=values))
+
+
+async def _clear_checkpoint(conn: AsyncConnection, relation: str) -> None:
+    await conn.execute(delete(RetentionCheckpoint).where(RetentionCheckpoint.job == JOB, RetentionCheckpoint.relation == relation))
+
+
+async def anonymize_old_logs(retention_days: int = 90, pacer: Optional[BatchPacer] = None):
     """
     Anonymize browsing logs older than retention_days.
     Removes URLs, generalizes domains.
+
+    Works a partition at a time in keyset-ordered batches of server-side
+    UPDATEs. Each batch commits together with its checkpoint, so a crashed run
+    resumes where it stopped. The cutoff is a day boundary, so daily partitions
+    are either wholly past it (marked when done, so later runs skip them
+    without scanning) or untouched. A finished legacy partition keeps its
+    checkpoint so the next run starts after it; the default partition, whose
+    rows can arrive with any timestamp, is rescanned from the start. Batch size
+    and pauses adapt to batch latency and replication lag, and a pacer with a
+    slice deadline stops the run early (the checkpoint picks it up next time).
     """
-    cutoff_date = datetime.now(timezone.utc) - timedelta(days=retention_days)
-    
-    async with AsyncSessionLocal() as db:
-        # Get old logs
-        result = await db.execute(
-            select(BrowsingHistory)
-            .where(BrowsingHistory.timestamp < cutoff_date)
-            .where(BrowsingHistory.url != "ANONYMIZED")  # Skip already anonymized
-        )
-        logs = result.scalars().all()
-        
-        anonymized_count = 0
-        for log in logs:
-            # Anonymize: remove URL, keep only domain pattern
-            domain_parts = log.domain.split(".")
-            if len(domain_parts) >= 2:
-                # Keep only top-level domain pattern (e.g., "example.com" -> "*.com")
-                log.domain = f"*.{domain_parts[-1]}"
-            log.url = "ANONYMIZED"
-            anonymized_count += 1
-        
-        await db.commit()
-        return anonymized_count
+    cutoff_date = retention_cutoff(retention_days)
+
+    async with engine.connect() as conn:
+        partitions = await partitions_or_table(conn, "browsing_history")
+        checkpoints = await _load_checkpoints(conn)
+
+    pacer = pacer or retention_pacer()
+    anonymized_count = 0
+    for partition in partitions:
+        if partition.comment == ANONYMIZED_COMMENT or not partition.starts_before(cutoff_date):
+            continue
+        whole = partition.ends_before(cutoff_date)
+        position: Optional[Position] = checkpoints.get(partition.name)
+        if position is not None:
+            logger.info("Resuming anonymization of %s after %s", partition.name, position[0].isoformat())
+
+        while not pacer.out_of_time():
+            params = {"limit": pacer.batch_size}
+            if not whole:
+                params["cutoff"] = cutoff_date
+            if position is not None:
+                params["after_timestamp"], params["after_id"] = position[0], position[1]
+            statement = _batch_statement(partition.name, bounded=not whole, resume=position is not None)
+
+            started = perf_counter()
+            async with engine.begin() as conn:
+                row = (await conn.execute(statement, params)).first()
+                if row is None:
+                    if whole or partition.upper is None:
+                        await _clear_checkpoint(conn, partition.name)
+                    if whole:
+                        await conn.exec_driver_sql(f"COMMENT ON TABLE \"{partition.name}\" IS '{ANONYMIZED_COMMENT}'")
+                    break
+                last_timestamp, last_id, scanned, updated = row
+                position = (last_timestamp, last_id, (position[2] if position else 0) + updated)
+                await _save_checkpoint(conn, partition.name, position)
+            pacer.record(scanned, perf_counter() - started)
+            anonymized_count += updated
+
+            if pacer.batches % PROGRESS_EVERY_BATCHES == 0:
+                logger.info(
+                    "Anonymization %s: %d rows anonymized, batch %d rows, %.0f rows/s scanned",
+                    partition.name, anonymized_count, pacer.batch_size, pacer.rows_per_second,
+                )
+            await pacer.pause()
+
+    logger.info("Anonymized %d rows (%.0f rows/s scanned)", anonymized_count, pacer.rows_per_second)
+    return anonymized_count
 
 
 if __name__ == "__main__":
     import asyncio
     count = asyncio.run(anonymize_old_logs())
     print(f"Anonymized {count} logs")
-
@@ -1,51 +1,102 @@
-from datetime import datetime, timedelta, timezone
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import logging
+from datetime import datetime
+from time import perf_counter
+from typing import Optional
 
-from app.core.database import AsyncSessionLocal
+from sqlalchemy import text
+
+from app.core.database import engine
 from app.core.config import settings
-from app.models.browsing_history import BrowsingHistory
-from app.models.activity_log import ActivityLog
+from app.services import log_archive
+from app.services.heavy_hitters import prune_sketches
+from app.services.rollups import prune_rollups
+from app.tasks.pacing import BatchPacer, retention_pacer
+from app.tasks.partitions import PARTITIONED_TABLES, expire_partitions, partitions_or_table, retention_cutoff
 
 
-async def archive_logs(retention_days: int = 30):
-    """
-    Archive logs older than retention_days.
-    In production, this would move to cloud storage or archived_logs table.
-    For MVP, we'll mark them as archived or delete (based on policy).
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVERY_BATCHES = 20
+
+
+async def delete_expired_rows(table: str, cutoff_date: datetime, pacer: Optional[BatchPacer] = None) -> int:
+    """Delete rows older than cutoff_date in short, paced transactions.
+
+    Each batch is one server-side DELETE of at most pacer.batch_size rows picked
+    oldest-first through the timestamp index, committed on its own, so memory
+    is constant, locks are short and replicas get a steady trickle of WAL.
+    The predicate is the whole state: an interrupted run (or one that ran out
+    of its slice) is resumed simply by running again.
     """
-    cutoff_date = datetime.now(timezone.utc) - timedelta(days=retention_days)
-    
-    async with AsyncSessionLocal() as db:
-        # Get old browsing history
-        bh_result = await db.execute(
-            select(BrowsingHistory).where(BrowsingHistory.timestamp < cutoff_date)
-        )
-        old_bh = bh_result.scalars().all()
-        
-        # Get old activity logs
-        al_result = await db.execute(
-            select(ActivityLog).where(ActivityLog.timestamp < cutoff_date)
+    pacer = pacer or retention_pacer()
+
+    async with engine.connect() as conn:
+        partitions = [p for p in await partitions_or_table(conn, table) if p.starts_before(cutoff_date)]
+
+    total = 0
+    for partition in partitions:
+        statement = text(
+            f'DELETE FROM "{partition.name}" WHERE (id, "timestamp") IN ('
+            f'SELECT id, "timestamp" FROM "{partition.name}" WHERE "timestamp" < :cutoff '
+            f'ORDER BY "timestamp" LIMIT :limit)'
         )
-        old_al = al_result.scalars().all()
-        
-        # For MVP: delete old logs (in production, move to archive table/storage)
-        archived_count = 0
-        for log in old_bh:
-            await db.delete(log)
-            archived_count += 1
-        
-        for log in old_al:
-            await db.delete(log)
-            archived_count += 1
-        
-        await db.commit()
-        return archived_count
+        while not pacer.out_of_time():
+            limit = pacer.batch_size
+            started = perf_counter()
+            async with engine.begin() as conn:
+                result = await conn.execute(statement, {"cutoff": cutoff_date, "limit": limit})
+            deleted = result.rowcount
+            pacer.record(deleted, perf_counter() - started)
+            total += deleted
+            if deleted < limit:
+                break
+            if pacer.batches % PROGRESS_EVERY_BATCHES == 0:
+                logger.info("Retention %s: %d rows deleted (%.0f rows/s)", partition.name, total, pacer.rows_per_second)
+            await pacer.pause()
+    return total
+
+
+async def archive_logs(retention_days: int = 30, pacer: Optional[BatchPacer] = None):
+    """
+    Archive logs older than retention_days, then delete them.
+    With LOG_ARCHIVE_DIR set, expired rows are first streamed to Parquet files
+    (see app.services.log_archive) and only rows the archive already covers are
+    deleted; a failed archive leaves the rows in place. Archiving shares the
+    pacer's slice, so a large backlog is archived and deleted over several runs.
+    """
+    cutoff_date = retention_cutoff(retention_days)
+    pacer = pacer or retention_pacer()
+
+    archived_count = 0
+    prune_before: Optional[datetime] = cutoff_date
+    for table in PARTITIONED_TABLES:
+        delete_before = cutoff_date
+        if settings.log_archive_dir:
+            await log_archive.archive_expired(table, cutoff_date, pacer=pacer)
+            delete_before = log_archive.archived_through(table)
+            if delete_before is None:
+                prune_before = None
+                continue
+            delete_before = min(delete_before, cutoff_date)
+        if prune_before is not None:
+            prune_before = min(prune_before, delete_before)
+        # Whole days past retention go at partition level; only the legacy and
+        # default partitions (or an unpartitioned table) are left row by row.
+        expired = await expire_partitions(table, delete_before)
+        if expired:
+            print(f"Expired partitions: {', '.join(expired)}")
+        archived_count += await delete_expired_rows(table, delete_before, pacer)
+
+    # reports only cover what is still retained: summaries go no further than
+    # the raw rows of every table (an archive backlog holds them back)
+    if prune_before is not None:
+        await prune_rollups(prune_before)
+        await prune_sketches(prune_before)
+    return archived_count
 
 
 if __name__ == "__main__":
-    import asyncio
     retention = getattr(settings, "log_retention_days", 30)
     count = asyncio.run(archive_logs(retention))
     print(f"Archived {count} logs")
-
@@ -0,0 +1,115 @@
+"""Load the incrementally maintained statistics from the raw history tables.
+
+Ingestion keeps the statistics current from the moment it is deployed; run
+this once afterwards (python -m app.tasks.backfill_stats) to cover the
+history before that. Hours are recomputed from scratch and overwritten, so
+rerunning is safe; the current hour is left to ingestion, whose increments
+would otherwise be overwritten. Rollups cover all retained history, so they
+are rebuilt a UTC day at a time, each day in its own transaction.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.core.database import engine
+from app.services.focus_stats import WINDOW_DAYS, hour_of
+
+
+logger = logging.getLogger(__name__)
+
+_HOUR = "date_trunc('hour', {column} AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'"
+
+_FOCUS_DURATIONS = f"""
+    INSERT INTO user_focus_hourly (user_id, hour, duration_sum, duration_count)
+    SELECT devices.user_id, {_HOUR.format(column='b."timestamp"')}, sum(b.duration_seconds), count(b.duration_seconds)
+    FROM browsing_history b JOIN devices ON devices.id = b.device_id
+    WHERE b."timestamp" >= :start AND b."timestamp" < :end AND b.duration_seconds IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT (user_id, hour) DO UPDATE
+    SET duration_sum = excluded.duration_sum, duration_count = excluded.duration_count
+"""
+
+_FOCUS_DISTRACTIONS = f"""
+    INSERT INTO user_focus_hourly (user_id, hour, distraction_count)
+    SELECT user_id, {_HOUR.format(column='"timestamp"')}, count(*)
+    FROM activity_logs
+    WHERE "timestamp" >= :start AND "timestamp" < :end
+      AND action_type IN ('alert_sent', 'blocked') AND user_id IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT (user_id, hour) DO UPDATE SET distraction_count = excluded.distraction_count
+"""
+
+
+_ROLLUP_VISITS = f"""
+    INSERT INTO activity_rollup_hourly (hour, device_id, user_id, domain, category, visits, duration_seconds)
+    SELECT {_HOUR.format(column='b."timestamp"')}, b.device_id, devices.user_id, b.domain, b.category,
+           count(*), coalesce(sum(b.duration_seconds), 0)
+    FROM browsing_history b LEFT JOIN devices ON devices.id = b.device_id
+    WHERE b."timestamp" >= :start AND b."timestamp" < :end
+    GROUP BY 1, 2, 3, 4, 5
+    ON CONFLICT (hour, device_id, user_id, domain, category) DO UPDATE
+    SET visits = excluded.visits, duration_seconds = excluded.duration_seconds
+"""
+
+_ROLLUP_ACTIONS = f"""
+    INSERT INTO activity_rollup_hourly (hour, device_id, user_id, domain, category, alerts, blocked)
+    SELECT {_HOUR.format(column='"timestamp"')}, device_id, user_id, left(details ->> 'domain', 255), NULL,
+           count(*) FILTER (WHERE action_type = 'alert_sent'), count(*) FILTER (WHERE action_type = 'blocked')
+    FROM activity_logs
+    WHERE "timestamp" >= :start AND "timestamp" < :end AND action_type IN ('alert_sent', 'blocked')
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (hour, device_id, user_id, domain, category) DO UPDATE
+    SET alerts = excluded.alerts, blocked = excluded.blocked
+"""
+
+# where the day-by-day rollup backfill starts (index lookups)
+_OLDEST = """
+    SELECT least(
+        (SELECT min("timestamp") FROM browsing_history WHERE "timestamp" < :end),
+        (SELECT min("timestamp") FROM activity_logs WHERE "timestamp" < :end)
+    )
+"""
+
+
+async def backfill_focus_stats(days: int = WINDOW_DAYS, now: Optional[datetime] = None) -> int:
+    """Recompute user_focus_hourly for the hours of the last `days` days before the current one."""
+    end = hour_of(now)
+    params = {"start": end - timedelta(days=days), "end": end}
+    async with engine.begin() as conn:
+        durations = (await conn.execute(text(_FOCUS_DURATIONS), params)).rowcount
+        distractions = (await conn.execute(text(_FOCUS_DISTRACTIONS), params)).rowcount
+    logger.info("Backfilled focus stats: %d duration bins, %d distraction bins", durations, distractions)
+    return durations + distractions
+
+
+async def backfill_rollups(now: Optional[datetime] = None) -> int:
+    """Recompute activity_rollup_hourly for every retained hour before the current one, a day per transaction."""
+    end = hour_of(now)
+    async with engine.connect() as conn:
+        oldest = (await conn.execute(text(_OLDEST), {"end": end})).scalar()
+    if oldest is None:
+        return 0
+
+    visits = actions = 0
+    start = hour_of(oldest).replace(hour=0)
+    while start < end:
+        params = {"start": start, "end": min(start + timedelta(days=1), end)}
+        async with engine.begin() as conn:
+            visits += (await conn.execute(text(_ROLLUP_VISITS), params)).rowcount
+            actions += (await conn.execute(text(_ROLLUP_ACTIONS), params)).rowcount
+        start = params["end"]
+    logger.info("Backfilled rollups: %d visit rows, %d action rows", visits, actions)
+    return visits + actions
+
+
+async def backfill_all() -> None:
+    await backfill_focus_stats()
+    await backfill_rollups()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill_all())
+    print("Backfill complete")
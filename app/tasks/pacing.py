@@ -0,0 +1,111 @@
+"""Adaptive pacing for batched maintenance work that shares the database with ingestion."""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import engine
+
+
+logger = logging.getLogger(__name__)
+
+LAG_PROBE_INTERVAL_SECONDS = 5.0
+
+
+class BatchPacer:
+    """AIMD batch sizing: grow while batches stay under the latency target, back off hard when they don't.
+
+    Batch latency is the load signal: when ingestion is busy, the same batch
+    takes longer, so the pacer halves the batch and doubles the pause until
+    batches are fast again. With a lag probe, replication lag above
+    max_lag_seconds backs off the same way. A slice deadline bounds how long
+    one run may keep going (see start_slice / out_of_time).
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        target_seconds: float,
+        pause_seconds: float,
+        min_batch: int = 100,
+        max_batch: int = 50_000,
+        max_pause_seconds: float = 30.0,
+        lag_probe: Optional[Callable[[], Awaitable[float]]] = None,
+        max_lag_seconds: float = 0.0,
+    ):
+        self.batch_size = max(min_batch, min(batch_size, max_batch))
+        self.target_seconds = target_seconds
+        self.base_pause = pause_seconds
+        self.pause_seconds = pause_seconds
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.max_pause_seconds = max_pause_seconds
+        self.lag_probe = lag_probe
+        self.max_lag_seconds = max_lag_seconds
+        self.last_lag_seconds = 0.0
+        self._lag_checked_at = 0.0
+        self.deadline: Optional[float] = None
+        self.rows = 0
+        self.batches = 0
+        self.started = time.monotonic()
+
+    def start_slice(self, seconds: Optional[float]) -> None:
+        self.deadline = None if seconds is None else time.monotonic() + seconds
+
+    def out_of_time(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def record(self, rows: int, seconds: float) -> None:
+        self.rows += rows
+        self.batches += 1
+        if seconds > self.target_seconds:
+            self.slow_down()
+        else:
+            self.batch_size = min(self.max_batch, self.batch_size + max(1, self.batch_size // 4))
+            self.pause_seconds = max(self.base_pause, self.pause_seconds / 2)
+
+    def slow_down(self) -> None:
+        self.batch_size = max(self.min_batch, self.batch_size // 2)
+        self.pause_seconds = min(self.max_pause_seconds, max(self.pause_seconds * 2, 0.05))
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / max(time.monotonic() - self.started, 1e-9)
+
+    async def pause(self) -> None:
+        now = time.monotonic()
+        if self.lag_probe is not None and now - self._lag_checked_at >= LAG_PROBE_INTERVAL_SECONDS:
+            self._lag_checked_at = now
+            self.last_lag_seconds = await self.lag_probe()
+            if self.last_lag_seconds > self.max_lag_seconds:
+                logger.info("Replication lag %.1fs over %.1fs; backing off", self.last_lag_seconds, self.max_lag_seconds)
+                self.slow_down()
+        if self.pause_seconds > 0:
+            await asyncio.sleep(self.pause_seconds)
+
+
+async def replication_lag_seconds() -> float:
+    """Largest replay lag among streaming replicas of the primary; 0 without replicas or privileges."""
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                text("SELECT COALESCE(EXTRACT(EPOCH FROM max(replay_lag)), 0) FROM pg_stat_replication")
+            )
+            return float(result.scalar() or 0.0)
+    except Exception as exc:
+        logger.debug("Replication lag probe failed: %s", exc)
+        return 0.0
+
+
+def retention_pacer() -> BatchPacer:
+    """Pacer for the retention jobs, configured from Settings."""
+    return BatchPacer(
+        settings.retention_batch_size,
+        target_seconds=settings.retention_batch_target_ms / 1000,
+        pause_seconds=settings.retention_batch_pause_ms / 1000,
+        lag_probe=replication_lag_seconds,
+        max_lag_seconds=settings.retention_max_replication_lag_seconds,
+    )
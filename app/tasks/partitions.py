@@ -0,0 +1,191 @@
+"""Daily range partitions for the history tables.
+
+browsing_history and activity_logs are partitioned by RANGE ("timestamp") with
+one partition per UTC day named <table>_pYYYYMMDD and a <table>_default
+partition for rows outside every range (e.g. agents with a skewed clock).
+Databases migrated from the unpartitioned layout also have a <table>_legacy
+partition holding everything before the cutover; it expires like any other.
+"""
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.core.database import engine
+
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("browsing_history", "activity_logs")
+ANONYMIZED_COMMENT = "anonymized"
+
+_BOUNDS_RE = re.compile(r"FROM \((?P<lower>[^)]*)\) TO \((?P<upper>[^)]*)\)")
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    lower: Optional[datetime]  # None: MINVALUE, default partition or unpartitioned table
+    upper: Optional[datetime]  # None: default partition or unpartitioned table
+    is_default: bool = False
+    comment: Optional[str] = None
+
+    def ends_before(self, cutoff: datetime) -> bool:
+        """Every row this partition can hold is older than cutoff."""
+        return self.upper is not None and self.upper <= cutoff
+
+    def starts_before(self, cutoff: datetime) -> bool:
+        """Some row this partition can hold may be older than cutoff."""
+        return self.lower is None or self.lower < cutoff
+
+    def overlaps(self, lower: datetime, upper: datetime) -> bool:
+        """Some of [lower, upper) falls in this partition's range (never true for the default partition)."""
+        if self.is_default:
+            return False
+        return (self.lower is None or self.lower < upper) and (self.upper is None or lower < self.upper)
+
+
+def retention_cutoff(days: int, now: Optional[datetime] = None) -> datetime:
+    """Start of the UTC day `days` days ago: retention works in whole days, matching the partitions."""
+    now = now or datetime.now(timezone.utc)
+    return datetime.combine((now - timedelta(days=days)).date(), datetime.min.time(), tzinfo=timezone.utc)
+
+
+def partition_name(table: str, day: date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def _bound(day: date) -> str:
+    return f"'{day.isoformat()} 00:00:00+00'"
+
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    value = value.strip()
+    if value.upper() in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> List[Partition]:
+    """Partitions of `table` ordered by lower bound; empty if it is not partitioned."""
+    rows = await conn.execute(
+        text(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid), obj_description(child.oid, 'pg_class')
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table AND pg_table_is_visible(parent.oid)
+            """
+        ),
+        {"table": table},
+    )
+    partitions = []
+    for name, bound, comment in rows:
+        match = _BOUNDS_RE.search(bound or "")
+        if match is None:
+            partitions.append(Partition(name, None, None, is_default=True, comment=comment))
+        else:
+            partitions.append(Partition(name, _parse_bound(match["lower"]), _parse_bound(match["upper"]), comment=comment))
+    epoch = datetime.min.replace(tzinfo=timezone.utc)
+    return sorted(partitions, key=lambda p: (p.is_default, p.lower or epoch))
+
+
+async def is_partitioned(conn: AsyncConnection, table: str) -> bool:
+    result = await conn.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :table AND pg_table_is_visible(oid)"),
+        {"table": table},
+    )
+    return result.scalar() == "p"
+
+
+async def partitions_or_table(conn: AsyncConnection, table: str) -> List[Partition]:
+    """Like list_partitions, but an unpartitioned table is returned as one unbounded partition."""
+    if not await is_partitioned(conn, table):
+        return [Partition(table, None, None)]
+    return await list_partitions(conn, table)
+
+
+async def create_default_partition(conn: AsyncConnection, table: str) -> None:
+    await conn.exec_driver_sql(f'CREATE TABLE IF NOT EXISTS "{table}_default" PARTITION OF "{table}" DEFAULT')
+
+
+async def create_daily_partitions(conn: AsyncConnection, table: str, start: date, days: int) -> List[str]:
+    """Create the missing daily partitions for [start, start + days); returns their names.
+
+    Days already covered, even partly, by another partition's range are
+    skipped: the legacy partition of a freshly migrated table runs up to the
+    day after the cutover, and a second partition for those days could not be
+    attached.
+    """
+    existing = await list_partitions(conn, table)
+    default = next((p.name for p in existing if p.is_default), None)
+
+    created = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        name = partition_name(table, day)
+        day_start = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+        if any(p.overlaps(day_start, day_start + timedelta(days=1)) for p in existing):
+            continue
+        lower, upper = _bound(day), _bound(day + timedelta(days=1))
+        if default is None:
+            await conn.exec_driver_sql(f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES FROM ({lower}) TO ({upper})')
+        else:
+            # Rows for this day that already landed in the default partition have
+            # to move first, or attaching the range would fail its default check.
+            await conn.exec_driver_sql(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS)')
+            await conn.exec_driver_sql(
+                f'WITH moved AS (DELETE FROM "{default}" WHERE "timestamp" >= {lower} AND "timestamp" < {upper} RETURNING *) '
+                f'INSERT INTO "{name}" SELECT * FROM moved'
+            )
+            await conn.exec_driver_sql(f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" FOR VALUES FROM ({lower}) TO ({upper})')
+        created.append(name)
+    return created
+
+
+async def ensure_future_partitions(days_ahead: Optional[int] = None) -> List[str]:
+    """Scheduler entry point: make sure today and the next `days_ahead` days have partitions."""
+    days_ahead = settings.partition_premake_days if days_ahead is None else days_ahead
+    today = datetime.now(timezone.utc).date()
+    created: List[str] = []
+    for table in PARTITIONED_TABLES:
+        async with engine.begin() as conn:
+            if not await is_partitioned(conn, table):
+                continue  # not migrated to the partitioned layout yet
+            await create_default_partition(conn, table)
+            created += await create_daily_partitions(conn, table, today, days_ahead + 1)
+    if created:
+        logger.info("Created partitions: %s", ", ".join(created))
+    return created
+
+
+async def expire_partitions(table: str, cutoff: datetime, action: Optional[str] = None) -> List[str]:
+    """Detach (and by default drop) every partition of `table` entirely older than cutoff.
+
+    Each partition is handled in its own short transaction with a lock timeout,
+    so a busy parent table delays expiry to the next run instead of queueing
+    writers behind the DDL.
+    """
+    action = action or settings.partition_expiry_action
+    async with engine.connect() as conn:
+        expired = [p for p in await list_partitions(conn, table) if not p.is_default and p.ends_before(cutoff)]
+
+    done = []
+    for partition in expired:
+        try:
+            async with engine.begin() as conn:
+                await conn.exec_driver_sql("SET LOCAL lock_timeout = '5s'")
+                await conn.exec_driver_sql(f'ALTER TABLE "{table}" DETACH PARTITION "{partition.name}"')
+                if action == "drop":
+                    await conn.exec_driver_sql(f'DROP TABLE "{partition.name}"')
+        except Exception as exc:
+            logger.warning("Could not expire partition %s: %s", partition.name, exc)
+            continue
+        done.append(partition.name)
+    return done
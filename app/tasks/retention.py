@@ -0,0 +1,111 @@
+"""Continuous retention: archive, expire and anonymize in small slices all day.
+
+Instead of one weekly IO storm, the scheduler runs retention_tick every few
+minutes. Each tick shares one BatchPacer, so batch size adapts across ticks
+to DB latency and replication lag, and stops at the slice deadline; the next
+tick picks up where it left off (the delete predicate and the anonymization
+checkpoints are the only state).
+
+The retention backlog gauges show whether it keeps up: for deletion, rows
+still present past the cutoff (capped) and how far past it the oldest is; for
+anonymization, the estimated rows of day partitions past its cutoff that are
+not yet marked anonymized, and how far past it the oldest of them starts.
+"""
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.metrics import Gauge
+from app.tasks import anonymize, archive_logs
+from app.tasks.pacing import BatchPacer, retention_pacer
+from app.tasks.partitions import ANONYMIZED_COMMENT, PARTITIONED_TABLES, list_partitions, retention_cutoff
+
+
+logger = logging.getLogger(__name__)
+
+ANONYMIZE_AFTER_DAYS = 90
+BACKLOG_ROW_CAP = 100_000
+
+# (job, table) -> (rows, seconds)
+_backlog: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
+retention_backlog_rows = Gauge(
+    "retention_backlog_rows",
+    f"Rows past the retention cutoff not yet processed (capped at {BACKLOG_ROW_CAP}).",
+    lambda: {key: rows for key, (rows, _) in _backlog.items()},
+    ("job", "table"),
+)
+retention_backlog_seconds = Gauge(
+    "retention_backlog_seconds",
+    "How far the oldest unprocessed row is past the retention cutoff.",
+    lambda: {key: seconds for key, (_, seconds) in _backlog.items()},
+    ("job", "table"),
+)
+
+_pacer: Optional[BatchPacer] = None
+
+
+async def measure_backlog() -> Dict[Tuple[str, str], Tuple[int, float]]:
+    """Refresh the backlog gauges; index and catalog lookups, cheap enough to run every minute."""
+    async with engine.connect() as conn:
+        cutoff = retention_cutoff(settings.log_retention_days)
+        for table in PARTITIONED_TABLES:
+            rows = (
+                await conn.execute(
+                    text(f'SELECT count(*) FROM (SELECT 1 FROM {table} WHERE "timestamp" < :cutoff LIMIT {BACKLOG_ROW_CAP}) AS expired'),
+                    {"cutoff": cutoff},
+                )
+            ).scalar()
+            # separately: the capped subquery is unordered, so its min is not the oldest row
+            oldest = (
+                await conn.execute(text(f'SELECT min("timestamp") FROM {table} WHERE "timestamp" < :cutoff'), {"cutoff": cutoff})
+            ).scalar()
+            _backlog[("delete", table)] = (int(rows), (cutoff - oldest).total_seconds() if oldest else 0.0)
+
+        cutoff = retention_cutoff(ANONYMIZE_AFTER_DAYS)
+        pending = [
+            p for p in await list_partitions(conn, "browsing_history")
+            if p.ends_before(cutoff) and p.comment != ANONYMIZED_COMMENT
+        ]
+        rows = 0
+        if pending:
+            result = await conn.execute(
+                text("SELECT COALESCE(sum(GREATEST(reltuples, 0)), 0) FROM pg_class WHERE relname = ANY(:names)"),
+                {"names": [p.name for p in pending]},
+            )
+            rows = int(result.scalar())
+        oldest = min((p.lower for p in pending if p.lower is not None), default=None)
+        _backlog[("anonymize", "browsing_history")] = (rows, (cutoff - oldest).total_seconds() if oldest else 0.0)
+    return dict(_backlog)
+
+
+async def retention_tick(slice_seconds: Optional[float] = None) -> Dict[str, int]:
+    """One bounded slice of retention work."""
+    global _pacer
+    if _pacer is None:
+        _pacer = retention_pacer()
+    _pacer.start_slice(settings.retention_slice_seconds if slice_seconds is None else slice_seconds)
+
+    deleted = await archive_logs.archive_logs(settings.log_retention_days, _pacer)
+    anonymized = 0
+    if not _pacer.out_of_time():
+        anonymized = await anonymize.anonymize_old_logs(ANONYMIZE_AFTER_DAYS, _pacer)
+    try:
+        await measure_backlog()
+    except Exception as exc:
+        logger.warning("Could not measure retention backlog: %s", exc)
+    return {"deleted": deleted, "anonymized": anonymized, "batch_size": _pacer.batch_size}
+
+
+async def run_backlog_monitor(interval_seconds: float = 60.0) -> None:
+    """Keep the backlog gauges fresh in a process that serves /metrics."""
+    while True:
+        try:
+            await measure_backlog()
+        except Exception as exc:
+            logger.debug("Retention backlog refresh failed: %s", exc)
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,33 @@
+"""Micro-benchmark of per-request auth overhead (token verification).
+
+Usage: PYTHONPATH=. python scripts/bench_auth.py [iterations]
+"""
+import sys
+import time
+
+from jose import jwt
+
+from app.core.config import settings
+from app.core.security import clear_token_cache, create_access_token, decode_token
+
+
+def _bench(label: str, fn, iterations: int) -> None:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / iterations * 1e6:8.2f} us/request")
+
+
+def main(iterations: int = 20000) -> None:
+    token = create_access_token("bench-user", role="student", extra_claims={"role": "student"})
+
+    _bench("jose.jwt.decode (before)", lambda: jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm]), iterations)
+
+    clear_token_cache()
+    decode_token(token)
+    _bench("decode_token cached (after)", lambda: decode_token(token), iterations)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
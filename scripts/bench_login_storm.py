@@ -0,0 +1,63 @@
+"""Load benchmark: does a login storm stall browsing ingestion?
+
+Fires a burst of concurrent logins (bcrypt verification) while a stand-in
+ingestion loop ticks every 10 ms, and reports how late its ticks were with
+bcrypt inline on the event loop versus in the dedicated password pool.
+
+Usage: PYTHONPATH=. python scripts/bench_login_storm.py [logins] [rounds]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from bcrypt import gensalt, hashpw
+
+from app.core.security import password_hash_stats, verify_password, verify_password_async
+
+
+TICK_SECONDS = 0.01
+
+
+async def _ingestion_ticker(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def _inline_login(password: str, password_hash: str) -> bool:
+    return verify_password(password, password_hash)
+
+
+async def _storm(label: str, login, logins: int, password_hash: str) -> None:
+    stop = asyncio.Event()
+    lags: list = []
+    ticker = asyncio.create_task(_ingestion_ticker(stop, lags))
+    await asyncio.sleep(TICK_SECONDS * 5)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login("password123", password_hash) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    p99 = lags_ms[int(len(lags_ms) * 0.99) - 1] if lags_ms else 0.0
+    print(
+        f"{label:<16} {logins} logins in {elapsed:6.2f}s | ingestion tick lag "
+        f"median {statistics.median(lags_ms):7.1f} ms  p99 {p99:7.1f} ms  max {lags_ms[-1]:7.1f} ms"
+    )
+
+
+async def main(logins: int, rounds: int) -> None:
+    password_hash = hashpw(b"password123", gensalt(rounds=rounds)).decode("utf-8")
+    await _storm("inline bcrypt", _inline_login, logins, password_hash)
+    await _storm("password pool", verify_password_async, logins, password_hash)
+    print("pool stats:", password_hash_stats())
+
+
+if __name__ == "__main__":
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    asyncio.run(main(logins, rounds))
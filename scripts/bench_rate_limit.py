@@ -0,0 +1,60 @@
+"""Micro-benchmark of RateLimitMiddleware per-request overhead.
+
+Drives the ASGI middleware directly (no server, no sockets) with requests
+spread over many client addresses and compares it with a bare app call.
+
+Usage: PYTHONPATH=. python scripts/bench_rate_limit.py [requests] [clients]
+"""
+import asyncio
+import sys
+import time
+
+from app.core.middleware import RateLimitMiddleware
+from app.core.rate_limit import MemoryRateLimitBackend, RateLimiter
+
+
+async def _noop_app(scope, receive, send):
+    return None
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(_message):
+    return None
+
+
+def _scopes(clients: int):
+    return [
+        {"type": "http", "method": "GET", "path": "/api/agent/config", "headers": [], "client": (f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", 5000)}
+        for i in range(clients)
+    ]
+
+
+async def _run(label: str, app, scopes, requests: int) -> None:
+    n = len(scopes)
+    start = time.perf_counter()
+    for i in range(requests):
+        await app(scopes[i % n], _receive, _send)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed / requests * 1e6:7.2f} us/request  {requests / elapsed:>10,.0f} req/s")
+
+
+async def main(requests: int, clients: int) -> None:
+    scopes = _scopes(clients)
+    await _run("bare app", _noop_app, scopes, requests)
+    limiter = RateLimitMiddleware(_noop_app, requests_per_minute=10**9)
+    await _run("token-bucket limiter", limiter, scopes, requests)
+    print(f"buckets held: {len(limiter.limiter.local.buckets)}")
+
+    shared = MemoryRateLimitBackend()
+    leased = RateLimitMiddleware(_noop_app, requests_per_minute=10**6, limiter=RateLimiter(shared))
+    await _run("shared store + leases", leased, scopes, requests)
+    print(f"shared round trips: {shared.round_trips} ({shared.round_trips / requests:.1%} of checks)")
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    asyncio.run(main(requests, clients))
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+class FlushSession:
+    """Stand-in for the AsyncSessionLocal() a write-behind flush opens.
+
+    Records the rows of every bulk execute in `written`; plain selects return
+    them as objects (`rows`), which the flush may update in place.
+    """
+
+    def __init__(self):
+        self.written = []
+        self.rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params=None):
+        if params is not None:
+            self.written += params
+            self.rows += [SimpleNamespace(**row) for row in params]
+            return None
+        return SimpleNamespace(scalars=lambda: iter(self.rows))
+
+    async def commit(self):
+        pass
+
+
+@pytest.fixture
+def flush_session(monkeypatch):
+    """Point a flush module at a FlushSession where only `live_users` exist; returns the session."""
+    def install(module, live_users):
+        session = FlushSession()
+
+        async def lock_live_users(db, user_ids):
+            return set(user_ids) & set(live_users)
+
+        monkeypatch.setattr(module, "AsyncSessionLocal", lambda: session)
+        monkeypatch.setattr(module, "lock_live_users", lock_live_users)
+        return session
+
+    return install
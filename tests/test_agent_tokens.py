@@ -0,0 +1,48 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.services import agent_comm
+from app.services.agent_comm import AgentSession, get_agent_session, issue_agent_token, is_agent_token, resolve_agent_token, verify_agent_token
+
+
+def test_agent_token_round_trip():
+    device_id = str(uuid.uuid4())
+    token = issue_agent_token(device_id, datetime.now(timezone.utc) + timedelta(hours=1))
+    assert is_agent_token(token)
+    assert len(token) < 80
+    assert verify_agent_token(token) == device_id
+
+
+def test_agent_token_rejects_tampering():
+    token = issue_agent_token(str(uuid.uuid4()), datetime.now(timezone.utc) + timedelta(hours=1))
+    prefix, device_part, exp_part, signature = token.split(".")
+    forged = ".".join([prefix, device_part, str(int(exp_part) + 3600), signature])
+    assert verify_agent_token(forged) is None
+    assert verify_agent_token("at1.garbage") is None
+
+
+def test_agent_token_expires():
+    token = issue_agent_token(str(uuid.uuid4()), datetime.now(timezone.utc) - timedelta(seconds=1))
+    assert verify_agent_token(token) is None
+
+
+def test_agent_token_resolves_through_its_session_record(monkeypatch):
+    monkeypatch.setattr(agent_comm, "_agent_sessions", agent_comm.OrderedDict())
+    device_id = str(uuid.uuid4())
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+    token = issue_agent_token(device_id, expires_at)
+    agent_comm._store_agent_session(AgentSession(device_id, token, expires_at, {"os": "linux"}, "1.2.0"))
+
+    assert resolve_agent_token(token) == device_id
+    assert get_agent_session(device_id).system_info == {"os": "linux"}
+    # a token for the same device without the record's signature is checked in full
+    prefix, device_part, exp_part, _signature = token.split(".")
+    assert resolve_agent_token(".".join([prefix, device_part, exp_part, "forged"])) is None
+    assert resolve_agent_token("at1.garbage") is None
+
+
+def test_agent_token_from_another_worker_is_verified_by_signature(monkeypatch):
+    monkeypatch.setattr(agent_comm, "_agent_sessions", agent_comm.OrderedDict())
+    device_id = str(uuid.uuid4())
+    token = issue_agent_token(device_id, datetime.now(timezone.utc) + timedelta(hours=1))
+    assert resolve_agent_token(token) == device_id
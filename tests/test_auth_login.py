@@ -1,9 +1,18 @@
 import types
 
+import pytest
+
 from app.routes.auth import login
 from app.schemas.auth import LoginRequest
 from app.models.user import User, UserRole
-from app.core.security import hash_password
+from app.core.config import settings
+from app.core.security import (
+    hash_password,
+    hash_password_async,
+    password_hash_stats,
+    password_needs_rehash,
+    verify_password_async,
+)
 
 
 class FakeScalars:
@@ -37,3 +46,19 @@ async def test_login_success():
     assert resp["success"] is True
     assert "access_token" in resp["data"]
 
+
+def test_password_needs_rehash_tracks_work_factor(monkeypatch):
+    monkeypatch.setattr(settings, "bcrypt_rounds", 4)
+    current = hash_password("password123")
+    assert password_needs_rehash(current) is False
+    monkeypatch.setattr(settings, "bcrypt_rounds", 5)
+    assert password_needs_rehash(current) is True
+
+
+@pytest.mark.asyncio
+async def test_password_pool_round_trip(monkeypatch):
+    monkeypatch.setattr(settings, "bcrypt_rounds", 4)
+    hashed = await hash_password_async("password123")
+    assert await verify_password_async("password123", hashed) is True
+    assert await verify_password_async("wrong-password", hashed) is False
+    assert password_hash_stats()["pending"] == 0
@@ -1,4 +1,11 @@
-from app.core.security import create_access_token, decode_token
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.security import clear_token_cache, create_access_token, decode_token, get_current_user, invalidate_user_cache, require_roles, Role
+from app.models.user import User, UserRole
 
 
 def test_access_token_contains_role():
@@ -8,3 +15,84 @@ def test_access_token_contains_role():
     assert claims["type"] == "access"
     assert claims["role"] == "student"
 
+
+def test_decode_token_reuses_verified_claims(monkeypatch):
+    clear_token_cache()
+    token = create_access_token("user-123", role="student")
+    first = decode_token(token)
+
+    def fail_decode(*_args, **_kwargs):
+        raise AssertionError("signature verified twice")
+
+    monkeypatch.setattr(security.jwt, "decode", fail_decode)
+    assert decode_token(token) == first
+
+
+def test_decode_token_cache_honours_exp(monkeypatch):
+    clear_token_cache()
+    token = create_access_token("user-123", role="student")
+    claims = decode_token(token)
+
+    def expired_decode(*_args, **_kwargs):
+        raise ValueError("Signature has expired")
+
+    monkeypatch.setattr(security.time, "time", lambda: claims["exp"] + 1)
+    monkeypatch.setattr(security.jwt, "decode", expired_decode)
+    with pytest.raises(HTTPException):
+        decode_token(token)
+
+
+class _FakeResult:
+    def __init__(self, item):
+        self._item = item
+
+    def scalar_one_or_none(self):
+        return self._item
+
+
+class _CountingDB:
+    def __init__(self, user):
+        self.user = user
+        self.queries = 0
+
+    async def execute(self, *_args, **_kwargs):
+        self.queries += 1
+        return _FakeResult(self.user)
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_caches_activation_state():
+    user = User(id=uuid.uuid4(), name="T", email="u@example.com", password_hash="x", role=UserRole.student, is_active=True)
+    claims = {"sub": str(user.id)}
+    db = _CountingDB(user)
+    invalidate_user_cache()
+
+    assert (await get_current_user(claims, db)).role == "student"
+    await get_current_user(claims, db)
+    assert db.queries == 1
+
+    user.is_active = False
+    invalidate_user_cache(str(user.id))
+    with pytest.raises(HTTPException):
+        await get_current_user(claims, db)
+    assert db.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_require_roles_uses_the_cached_user_snapshot():
+    user = User(id=uuid.uuid4(), name="A", email="a@example.com", password_hash="x", role=UserRole.admin, is_active=True)
+    claims = {"sub": str(user.id), "role": "admin"}
+    db = _CountingDB(user)
+    invalidate_user_cache()
+    admin_only = require_roles(Role.admin)
+
+    for _ in range(3):
+        assert await admin_only(claims, await get_current_user(claims, db)) == claims
+    assert db.queries == 1
+
+    # a demoted admin holding an old token is refused once the snapshot reloads
+    user.role = UserRole.student
+    invalidate_user_cache(str(user.id))
+    with pytest.raises(HTTPException) as exc:
+        await admin_only(claims, await get_current_user(claims, db))
+    assert exc.value.status_code == 403
@@ -0,0 +1,63 @@
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services import behavior_ai
+from app.services.behavior_ai import focus_scores, generate_focus_score, predict_distraction, risk_levels, risk_scores, update_ai_insights
+
+
+def _scalar_focus_score(avg_session, distractions_per_hour):
+    # the original per-user formula
+    session_score = min(avg_session / 60.0 * 50, 50)
+    distraction_score = max(0, 50 - (distractions_per_hour * 10))
+    return min(100.0, max(0.0, session_score + distraction_score))
+
+
+def test_vectorized_scores_match_the_per_user_formula():
+    avg = np.array([0.0, 12.5, 60.0, 240.0, 30.0])
+    per_hour = np.array([0.0, 0.3, 1.0, 7.0, 4.99])
+    expected = [_scalar_focus_score(a, d) for a, d in zip(avg, per_hour)]
+    assert np.allclose(focus_scores(avg, per_hour), expected)
+
+
+def test_risk_levels_and_afternoon_weighting():
+    per_hour = np.array([0.0, 0.45, 0.5, 1.9, 2.0])
+    assert list(risk_levels(risk_scores(per_hour, 9))) == ["low", "low", "medium", "medium", "high"]
+    assert list(risk_levels(risk_scores(per_hour, 15))) == ["low", "medium", "medium", "high", "high"]
+
+
+@pytest.mark.asyncio
+async def test_precomputed_patterns_skip_the_database():
+    patterns = {"avg_session_length_minutes": 30.0, "distractions_per_hour": 2.5, "distraction_count": 420}
+    assert await generate_focus_score("ignored", None, patterns) == 25.0 + 25.0
+    prediction = await predict_distraction("ignored", datetime(2026, 10, 19, 10), None, patterns)
+    assert prediction["risk_level"] == "high"
+    assert prediction["next_prediction"] == datetime(2026, 10, 19, 11)
+
+
+class _UpsertDB:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement, *_args, **_kwargs):
+        self.statements.append(statement)
+        return SimpleNamespace(scalar_one=lambda: "insight")
+
+    async def commit(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_first_insight_for_a_user_is_an_upsert(monkeypatch):
+    async def patterns(user_id, db):
+        return {"avg_session_length_minutes": 30.0, "distractions_per_hour": 0.5, "distraction_count": 84}
+
+    monkeypatch.setattr(behavior_ai, "analyze_focus_patterns", patterns)
+    db = _UpsertDB()
+    assert await update_ai_insights(str(uuid.uuid4()), db) == "insight"
+    [statement] = db.statements
+    assert "ON CONFLICT (user_id) DO UPDATE" in str(statement.compile(dialect=postgresql.dialect()))
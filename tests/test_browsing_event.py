@@ -0,0 +1,90 @@
+import types
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from app.routes.analytics import get_focus_analytics
+from app.routes.browsing import browsing_event
+from app.schemas.browsing import BrowsingEvent
+from app.models.activity_log import ActivityLog
+from app.services import dirty_users, focus_stats, heavy_hitters, rollups
+from app.services.filter_engine import EvaluationResult
+
+
+class FakeResult:
+    def __init__(self, items):
+        self._items = items
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._items
+
+    def first(self):
+        return self._items[0] if self._items else None
+
+    def scalar_one_or_none(self):
+        return self.first()
+
+    def __iter__(self):
+        return iter(self._items)
+
+
+class FakeDB:
+    """Answers queries in order from `results`; records added objects."""
+
+    def __init__(self, results=()):
+        self.results = list(results)
+        self.added = []
+
+    async def execute(self, *_args, **_kwargs):
+        return FakeResult(self.results.pop(0) if self.results else [])
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def commit(self):
+        return None
+
+
+@pytest.mark.asyncio
+async def test_blocked_visit_shows_up_in_top_distractions(monkeypatch):
+    for module in (focus_stats, rollups, heavy_hitters):
+        monkeypatch.setattr(module, "_pending", {})
+    monkeypatch.setattr(dirty_users, "_dirty", set())
+    user_id = uuid.uuid4()
+    device = types.SimpleNamespace(id=uuid.uuid4(), user_id=user_id, device_name="Laptop")
+    sent = []
+
+    async def fake_device_entry(db, device_id):
+        return device
+
+    async def fake_evaluate(db, device, url, metadata):
+        return EvaluationResult(category="C", reason="Adult content", matched_rule=None)
+
+    monkeypatch.setitem(browsing_event.__globals__, "get_device_entry", fake_device_entry)
+    monkeypatch.setitem(browsing_event.__globals__, "evaluate_access", fake_evaluate)
+    monkeypatch.setitem(browsing_event.__globals__, "send_email", lambda subject, recipients, body, **kw: sent.append(subject))
+
+    at = datetime.now(timezone.utc)
+    payload = BrowsingEvent(device_id=str(device.id), url="https://blocked.example/page", timestamp=at)
+    db = FakeDB()
+    resp = await browsing_event(payload, claims={"sub": str(user_id)}, db=db)
+    assert resp["data"]["category"] == "C"
+    assert sent == ["Project Alpha Alert: Category C"]
+    [log] = [obj for obj in db.added if isinstance(obj, ActivityLog)]
+    assert log.action_type == "blocked" and log.details["domain"] == "blocked.example"
+    assert focus_stats._pending == {(user_id, focus_stats.hour_of(at)): focus_stats.HourBin(distraction_count=1)}
+    assert dirty_users._dirty == {user_id}
+    assert rollups._pending[(focus_stats.hour_of(at), device.id, user_id, "blocked.example", None)] == rollups.RollupCounts(blocked=1)
+
+    # what the write-behind flush would have stored, read back by the endpoint
+    sketches = [(hour, sketch.to_dict()) for (user, hour), sketch in heavy_hitters._pending.items() if user == user_id]
+    insight = types.SimpleNamespace(
+        focus_score=50.0, distractions_per_hour=0.1, avg_session_length_minutes=5.0, next_prediction=None, updated_at=at,
+    )
+    db = FakeDB([[insight], sketches, []])
+    resp = await get_focus_analytics(str(user_id), window_hours=24, claims={"sub": str(user_id)}, db=db)
+    assert resp["data"]["top_distractions"] == [{"domain": "blocked.example", "count": 1}]
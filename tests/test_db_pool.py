@@ -0,0 +1,44 @@
+from app.core.database import TimedAsyncQueuePool, db_pool_checkouts_total, db_pool_wait_seconds, pool_stats
+
+
+class _FakeConnection:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _observations():
+    return sum(db_pool_wait_seconds.values.get((), [0, 0.0])[:-1])
+
+
+def test_timed_pool_records_waits_and_checkouts():
+    pool = TimedAsyncQueuePool(_FakeConnection, pool_size=2, max_overflow=0)
+    observed_before = _observations()
+    ok_before = db_pool_checkouts_total.values.get(("ok",), 0)
+
+    first = pool.connect()
+    second = pool.connect()
+    assert pool_stats(pool) == {"size": 2, "checked_out": 2, "idle": 0, "overflow": 0}
+
+    first.close()
+    second.close()
+    assert pool_stats(pool)["idle"] == 2
+
+    assert db_pool_checkouts_total.values[("ok",)] == ok_before + 2
+    assert _observations() == observed_before + 2
+
+
+def test_report_and_listing_routes_read_from_read_session():
+    from app.core.database import get_db, get_read_db
+    from app.main import app
+
+    def dependencies(path, method):
+        route = next(r for r in app.routes if getattr(r, "path", None) == path and method in r.methods)
+        return {d.call for d in route.dependant.dependencies}
+
+    assert get_read_db in dependencies("/api/reports/daily", "GET")
+    assert get_read_db in dependencies("/api/activity/logs", "GET")
+    assert get_db in dependencies("/api/browsing/event", "POST")
+    assert get_read_db not in dependencies("/api/browsing/event", "POST")
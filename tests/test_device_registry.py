@@ -0,0 +1,50 @@
+import uuid
+
+import pytest
+
+from app.models.device import Device
+from app.services.device_registry import clear_registry, forget_device, get_device_entry, remember_device
+
+
+class FakeDB:
+    def __init__(self, devices):
+        self.devices = {d.id: d for d in devices}
+        self.gets = 0
+
+    async def get(self, _model, key):
+        self.gets += 1
+        return self.devices.get(key)
+
+
+def _device(**kwargs):
+    return Device(id=uuid.uuid4(), user_id=uuid.uuid4(), device_name="d1", mac_address="m", is_active=True, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_registry_loads_once_then_serves_from_memory():
+    clear_registry()
+    device = _device()
+    db = FakeDB([device])
+
+    first = await get_device_entry(db, str(device.id))
+    second = await get_device_entry(db, device.id)
+
+    assert first == second
+    assert first.user_id == device.user_id
+    assert db.gets == 1
+
+
+@pytest.mark.asyncio
+async def test_registry_invalidation_and_priming():
+    clear_registry()
+    device = _device()
+    db = FakeDB([device])
+
+    remember_device(device)
+    assert (await get_device_entry(db, device.id)).is_active is True
+    assert db.gets == 0
+
+    forget_device(device.id)
+    del db.devices[device.id]
+    assert await get_device_entry(db, device.id) is None
+    assert await get_device_entry(db, "not-a-uuid") is None
@@ -0,0 +1,40 @@
+from app.services import email_service
+
+
+class _FakeSMTP:
+    sent = []
+
+    def __init__(self, host, port):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def sendmail(self, sender, recipient, message):
+        self.sent.append(recipient)
+
+
+def _count(outcome):
+    series = email_service.email_send_seconds.values.get((outcome,))
+    return sum(series[:-1]) if series else 0
+
+
+def test_rate_limited_sends_get_their_own_outcome(monkeypatch):
+    monkeypatch.setattr(email_service.smtplib, "SMTP", _FakeSMTP)
+    monkeypatch.setattr(email_service, "_last_sent", {})
+    monkeypatch.setattr(_FakeSMTP, "sent", [])
+    sent, limited, failed = _count("sent"), _count("rate_limited"), _count("failed")
+
+    assert email_service.send_email("Alert", ["admin@example.com"], "body", rate_key="k")
+    assert email_service.send_email("Alert", ["admin@example.com"], "body", rate_key="k")
+    assert _FakeSMTP.sent == ["admin@example.com"]
+    assert (_count("sent"), _count("rate_limited"), _count("failed")) == (sent + 1, limited + 1, failed)
@@ -0,0 +1,68 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services import focus_stats
+from app.services.behavior_ai import focus_scores
+
+
+@pytest.fixture(autouse=True)
+def pending(monkeypatch):
+    monkeypatch.setattr(focus_stats, "_pending", {})
+
+
+def test_hour_of_treats_naive_timestamps_as_utc():
+    hour = datetime(2026, 10, 19, 14, tzinfo=timezone.utc)
+    assert focus_stats.hour_of(datetime(2026, 10, 19, 14, 59, 59)) == hour
+    assert focus_stats.hour_of(datetime(2026, 10, 19, 16, 30, tzinfo=timezone(timedelta(hours=2)))) == hour
+    assert focus_stats.window_start(datetime(2026, 10, 26, 14, 30)) == hour
+
+
+def test_increments_accumulate_per_user_hour():
+    user = uuid.uuid4()
+    at = datetime(2026, 10, 19, 9, 15, tzinfo=timezone.utc)
+    focus_stats.record_browsing(str(user), 120, at)
+    focus_stats.record_browsing(user, 60, at + timedelta(minutes=30))
+    focus_stats.record_browsing(user, None, at)  # no duration: not part of the average
+    focus_stats.record_distraction(user, at)
+    focus_stats.record_browsing(None, 60, at)
+    assert focus_stats._pending == {(user, at.replace(minute=0)): focus_stats.HourBin(180, 2, 1)}
+
+
+def test_window_totals_give_the_raw_query_results():
+    # 3 visits averaging 10 minutes, 84 distractions over 168 hours
+    patterns = focus_stats.patterns_from_totals(1800, 3, 84)
+    assert patterns == {"avg_session_length_minutes": 10.0, "distractions_per_hour": 0.5, "distraction_count": 84}
+    assert float(focus_scores(patterns["avg_session_length_minutes"], patterns["distractions_per_hour"])) == pytest.approx(10 / 60 * 50 + 45)
+    assert focus_stats.patterns_from_totals(0, 0, 0)["avg_session_length_minutes"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_merges_back_into_newer_increments(monkeypatch):
+    user = uuid.uuid4()
+    at = datetime(2026, 10, 19, 9, tzinfo=timezone.utc)
+    focus_stats.record_browsing(user, 30, at)
+
+    def unavailable():
+        # increments arriving while the flush is in flight
+        focus_stats.record_browsing(user, 10, at)
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(focus_stats, "AsyncSessionLocal", unavailable)
+    with pytest.raises(ConnectionError):
+        await focus_stats.flush_focus_stats()
+    assert focus_stats._pending == {(user, at): focus_stats.HourBin(40, 2, 0)}
+
+
+@pytest.mark.asyncio
+async def test_increments_of_deleted_users_are_dropped(flush_session):
+    live, deleted = uuid.uuid4(), uuid.uuid4()
+    at = datetime(2026, 10, 19, 9, tzinfo=timezone.utc)
+    focus_stats.record_browsing(live, 30, at)
+    focus_stats.record_distraction(deleted, at)
+    session = flush_session(focus_stats, [live])
+
+    assert await focus_stats.flush_focus_stats() == 1
+    assert [row["user_id"] for row in session.written] == [live]
+    assert focus_stats._pending == {}
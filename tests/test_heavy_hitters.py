@@ -0,0 +1,92 @@
+import random
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services import heavy_hitters
+from app.services.heavy_hitters import SpaceSaving
+
+
+def _stream(seed=7, length=20_000):
+    # a few heavy domains over a long tail
+    rng = random.Random(seed)
+    heavy = ["youtube.com"] * 6 + ["reddit.com"] * 4 + ["x.com"] * 3
+    return [rng.choice(heavy) if rng.random() < 0.4 else f"site{rng.randrange(5000)}.example" for _ in range(length)]
+
+
+def test_space_saving_finds_heavy_hitters_with_bounded_error():
+    stream = _stream()
+    sketch = SpaceSaving(capacity=32)
+    for item in stream:
+        sketch.add(item)
+
+    truth = Counter(stream)
+    assert [item for item, _count, _error in sketch.top(3)] == ["youtube.com", "reddit.com", "x.com"]
+    assert len(sketch.counts) == 32
+    for item, count, error in sketch.top(32):
+        assert count - error <= truth[item] <= count
+
+
+def test_merged_hourly_sketches_match_a_single_sketch_on_the_top_items():
+    stream = _stream(seed=11)
+    hours = [SpaceSaving(32) for _ in range(4)]
+    for i, item in enumerate(stream):
+        hours[i % 4].add(item)
+    merged = SpaceSaving(32)
+    for hour in hours:
+        merged.merge(SpaceSaving.from_dict(hour.to_dict()))
+
+    assert merged.total == len(stream)
+    assert [item for item, _count, _error in merged.top(3)] == ["youtube.com", "reddit.com", "x.com"]
+    truth = Counter(stream)
+    for item, count, error in merged.top(32):
+        assert count - error <= truth[item] <= count
+
+
+def test_merged_sketches_bound_every_monitored_item():
+    # a Zipf-like tail: mid-ranked domains are monitored in some hours and evicted in others
+    rng = random.Random(3)
+    stream = [f"site{int(rng.paretovariate(1.0))}.example" for _ in range(20_000)]
+    hours = [SpaceSaving(32) for _ in range(8)]
+    for i, item in enumerate(stream):
+        hours[i % 8].add(item)
+    merged = SpaceSaving(32)
+    for hour in hours:
+        merged.merge(hour)
+
+    truth = Counter(stream)
+    assert merged.total == len(stream)
+    assert len(merged.counts) == 32
+    for item, count, error in merged.top(32):
+        assert count - error <= truth[item] <= count
+
+
+def test_distraction_domains_are_sketched_per_user_hour(monkeypatch):
+    monkeypatch.setattr(heavy_hitters, "_pending", {})
+    user = uuid.uuid4()
+    at = datetime(2026, 10, 19, 9, 45, tzinfo=timezone.utc)
+    for domain in ["youtube.com", "youtube.com", "x.com", None]:
+        heavy_hitters.record_distraction_domain(str(user), domain, at)
+    heavy_hitters.record_distraction_domain(None, "x.com", at)
+
+    [(key, sketch)] = heavy_hitters._pending.items()
+    assert key == (user, at.replace(minute=0))
+    assert sketch.top(2) == [("youtube.com", 2, 0), ("x.com", 1, 0)]
+
+
+@pytest.mark.asyncio
+async def test_sketches_of_deleted_users_are_dropped(monkeypatch, flush_session):
+    monkeypatch.setattr(heavy_hitters, "_pending", {})
+    live, deleted = uuid.uuid4(), uuid.uuid4()
+    at = datetime(2026, 10, 19, 9, tzinfo=timezone.utc)
+    heavy_hitters.record_distraction_domain(live, "youtube.com", at)
+    heavy_hitters.record_distraction_domain(deleted, "x.com", at)
+    session = flush_session(heavy_hitters, [live])
+
+    assert await heavy_hitters.flush_sketches() == 1
+    [row] = session.rows
+    assert (row.user_id, row.hour) == (live, at)
+    assert SpaceSaving.from_dict(row.sketch).top(1) == [("youtube.com", 1, 0)]
+    assert heavy_hitters._pending == {}
@@ -0,0 +1,97 @@
+import json
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app.services import log_archive  # noqa: E402
+from app.services.log_archive import ArchiveWriter, _save_manifest, archived_through, load_manifest, read_archive  # noqa: E402
+
+
+def test_rows_are_written_per_day_and_device_and_read_back(tmp_path):
+    devices = [uuid.uuid4(), uuid.uuid4()]
+    start = datetime(2026, 9, 1, 22, tzinfo=timezone.utc)
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "user_id": uuid.uuid4(),
+            "device_id": device,
+            "action_type": "blocked",
+            "details": {"url": f"https://site{i}.com"},
+            "timestamp": start + timedelta(hours=hour),
+        }
+        for hour in (0, 3)  # 22:00 on the 1st and 01:00 on the 2nd
+        for device in devices
+        for i in range(3)
+    ]
+    rows.sort(key=lambda r: (r["timestamp"].date(), str(r["device_id"]), r["timestamp"]))
+
+    root = tmp_path / "activity_logs"
+    writer = ArchiveWriter("activity_logs", root, "run1", batch_rows=2)
+    for row in rows:
+        writer.add(row)
+    entries = writer.close()
+    _save_manifest(root, {"table": "activity_logs", "archived_through": None, "files": entries})
+
+    assert len(entries) == 4
+    assert {e["day"] for e in entries} == {"2026-09-01", "2026-09-02"}
+    assert all(e["rows"] == 3 and (root / e["path"]).exists() for e in entries)
+    assert not list(root.rglob("*.tmp"))
+    assert len(load_manifest("activity_logs", str(tmp_path))["files"]) == 4
+
+    day_one = read_archive("activity_logs", date(2026, 9, 1), date(2026, 9, 2), archive_dir=str(tmp_path))
+    assert day_one.num_rows == 6
+
+    one_device = read_archive(
+        "activity_logs", date(2026, 9, 1), date(2026, 9, 3),
+        device_ids=[devices[0]], columns=["device_id", "details"], archive_dir=str(tmp_path),
+    )
+    assert one_device.num_rows == 6
+    assert set(one_device.column("device_id").to_pylist()) == {str(devices[0])}
+    assert json.loads(one_device.column("details")[0].as_py())["url"].startswith("https://site")
+
+    assert read_archive("activity_logs", date(2026, 10, 1), date(2026, 10, 2), archive_dir=str(tmp_path)).num_rows == 0
+
+
+class _SlicePacer:
+    """Runs out of time after `steps` checks."""
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.recorded = []
+
+    def out_of_time(self):
+        self.steps -= 1
+        return self.steps < 0
+
+    def record(self, rows, seconds):
+        self.recorded.append(rows)
+
+
+@pytest.mark.asyncio
+async def test_archiving_advances_a_day_at_a_time_within_the_slice(tmp_path, monkeypatch):
+    days = [datetime(2026, 9, d, 12, tzinfo=timezone.utc) for d in (1, 2, 5)]
+    ranges = []
+
+    async def oldest(table, since, cutoff):
+        return min((t for t in days if (since is None or t >= since) and t < cutoff), default=None)
+
+    async def archive_range(table, root, start, end, batch_rows):
+        ranges.append((start, end))
+        return [{"path": f"part-{start:%d}", "rows": sum(start <= t < end for t in days)}]
+
+    monkeypatch.setattr(log_archive, "_oldest_unarchived", oldest)
+    monkeypatch.setattr(log_archive, "_archive_range", archive_range)
+    cutoff = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+    pacer = _SlicePacer(2)
+    assert await log_archive.archive_expired("activity_logs", cutoff, archive_dir=str(tmp_path), pacer=pacer) == 2
+    assert archived_through("activity_logs", str(tmp_path)) == datetime(2026, 9, 3, tzinfo=timezone.utc)
+    assert pacer.recorded == [1, 1]
+
+    # the next slice skips the empty days and finishes
+    assert await log_archive.archive_expired("activity_logs", cutoff, archive_dir=str(tmp_path), pacer=_SlicePacer(5)) == 1
+    assert ranges[-1] == (datetime(2026, 9, 5, tzinfo=timezone.utc), datetime(2026, 9, 6, tzinfo=timezone.utc))
+    assert archived_through("activity_logs", str(tmp_path)) == cutoff
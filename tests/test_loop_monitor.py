@@ -0,0 +1,26 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.loop_monitor import LoopMonitor
+
+
+def _blocking_helper():
+    time.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_loop_monitor_captures_stack_of_blocking_call():
+    monitor = LoopMonitor(interval_seconds=0.01, threshold_seconds=0.1)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        _blocking_helper()
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    [block] = monitor.blocked_calls()
+    assert block["blocked_for_ms"] >= 100
+    assert any("_blocking_helper" in line for line in block["stack"])
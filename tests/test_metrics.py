@@ -0,0 +1,33 @@
+from app.core import metrics
+from app.core.metrics import Counter, Histogram, render_prometheus
+
+
+def test_counter_and_histogram_render_prometheus_text():
+    requests = Counter("test_requests_total", "Test requests.", ("route",))
+    latency = Histogram("test_latency_seconds", "Test latency.", ("route",), buckets=(0.1, 1.0))
+    try:
+        requests.inc("/a")
+        requests.inc("/a", amount=2)
+        latency.observe(0.05, "/a")
+        latency.observe(0.5, "/a")
+        latency.observe(5.0, "/a")
+
+        text = render_prometheus()
+        assert "# TYPE test_requests_total counter" in text
+        assert 'test_requests_total{route="/a"} 3' in text
+        assert 'test_latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{route="/a",le="1"} 2' in text
+        assert 'test_latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+        assert 'test_latency_seconds_count{route="/a"} 3' in text
+    finally:
+        metrics._registry.remove(requests)
+        metrics._registry.remove(latency)
+
+
+def test_label_values_are_escaped():
+    counter = Counter("test_escape_total", "Escaping.", ("value",))
+    try:
+        counter.inc('a"b\nc')
+        assert 'test_escape_total{value="a\\"b\\nc"} 1' in render_prometheus()
+    finally:
+        metrics._registry.remove(counter)
@@ -0,0 +1,61 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.tasks import partitions as partitions_module
+from app.tasks.partitions import Partition, _BOUNDS_RE, _parse_bound, create_daily_partitions, partition_name
+
+
+def _bounds(expr):
+    match = _BOUNDS_RE.search(expr)
+    return _parse_bound(match["lower"]), _parse_bound(match["upper"])
+
+
+def test_bounds_are_parsed_from_pg_get_expr():
+    lower, upper = _bounds("FOR VALUES FROM ('2026-10-19 00:00:00+00') TO ('2026-10-20 00:00:00+00')")
+    assert lower == datetime(2026, 10, 19, tzinfo=timezone.utc)
+    assert upper == datetime(2026, 10, 20, tzinfo=timezone.utc)
+
+    lower, upper = _bounds("FOR VALUES FROM (MINVALUE) TO ('2026-10-20 05:30:00+05:30')")
+    assert lower is None
+    assert upper == datetime(2026, 10, 20, tzinfo=timezone.utc)
+
+
+def test_expiry_and_anonymization_windows():
+    cutoff = datetime(2026, 10, 1, 12, tzinfo=timezone.utc)
+    before = Partition("browsing_history_p20260930", datetime(2026, 9, 30, tzinfo=timezone.utc), datetime(2026, 10, 1, tzinfo=timezone.utc))
+    straddling = Partition("browsing_history_p20261001", datetime(2026, 10, 1, tzinfo=timezone.utc), datetime(2026, 10, 2, tzinfo=timezone.utc))
+    after = Partition("browsing_history_p20261002", datetime(2026, 10, 2, tzinfo=timezone.utc), datetime(2026, 10, 3, tzinfo=timezone.utc))
+    default = Partition("browsing_history_default", None, None, is_default=True)
+
+    assert before.ends_before(cutoff) and before.starts_before(cutoff)
+    assert not straddling.ends_before(cutoff) and straddling.starts_before(cutoff)
+    assert not after.starts_before(cutoff)
+    assert not default.ends_before(cutoff) and default.starts_before(cutoff)
+    assert partition_name("activity_logs", date(2026, 1, 5)) == "activity_logs_p20260105"
+
+
+class _RecordingConn:
+    def __init__(self):
+        self.statements = []
+
+    async def exec_driver_sql(self, statement):
+        self.statements.append(statement)
+
+
+@pytest.mark.asyncio
+async def test_days_covered_by_the_legacy_partition_are_not_recreated(monkeypatch):
+    # migrated on 2026-10-19: the legacy partition runs up to the next midnight
+    async def partitions(conn, table):
+        return [
+            Partition("activity_logs_legacy", None, datetime(2026, 10, 20, tzinfo=timezone.utc)),
+            Partition("activity_logs_p20261020", datetime(2026, 10, 20, tzinfo=timezone.utc), datetime(2026, 10, 21, tzinfo=timezone.utc)),
+            Partition("activity_logs_default", None, None, is_default=True),
+        ]
+
+    monkeypatch.setattr(partitions_module, "list_partitions", partitions)
+    conn = _RecordingConn()
+    created = await create_daily_partitions(conn, "activity_logs", date(2026, 10, 19), 3)
+
+    assert created == ["activity_logs_p20261021"]
+    assert not any("p20261019" in statement for statement in conn.statements)
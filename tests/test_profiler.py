@@ -0,0 +1,25 @@
+import threading
+
+from app.core.profiler import profile
+
+
+def _spin_for_profiler(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_reports_collapsed_stacks_and_allocations():
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin_for_profiler, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        result = profile(0.2, interval_seconds=0.002)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert result["samples"] > 0
+    busy = [line for line in result["collapsed"].splitlines() if line.startswith("busy-worker;")]
+    assert busy and "_spin_for_profiler" in busy[0]
+    assert int(busy[0].rsplit(" ", 1)[1]) > 0
+    assert isinstance(result["allocations"], list)
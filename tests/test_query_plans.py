@@ -0,0 +1,177 @@
+"""EXPLAIN regression checks for the hot query shapes.
+
+Needs a disposable Postgres: set TEST_DATABASE_URL (asyncpg URL). The suite
+builds the schema from the models in a scratch schema, seeds a few hundred
+thousand rows, and asserts the planner reaches each table through an index,
+or for the partitioned history tables, at least prunes to the days asked for.
+"""
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+import app.models  # noqa: F401 - register all tables on Base.metadata
+from app.core.database import Base
+from app.tasks.partitions import PARTITIONED_TABLES, create_daily_partitions, create_default_partition
+
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+SCHEMA = "query_plan_check"
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+USERS = 200
+DEVICES = 1000
+HISTORY_ROWS = 300_000
+ACTIVITY_ROWS = 150_000
+RULES = 5000
+ACTIVE_RULES = 100
+DAYS = 60
+
+# (description, relation, SQL, expectation): "index" means every scan of the
+# relation (or its partitions) goes through an index; "pruned" allows
+# sequential scans but no partition for a day before the range.
+QUERIES = [
+    (
+        "device history window (behavior_ai)",
+        "browsing_history",
+        "SELECT avg(duration_seconds) FROM browsing_history "
+        "WHERE device_id = :device_id AND timestamp >= :week_ago AND duration_seconds IS NOT NULL",
+        "index",
+    ),
+    (
+        "visits in the last day (daily_summary)",
+        "browsing_history",
+        "SELECT count(*) FROM browsing_history WHERE timestamp >= :day_ago",
+        "pruned",
+    ),
+    (
+        "user alert window (behavior_ai)",
+        "activity_logs",
+        "SELECT count(*) FROM activity_logs "
+        "WHERE user_id = :user_id AND action_type IN ('alert_sent', 'blocked') AND timestamp >= :week_ago",
+        "index",
+    ),
+    (
+        "recent user alerts (analytics)",
+        "activity_logs",
+        "SELECT * FROM activity_logs WHERE user_id = :user_id AND action_type IN ('alert_sent', 'blocked') "
+        "ORDER BY timestamp DESC LIMIT 10",
+        "index",
+    ),
+    (
+        "device block count (device_summary)",
+        "activity_logs",
+        "SELECT count(*) FROM activity_logs WHERE device_id = :device_id AND action_type = 'blocked'",
+        "index",
+    ),
+    (
+        "blocked in the last day (daily_summary)",
+        "activity_logs",
+        "SELECT count(*) FROM activity_logs WHERE action_type = 'blocked' AND timestamp >= :day_ago",
+        "pruned",
+    ),
+    (
+        "active rules (filter_engine)",
+        "blocked_sites",
+        "SELECT * FROM blocked_sites WHERE is_active = true",
+        "index",
+    ),
+    (
+        "devices of a user (behavior_ai, listings)",
+        "devices",
+        "SELECT id FROM devices WHERE user_id = :user_id",
+        "index",
+    ),
+]
+
+SEED = [
+    f"""INSERT INTO users (id, name, email, password_hash, role, created_at, is_active)
+        SELECT gen_random_uuid(), 'user ' || g, 'user' || g || '@example.com', 'x', 'student', now(), true
+        FROM generate_series(1, {USERS}) g""",
+    f"""INSERT INTO devices (id, user_id, device_name, mac_address, registered_at, is_active)
+        SELECT gen_random_uuid(), u.id, 'device ' || g, 'mac-' || g, now(), true
+        FROM generate_series(1, {DEVICES}) g
+        JOIN LATERAL (SELECT id FROM users ORDER BY id OFFSET (g % {USERS}) LIMIT 1) u ON true""",
+    f"""INSERT INTO browsing_history (id, device_id, url, domain, category, duration_seconds, timestamp)
+        SELECT gen_random_uuid(), d.ids[1 + (g % {DEVICES})], 'https://site' || (g % 500) || '.com/p',
+               'site' || (g % 500) || '.com', (ARRAY['A', 'B', 'C'])[1 + g % 3], g % 600,
+               now() - (random() * interval '{DAYS} days')
+        FROM generate_series(1, {HISTORY_ROWS}) g, (SELECT array_agg(id) AS ids FROM devices) d""",
+    f"""INSERT INTO activity_logs (id, user_id, device_id, action_type, details, timestamp)
+        SELECT gen_random_uuid(), dv.user_id, dv.id,
+               (ARRAY['visit', 'visit', 'visit', 'alert_sent', 'blocked', 'login'])[1 + g % 6],
+               '{{}}'::json, now() - (random() * interval '{DAYS} days')
+        FROM generate_series(1, {ACTIVITY_ROWS}) g
+        JOIN (SELECT id, user_id, row_number() OVER (ORDER BY id) - 1 AS n FROM devices) dv ON dv.n = g % {DEVICES}""",
+    f"""INSERT INTO blocked_sites (id, url_pattern, match_type, category, added_at, is_active)
+        SELECT gen_random_uuid(), 'blocked' || g || '.com', 'domain', 'C', now(), g <= {ACTIVE_RULES}
+        FROM generate_series(1, {RULES}) g""",
+]
+
+
+def _relation(scan, relation: str) -> bool:
+    _node, name, index = scan
+    return (name or "").startswith(relation) or (index or "").startswith(f"ix_{relation}") or (index or "").startswith(relation)
+
+
+def _scans(plan: dict):
+    yield plan.get("Node Type"), plan.get("Relation Name"), plan.get("Index Name")
+    for child in plan.get("Plans", []):
+        yield from _scans(child)
+
+
+@pytest.mark.asyncio
+async def test_hot_queries_use_indexes():
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(TEST_DATABASE_URL)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            await conn.execute(text(f"SET search_path TO {SCHEMA}"))
+            # search_path is the scratch schema only, so create_all never sees existing tables
+            await conn.run_sync(Base.metadata.create_all)
+            first_day = (datetime.now(timezone.utc) - timedelta(days=DAYS + 1)).date()
+            for table in PARTITIONED_TABLES:
+                await create_default_partition(conn, table)
+                await create_daily_partitions(conn, table, first_day, DAYS + 3)
+            for statement in SEED:
+                await conn.execute(text(statement))
+            await conn.execute(text("ANALYZE users, devices, browsing_history, activity_logs, blocked_sites"))
+
+            user_id = (await conn.execute(text("SELECT user_id FROM devices LIMIT 1"))).scalar_one()
+            device_id = (await conn.execute(text("SELECT id FROM devices LIMIT 1"))).scalar_one()
+            now = datetime.now(timezone.utc)
+            params = {
+                "user_id": user_id,
+                "device_id": device_id,
+                "day_ago": now - timedelta(days=1),
+                "week_ago": now - timedelta(days=7),
+            }
+
+            failures = []
+            for description, relation, sql, expectation in QUERIES:
+                bound = {k: v for k, v in params.items() if f":{k}" in sql}
+                plan = (await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), bound)).scalar_one()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scans = [scan for scan in _scans(plan[0]["Plan"]) if _relation(scan, relation)]
+                if expectation == "pruned":
+                    first = f"{params['day_ago']:%Y%m%d}"
+                    days = {name.rsplit("_p", 1)[-1] for _, name, _ in scans if name and name.rsplit("_p", 1)[-1].isdigit()}
+                    ok = bool(scans) and all(day >= first for day in days)
+                else:
+                    ok = bool(scans) and not any(node == "Seq Scan" for node, _, _ in scans)
+                if not ok:
+                    failures.append(f"{description}: {scans or 'no scan of ' + relation}")
+            await conn.rollback()
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+
+    assert not failures, "unindexed or unpruned scans on hot paths:\n" + "\n".join(failures)
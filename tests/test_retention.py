@@ -0,0 +1,139 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import pytest
+
+from app.tasks import archive_logs
+from app.tasks.pacing import BatchPacer
+from app.tasks.partitions import Partition, retention_cutoff
+
+
+class _Result:
+    def __init__(self, rowcount):
+        self.rowcount = rowcount
+
+
+class _FakeEngine:
+    """Pretends each partition holds `rows[name]` expired rows."""
+
+    def __init__(self, rows):
+        self.rows = dict(rows)
+        self.transactions = 0
+
+    @asynccontextmanager
+    async def connect(self):
+        yield self
+
+    @asynccontextmanager
+    async def begin(self):
+        self.transactions += 1
+        yield self
+
+    async def execute(self, statement, params):
+        name = str(statement).split('"')[1]
+        deleted = min(self.rows[name], params["limit"])
+        self.rows[name] -= deleted
+        return _Result(deleted)
+
+
+@pytest.mark.asyncio
+async def test_expired_rows_are_deleted_in_committed_batches(monkeypatch):
+    fake = _FakeEngine({"activity_logs_p20260101": 25, "activity_logs_default": 3})
+
+    async def partitions(conn, table):
+        return [
+            Partition("activity_logs_p20260101", datetime(2026, 1, 1, tzinfo=timezone.utc), datetime(2026, 1, 2, tzinfo=timezone.utc)),
+            Partition("activity_logs_p20300101", datetime(2030, 1, 1, tzinfo=timezone.utc), datetime(2030, 1, 2, tzinfo=timezone.utc)),
+            Partition("activity_logs_default", None, None, is_default=True),
+        ]
+
+    monkeypatch.setattr(archive_logs, "engine", fake)
+    monkeypatch.setattr(archive_logs, "partitions_or_table", partitions)
+
+    cutoff = datetime(2026, 6, 1, tzinfo=timezone.utc)
+    pacer = BatchPacer(10, target_seconds=60, pause_seconds=0, min_batch=10, max_batch=10)
+    deleted = await archive_logs.delete_expired_rows("activity_logs", cutoff, pacer)
+
+    assert deleted == 28
+    assert fake.rows == {"activity_logs_p20260101": 0, "activity_logs_default": 0}
+    # 10 + 10 + 5 in the dated partition, 3 in the default one; the future partition is never touched
+    assert fake.transactions == 4
+
+
+def test_pacer_backs_off_on_slow_batches_and_recovers():
+    pacer = BatchPacer(1000, target_seconds=0.5, pause_seconds=0.1, min_batch=100, max_batch=2000)
+
+    pacer.record(1000, 2.0)
+    assert pacer.batch_size == 500
+    assert pacer.pause_seconds == 0.2
+
+    for _ in range(3):
+        pacer.record(pacer.batch_size, 3.0)
+    assert pacer.batch_size == 100  # never below min_batch
+
+    for _ in range(20):
+        pacer.record(pacer.batch_size, 0.1)
+    assert pacer.batch_size == 2000
+    assert pacer.pause_seconds == 0.1
+    assert pacer.rows > 0 and pacer.batches == 24
+
+
+@pytest.mark.asyncio
+async def test_pacer_backs_off_on_replication_lag_and_honours_the_slice():
+    lags = [30.0]
+
+    async def probe():
+        return lags[0]
+
+    pacer = BatchPacer(1000, target_seconds=10, pause_seconds=0, lag_probe=probe, max_lag_seconds=5)
+    await pacer.pause()
+    assert pacer.batch_size == 500
+    assert pacer.last_lag_seconds == 30.0
+
+    assert not pacer.out_of_time()
+    pacer.start_slice(0)
+    assert pacer.out_of_time()
+    pacer.start_slice(None)
+    assert not pacer.out_of_time()
+
+
+def test_retention_cutoff_is_a_utc_day_boundary():
+    now = datetime(2026, 10, 19, 15, 30, tzinfo=timezone.utc)
+    assert retention_cutoff(30, now) == datetime(2026, 9, 19, tzinfo=timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_summaries_are_pruned_no_further_than_the_archived_rows(monkeypatch):
+    through = {"browsing_history": datetime(2026, 8, 1, tzinfo=timezone.utc), "activity_logs": datetime(2026, 7, 1, tzinfo=timezone.utc)}
+    deleted_before, pruned = {}, []
+
+    async def archive_expired(table, cutoff, pacer=None):
+        return 0
+
+    async def expire_partitions(table, cutoff):
+        return []
+
+    async def delete_expired_rows(table, cutoff, pacer):
+        deleted_before[table] = cutoff
+        return 0
+
+    async def prune(cutoff):
+        pruned.append(cutoff)
+
+    monkeypatch.setattr(archive_logs.settings, "log_archive_dir", "/archive")
+    monkeypatch.setattr(archive_logs.log_archive, "archive_expired", archive_expired)
+    monkeypatch.setattr(archive_logs.log_archive, "archived_through", through.get)
+    monkeypatch.setattr(archive_logs, "expire_partitions", expire_partitions)
+    monkeypatch.setattr(archive_logs, "delete_expired_rows", delete_expired_rows)
+    monkeypatch.setattr(archive_logs, "prune_rollups", prune)
+    monkeypatch.setattr(archive_logs, "prune_sketches", prune)
+
+    await archive_logs.archive_logs(30, BatchPacer(10, target_seconds=60, pause_seconds=0))
+    assert deleted_before == through
+    assert pruned == [through["activity_logs"]] * 2
+
+    # nothing archived yet for one table: its rows stay, and so do the summaries
+    pruned.clear()
+    through["activity_logs"] = None
+    await archive_logs.archive_logs(30, BatchPacer(10, target_seconds=60, pause_seconds=0))
+    assert pruned == []
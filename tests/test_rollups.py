@@ -0,0 +1,89 @@
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import rollups
+from app.tasks import backfill_stats
+
+
+@pytest.fixture(autouse=True)
+def pending(monkeypatch):
+    monkeypatch.setattr(rollups, "_pending", {})
+
+
+def test_visits_and_actions_roll_up_per_hour_and_dimensions():
+    device, user = uuid.uuid4(), uuid.uuid4()
+    at = datetime(2026, 10, 19, 9, 20, tzinfo=timezone.utc)
+    hour = at.replace(minute=0)
+    rollups.record_visit(device, user, "example.com", "unrestricted", 30, at)
+    rollups.record_visit(str(device), str(user), "example.com", "unrestricted", None, at.replace(minute=59))
+    rollups.record_visit(device, user, "news.example", "unrestricted", 5, at)
+    rollups.record_action("blocked", device, user, timestamp=at)
+    rollups.record_action("alert_sent", device, user, timestamp=at)
+    rollups.record_action("visit", device, user, timestamp=at)  # not rolled up
+
+    assert rollups._pending == {
+        (hour, device, user, "example.com", "unrestricted"): rollups.RollupCounts(visits=2, duration_seconds=30),
+        (hour, device, user, "news.example", "unrestricted"): rollups.RollupCounts(visits=1, duration_seconds=5),
+        (hour, device, user, None, None): rollups.RollupCounts(alerts=1, blocked=1),
+    }
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_the_increments(monkeypatch):
+    device = uuid.uuid4()
+    at = datetime(2026, 10, 19, 9, tzinfo=timezone.utc)
+    rollups.record_visit(device, None, "example.com", "unrestricted", 10, at)
+
+    def unavailable():
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(rollups, "AsyncSessionLocal", unavailable)
+    with pytest.raises(ConnectionError):
+        await rollups.flush_rollups()
+    rollups.record_visit(device, None, "example.com", "unrestricted", 5, at)
+    assert rollups._pending == {(at, device, None, "example.com", "unrestricted"): rollups.RollupCounts(visits=2, duration_seconds=15)}
+
+
+class _BackfillEngine:
+    """Oldest history row at `oldest`; records the range of each transaction."""
+
+    def __init__(self, oldest):
+        self.oldest = oldest
+        self.transactions = []
+
+    @asynccontextmanager
+    async def connect(self):
+        yield self
+
+    @asynccontextmanager
+    async def begin(self):
+        self.transactions.append(None)
+        yield self
+
+    async def execute(self, statement, params):
+        if "start" not in params:
+            return SimpleNamespace(scalar=lambda: self.oldest)
+        self.transactions[-1] = (params["start"], params["end"])
+        return SimpleNamespace(rowcount=1)
+
+
+@pytest.mark.asyncio
+async def test_rollup_backfill_commits_a_day_at_a_time(monkeypatch):
+    now = datetime(2026, 10, 19, 9, 30, tzinfo=timezone.utc)
+    fake = _BackfillEngine(datetime(2026, 10, 17, 22, 15, tzinfo=timezone.utc))
+    monkeypatch.setattr(backfill_stats, "engine", fake)
+
+    assert await backfill_stats.backfill_rollups(now) == 6
+    day = datetime(2026, 10, 17, tzinfo=timezone.utc)
+    assert fake.transactions == [
+        (day, day + timedelta(days=1)),
+        (day + timedelta(days=1), day + timedelta(days=2)),
+        (day + timedelta(days=2), now.replace(minute=0)),  # the current hour is left to ingestion
+    ]
+
+    fake.oldest = None
+    assert await backfill_stats.backfill_rollups(now) == 0
@@ -0,0 +1,34 @@
+from sqlalchemy import bindparam, create_engine, text
+
+from app.core import sql_instrumentation
+from app.core.config import settings
+from app.core.metrics import RequestStats, current_request
+from app.core.sql_instrumentation import _fingerprint, instrument_engine, top_statements
+
+
+def test_in_lists_share_a_fingerprint():
+    assert _fingerprint("SELECT * FROM t WHERE id IN ($1, $2)") == _fingerprint("SELECT  *\nFROM t WHERE id IN ($1, $2, $3)")
+
+
+def test_statements_are_timed_and_attributed_to_the_request(monkeypatch, caplog):
+    sql_instrumentation._statements.clear()
+    monkeypatch.setattr(settings, "sql_slow_query_ms", 0)
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+
+    stats = RequestStats({"route": type("Route", (), {"path": "/api/reports/daily"})()})
+    token = current_request.set(stats)
+    try:
+        with engine.connect() as conn:
+            stmt = text("SELECT 1 WHERE 1 IN :ids").bindparams(bindparam("ids", expanding=True))
+            conn.execute(stmt, {"ids": [1, 2, 3]})
+    finally:
+        current_request.reset(token)
+
+    assert stats.db_statements == 1
+    assert stats.db_seconds > 0
+    [top] = top_statements()
+    assert top["calls"] == 1
+    assert "(...)" in top["statement"]
+    assert "route=/api/reports/daily" in caplog.text
+    assert "['int', 'int', 'int']" in caplog.text
@@ -0,0 +1,46 @@
+import uuid
+
+import pytest
+
+from app.core import write_behind
+from app.services import dirty_users
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_pending_state_for_the_next_round(monkeypatch):
+    monkeypatch.setattr(dirty_users, "_dirty", set())
+    user = uuid.uuid4()
+    dirty_users.mark_dirty(str(user))
+    dirty_users.mark_dirty(user)
+    dirty_users.mark_dirty(None)
+    assert dirty_users._dirty == {user}
+
+    def unavailable():
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(dirty_users, "AsyncSessionLocal", unavailable)
+    monkeypatch.setattr(write_behind, "_flushes", {"insight_dirty_users": (10, dirty_users.flush_dirty_users)})
+    assert await write_behind.flush_all() == {}
+    assert write_behind.write_behind_failures_total.values[("insight_dirty_users",)] >= 1
+    assert dirty_users._dirty == {user}
+
+
+@pytest.mark.asyncio
+async def test_deleted_users_are_dropped_from_the_flush(monkeypatch, flush_session):
+    live, deleted = uuid.uuid4(), uuid.uuid4()
+    monkeypatch.setattr(dirty_users, "_dirty", {live, deleted})
+    session = flush_session(dirty_users, [live])
+
+    assert await dirty_users.flush_dirty_users() == 1
+    assert [row["user_id"] for row in session.written] == [live]
+    assert dirty_users._dirty == set()
+
+
+@pytest.mark.asyncio
+async def test_flush_all_reports_rows_per_flush(monkeypatch):
+    async def three():
+        return 3
+
+    monkeypatch.setattr(write_behind, "_flushes", {"three": (0, three)})
+    assert await write_behind.flush_all() == {"three": 3}
+    assert write_behind.write_behind_rows_total.values[("three",)] >= 3